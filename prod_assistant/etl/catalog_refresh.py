@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import fcntl
+from pathlib import Path
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.logger import GLOBAL_LOGGER as log
+from prod_assistant.utils.catalog_version import read_catalog_state, rollback_catalog_generation
+
+
+class RefreshLock:
+    """
+    Cross-process lock so a scheduled refresh never overlaps a manual one. Held with flock on an open
+    descriptor, so the kernel drops it when the holder exits or crashes - no stale-lock expiry to race,
+    and a healthy ingest keeps it however long it runs. The file stays in place and records the holder's pid.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._fd = None
+
+    def acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        # never unlink: a waiter may already hold a descriptor on this inode
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class CatalogRefresher:
+    """
+    Scheduled scrape + blue/green ingest. Each run scrapes the configured queries into the catalog,
+    ingests a new index generation beside the live one, and publishes it only after its smoke
+    queries pass; serving keeps reading the previous generation until that single pointer write.
+    With catalog.blue_green disabled (the default, see config.yaml) runs ingest in place instead.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.refresh_cfg = config.get("catalog", {}).get("refresh", {})
+        self.lock = RefreshLock(self.refresh_cfg.get("lock_file", "data/catalog_refresh.lock"))
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CatalogRefresher":
+        return cls(config)
+
+    def scrape(self):
+        queries = self.refresh_cfg.get("queries", [])
+        if not queries:
+            log.info("No refresh queries configured, re-ingesting the current catalog")
+            return 0
+        from prod_assistant.etl.data_scapper import FlipkartScraper
+
+        scraper = FlipkartScraper()
+        unique_products = {}
+        for query in queries:
+            log.info("Scraping", query=query)
+            for row in scraper.scrape_flipkart_products(query, max_products=self.refresh_cfg.get("max_products", 5),
+                                                        review_count=self.refresh_cfg.get("review_count", 5)):
+                unique_products.setdefault(row[1], row)
+        rows = list(unique_products.values())
+        if not rows:
+            raise RuntimeError("Scrape returned no products")
+        scraper.save_to_csv(rows, "data/product_reviews.csv")
+        scraper.save_to_catalog(rows, query=", ".join(queries))
+        return len(rows)
+
+    def refresh(self) -> bool:
+        """One scrape + ingest cycle. Returns False when another refresh holds the lock."""
+        if not self.lock.acquire():
+            log.info("Another catalog refresh is running, skipping", lock_file=str(self.lock.path))
+            return False
+        try:
+            started = time.time()
+            scraped = self.scrape()
+            from prod_assistant.etl.data_ingestion import DataIngestion
+
+            DataIngestion().run_pipeline()
+            state = read_catalog_state()
+            log.info("Catalog refresh finished", seconds=round(time.time() - started), products_scraped=scraped,
+                     generation=state.get("generation"), label=state.get("label"))
+            return True
+        finally:
+            self.lock.release()
+
+    def run_forever(self):
+        interval = self.refresh_cfg.get("interval_hours", 24) * 3600
+        # the refresh embeds and writes in bulk; a lower CPU priority keeps co-located serving responsive
+        if hasattr(os, "nice") and self.refresh_cfg.get("nice", 10):
+            os.nice(self.refresh_cfg.get("nice", 10))
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                log.error("Catalog refresh failed, live generation unchanged", error=str(e))
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    # python -m prod_assistant.etl.catalog_refresh [--once | --rollback | --status]
+    command = sys.argv[1] if len(sys.argv) > 1 else "--schedule"
+    refresher = CatalogRefresher.from_config(load_config())
+    if command == "--once":
+        refresher.refresh()
+    elif command == "--rollback":
+        state = rollback_catalog_generation()
+        log.info("Rolled back catalog generation", generation=state["generation"], label=state["label"])
+    elif command == "--status":
+        print(json.dumps(read_catalog_state(), indent=2))
+    else:
+        refresher.run_forever()
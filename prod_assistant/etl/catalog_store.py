@@ -0,0 +1,152 @@
+import os
+import uuid
+import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from prod_assistant.retriever.product_index import normalize_price, normalize_count, normalize_rating
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+# Typed catalog schema. price/total_reviews/rating are numeric; price_display keeps the scraped
+# "₹59,900" string for prompts and the CSV export.
+CATALOG_SCHEMA = pa.schema([
+    pa.field("product_id", pa.string(), nullable=False),
+    pa.field("product_title", pa.string()),
+    pa.field("rating", pa.float64()),
+    pa.field("total_reviews", pa.int64()),
+    pa.field("price", pa.float64()),
+    pa.field("price_display", pa.string()),
+    pa.field("top_reviews", pa.string()),
+    pa.field("source_query", pa.string()),
+    pa.field("scraped_at", pa.timestamp("us", tz="UTC")),
+])
+
+CSV_COLUMNS = ["product_id", "product_title", "rating", "total_reviews", "price", "top_reviews"]
+PARTITIONING = ds.partitioning(pa.schema([("scrape_date", pa.string())]), flavor="hive")
+
+
+def rows_to_table(rows: List[list], source_query: Optional[str] = None,
+                  scraped_at: Optional[datetime.datetime] = None) -> pa.Table:
+    """Scraper rows ([id, title, rating, total_reviews, price, top_reviews] as strings) -> typed table."""
+    scraped_at = scraped_at or datetime.datetime.now(datetime.timezone.utc)
+    records = {name: [] for name in CATALOG_SCHEMA.names}
+    for product_id, title, rating, total_reviews, price, top_reviews in rows:
+        records["product_id"].append(str(product_id))
+        records["product_title"].append(title)
+        records["rating"].append(normalize_rating(rating))
+        records["total_reviews"].append(normalize_count(total_reviews))
+        records["price"].append(normalize_price(price))
+        records["price_display"].append(str(price))
+        records["top_reviews"].append(top_reviews)
+        records["source_query"].append(source_query)
+        records["scraped_at"].append(scraped_at)
+    return pa.Table.from_pydict(records, schema=CATALOG_SCHEMA)
+
+
+class CatalogStore:
+    """
+    Columnar product catalog: a hive-partitioned Parquet dataset (scrape_date=YYYY-MM-DD/part-*.parquet).
+    Every scrape appends a new file; reads use column projection, predicate pushdown and
+    memory-mapped local files, and keep only the latest row per product_id.
+    """
+
+    def __init__(self, root: str = "data/catalog"):
+        root_path = Path(root)
+        if not root_path.is_absolute():
+            root_path = Path(os.getcwd()) / root_path
+        self.root = root_path
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CatalogStore":
+        return cls(config.get("catalog", {}).get("root", "data/catalog"))
+
+    def exists(self) -> bool:
+        return self.root.exists() and any(self.root.rglob("*.parquet"))
+
+    def append(self, rows: List[list], source_query: Optional[str] = None) -> Optional[Path]:
+        if not rows:
+            return None
+        table = rows_to_table(rows, source_query)
+        scraped_at = table.column("scraped_at")[0].as_py()
+        partition = self.root / f"scrape_date={scraped_at:%Y-%m-%d}"
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / f"part-{scraped_at:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = path.with_suffix(".parquet.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        log.info("Catalog partition written", path=str(path), rows=table.num_rows)
+        return path
+
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(str(self.root), format="parquet", partitioning=PARTITIONING,
+                          filesystem=self.filesystem, exclude_invalid_files=True)
+
+    def read(self, columns: Optional[List[str]] = None, filter: Optional[ds.Expression] = None,
+             since: Optional[str] = None, latest_only: bool = True) -> pa.Table:
+        """
+        Read the catalog. `columns` is projected at scan time, `filter` (a pyarrow.dataset expression
+        such as ds.field("rating") >= 4) and `since` ("YYYY-MM-DD", prunes partitions) are pushed down.
+        """
+        if not self.exists():
+            return CATALOG_SCHEMA.empty_table() if columns is None else \
+                CATALOG_SCHEMA.empty_table().select(columns)
+
+        dataset = self.dataset()
+        since_expr = ds.field("scrape_date") >= since if since else None
+        expression = filter
+        if since_expr is not None:
+            expression = since_expr if expression is None else expression & since_expr
+
+        scan_columns = None
+        if columns is not None:
+            # product_id/scraped_at are needed to keep the latest row per product
+            scan_columns = list(dict.fromkeys(columns + (["product_id", "scraped_at"] if latest_only else [])))
+        table = dataset.to_table(columns=scan_columns, filter=expression)
+
+        if latest_only and table.num_rows:
+            # The latest scrape per product is found on a two-column scan before the predicate,
+            # so a product whose newest row fails the filter is dropped rather than served stale
+            latest = dataset.to_table(columns=["product_id", "scraped_at"], filter=since_expr) \
+                .group_by("product_id").aggregate([("scraped_at", "max")])
+            table = table.join(latest, keys="product_id")
+            table = table.filter(pc.equal(table["scraped_at"], table["scraped_at_max"])).drop_columns(["scraped_at_max"])
+            # several rows of one scrape can share a timestamp; keep one
+            table = table.sort_by([("product_id", "ascending")])
+            ids = table.column("product_id").to_pylist()
+            keep = [i for i in range(len(ids)) if i == 0 or ids[i] != ids[i - 1]]
+            table = table.take(pa.array(keep, type=pa.int64()))
+        if columns is not None:
+            table = table.select(columns)
+        return table
+
+    def to_pandas(self, columns: Optional[List[str]] = None, filter: Optional[ds.Expression] = None,
+                  since: Optional[str] = None) -> pd.DataFrame:
+        return self.read(columns=columns, filter=filter, since=since).to_pandas()
+
+    # --- CSV compatibility shim -------------------------------------------------------------
+
+    def import_csv(self, csv_path: str) -> Optional[Path]:
+        """Append a legacy product_reviews.csv (all-string columns) to the catalog."""
+        df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        missing = set(CSV_COLUMNS) - set(df.columns)
+        if missing:
+            raise ValueError(f"CSV must contain columns: {set(CSV_COLUMNS)}")
+        return self.append(df[CSV_COLUMNS].values.tolist(), source_query=f"csv:{os.path.basename(csv_path)}")
+
+    def export_csv(self, csv_path: str) -> str:
+        """Write the latest catalog in the legacy CSV layout (formatted price, string columns)."""
+        table = self.read(columns=["product_id", "product_title", "rating", "total_reviews",
+                                   "price_display", "top_reviews"])
+        df = table.to_pandas().rename(columns={"price_display": "price"})
+        df["total_reviews"] = df["total_reviews"].map(lambda v: f"{int(v):,}" if pd.notna(v) else "N/A")
+        os.makedirs(os.path.dirname(os.path.abspath(csv_path)), exist_ok=True)
+        df[CSV_COLUMNS].to_csv(csv_path, index=False)
+        return csv_path
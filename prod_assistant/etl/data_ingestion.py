@@ -1,5 +1,8 @@
 import os
+import shutil
+import datetime
 import pandas as pd
+import pyarrow.dataset as ds
 from dotenv import load_dotenv
 from typing import List
 from langchain_core.documents import Document
@@ -7,15 +10,30 @@ from langchain_astradb import AstraDBVectorStore
 
 from prod_assistant.utils.model_loader import ModelLoader
 from prod_assistant.utils.config_loader import load_config
+from prod_assistant.logger import GLOBAL_LOGGER as log
+from prod_assistant.utils.catalog_version import (
+    catalog_collection_name, publish_catalog_generation, read_catalog_state,
+)
+from prod_assistant.utils.context_builder import clean_review_text, dedupe_reviews, REVIEW_SEPARATOR
+from prod_assistant.retriever.product_index import ProductIndexBuilder, index_path, normalize_price
+from prod_assistant.etl.catalog_store import CatalogStore
+from prod_assistant.etl.dedup import NearDuplicateDetector
+from prod_assistant.retriever.entity_resolver import ProductEntityResolver, resolver_path
+from prod_assistant.retriever.local_index import QuantizedVectorIndex, local_index_path
+from prod_assistant.retriever.sharding import ShardRouter, ShardedCatalog, shard_collection_name
+from prod_assistant.retriever.quantization import CachingEmbeddings, QuantizedEmbeddingCache
 
 class DataIngestion:
     def __init__(self):
         print("Initializing DataIngestion pipeline...")
         self.model_loader = ModelLoader()
         self._load_env_variable()
-        self.csv_path = self._get_csv_path()
-        self.product_data = self._load_csv()
         self.config = load_config()
+        self.catalog = CatalogStore.from_config(self.config)
+        self.dedup = NearDuplicateDetector.from_config(self.config) \
+            if self.config.get("dedup", {}).get("enabled", True) else None
+        self.product_data = self._load_product_data()
+        self._embeddings = None
 
     def _load_env_variable(self):
         load_dotenv()
@@ -41,22 +59,66 @@ class DataIngestion:
 
         if not expected_columns.issubset(set(df.columns)):
             raise ValueError(f"CSV must contain columns: {expected_columns}")
+        df["price_value"] = df["price"].map(normalize_price)
         return df
+
+    def _load_catalog(self):
+        catalog_cfg = self.config.get("catalog", {})
+        predicate = None
+        if catalog_cfg.get("min_rating") is not None:
+            predicate = ds.field("rating") >= catalog_cfg["min_rating"]
+        df = self.catalog.to_pandas(
+            columns=["product_id", "product_title", "rating", "total_reviews", "price", "price_display", "top_reviews"],
+            filter=predicate,
+            since=catalog_cfg.get("ingest_since"),
+        )
+        # keep the CSV-era frame layout: `price` is the display string, `price_value` the number
+        return df.rename(columns={"price": "price_value", "price_display": "price"})
+
+    def _load_product_data(self):
+        if self.config.get("catalog", {}).get("format", "csv") == "parquet":
+            if not self.catalog.exists():
+                # one-time migration of the legacy CSV hand-off into the columnar catalog
+                self.catalog.import_csv(self._get_csv_path())
+            return self._load_catalog()
+        self.csv_path = self._get_csv_path()
+        return self._load_csv()
     
 
 
+    def _clean_reviews(self, top_reviews)->str:
+        # strip scraper boilerplate and near-identical reviews before they are embedded
+        reviews = clean_review_text(top_reviews).split(REVIEW_SEPARATOR)
+        if self.dedup:
+            reviews = self.dedup.dedupe_reviews(reviews)
+        else:
+            reviews = dedupe_reviews(reviews, self.config.get("context", {}).get("dedupe_threshold", 0.85))
+        return REVIEW_SEPARATOR.join(reviews) or "No review found"
+
+    def _collapse_variants(self, product_list):
+        # near-identical variants become one document that lists the variant ids it stands for
+        if not self.dedup:
+            return product_list
+        canonical, report = self.dedup.collapse_products(product_list)
+        self.dedup.save_report(report, self.config.get("dedup", {}).get("report_path", "data/dedup_report.json"))
+        log.info("Near-duplicate detection", products_in=report["products_in"], documents_out=report["products_out"])
+        return canonical
+
     def transform_data(self):
         product_list = []
-        for _, row in self.product_data.iterrows():
+        # to_dict gives native Python scalars (JSON-safe metadata); NaN becomes None
+        for row in self.product_data.astype(object).where(self.product_data.notna(), None).to_dict("records"):
             product_entry = {
                 "product_id": row["product_id"],
                 "product_title": row["product_title"],
                 "rating": row["rating"],
                 "total_reviews": row["total_reviews"],
                 "price": row["price"],
-                "top_reviews": row["top_reviews"]
+                "price_value": row.get("price_value"),
+                "top_reviews": self._clean_reviews(row["top_reviews"])
             }
             product_list.append(product_entry)
+        product_list = self._collapse_variants(product_list)
         documents = []
         for entry in product_list:
             metadata = {
@@ -64,29 +126,191 @@ class DataIngestion:
                 "product_title": entry["product_title"],
                 "rating": entry["rating"],
                 "total_reviews": entry["total_reviews"],
-                "price": entry["price"]
+                "price": entry["price"],
+                "price_value": entry["price_value"]
             }
+            if entry.get("variant_ids"):
+                metadata["variant_ids"] = entry["variant_ids"]
+                metadata["variant_titles"] = entry["variant_titles"]
+                metadata["variant_prices"] = entry["variant_prices"]
             doc = Document(page_content=entry["top_reviews"], metadata=metadata)
             documents.append(doc)
         print(f"Transformed {len(documents)} documents.")
         return documents
     
-    def store_in_vector(self, documents:List[Document]):
-        collection_name = self.config["astra_db"]["collection_name"]
-        vstore = AstraDBVectorStore(
-            embedding=self.model_loader.load_embeddings(),
+    def _get_embeddings(self):
+        # documents embedded for the local index are served from this cache when AstraDB embeds them
+        if self._embeddings is None:
+            cache = QuantizedEmbeddingCache(max_entries=max(len(self.product_data), 1), codec="float16")
+            self._embeddings = CachingEmbeddings(self.model_loader.load_embeddings(), cache)
+        return self._embeddings
+
+    def _vector_store(self, collection_name:str):
+        return AstraDBVectorStore(
+            embedding=self._get_embeddings(),
             collection_name=collection_name,
             api_endpoint=self.db_api_endpoint,
             token = self.db_application_token,
             namespace=self.db_keyspace,
         )
-        inserted_ids = vstore.add_documents(documents)
-        print(f"Successfully inserted {len(inserted_ids)} documents into AstraDB")
+
+    def _sharding_enabled(self) -> bool:
+        return self.config.get("sharding", {}).get("enabled", False)
+
+    def _write_collections(self, documents:List[Document], collection_name:str):
+        if self._sharding_enabled():
+            inserted_ids, vstore, largest = [], None, -1
+            # every shard collection is created, even empty ones, so routed searches never miss one
+            for shard, shard_docs in ShardRouter.from_config(self.config).partition(documents).items():
+                shard_store = self._vector_store(shard_collection_name(collection_name, shard))
+                if shard_docs:
+                    inserted_ids.extend(shard_store.add_documents(shard_docs))
+                if len(shard_docs) > largest:
+                    vstore, largest = shard_store, len(shard_docs)
+                log.info("Shard documents", shard=shard, documents=len(shard_docs))
+        else:
+            vstore = self._vector_store(collection_name)
+            inserted_ids = vstore.add_documents(documents)
+        log.info("Inserted documents into AstraDB", documents=len(inserted_ids), collection=collection_name)
+        return vstore, inserted_ids
+
+    def store_in_vector(self, documents:List[Document]):
+        """Legacy in-place ingestion into the un-suffixed collection, served as soon as it is written."""
+        vstore, inserted_ids = self._write_collections(documents, catalog_collection_name(self.config))
+        self._publish(None, len(documents))
         return vstore, inserted_ids
 
-    def run_pipeline(self):
+    def _blue_green_config(self) -> dict:
+        return self.config.get("catalog", {}).get("blue_green", {})
+
+    def _publish(self, label, documents:int):
+        dropped = publish_catalog_generation(label, documents=documents,
+                                             keep=self._blue_green_config().get("keep_generations", 2))
+        log.info("Catalog generation is now live", generation=label or catalog_collection_name(self.config))
+        for entry in dropped:
+            self.drop_generation(entry["label"])
+
+    def build_generation(self, documents:List[Document], label:str):
+        """Write a complete index generation next to the live one; nothing reads it until it is published."""
+        vstore, inserted_ids = self._write_collections(documents, catalog_collection_name(self.config, label))
+        self.build_local_index(documents, label)
+        return vstore, inserted_ids
+
+    def validate_generation(self, documents:List[Document], inserted_ids:list, label:str):
+        """Smoke-test a staged generation; raises ValueError when it must not go live."""
+        cfg = self._blue_green_config()
+        if len(inserted_ids) != len(documents):
+            raise ValueError(f"Inserted {len(inserted_ids)} of {len(documents)} documents")
+        live_documents = read_catalog_state().get("documents")
+        min_ratio = cfg.get("min_document_ratio", 0.5)
+        if live_documents and len(documents) < min_ratio * live_documents:
+            raise ValueError(f"New generation has {len(documents)} documents, live one has {live_documents}")
+
+        collection_name = catalog_collection_name(self.config, label)
+        use_local_index = self.config.get("local_index", {}).get("enabled", False)
+        if self._sharding_enabled():
+            catalog = ShardedCatalog(ShardRouter.from_config(self.config),
+                                     store_factory=lambda shard: self._vector_store(shard_collection_name(collection_name, shard)),
+                                     embeddings=self._get_embeddings(), use_local_index=use_local_index,
+                                     local_index_root=lambda: local_index_path(label))
+            search = lambda q, k: catalog.search_with_scores(q, k=k)
+        else:
+            vstore = self._vector_store(collection_name)
+            search = lambda q, k: vstore.similarity_search_with_score(q, k=k)
+            if use_local_index:
+                index = QuantizedVectorIndex.load(local_index_path(label))
+                if index is None or len(index) != len(documents):
+                    raise ValueError(f"Local index for '{label}' is missing or incomplete")
+
+        min_results = cfg.get("min_results", 1)
+        min_top_score = cfg.get("min_top_score", 0.6)
+        for query in cfg.get("smoke_queries", []):
+            results = search(query, max(min_results, 3))
+            top_score = max((score for _, score in results), default=0.0)
+            log.info("Smoke query", query=query, results=len(results), top_score=round(top_score, 3))
+            if len(results) < min_results or top_score < min_top_score:
+                raise ValueError(f"Smoke query '{query}' failed: {len(results)} results, top score {top_score:.3f}")
+
+    def drop_generation(self, label):
+        """Delete a generation's collections and local index (unpublished, failed or pruned ones)."""
+        collection_name = catalog_collection_name(self.config, label)
+        names = [shard_collection_name(collection_name, shard) for shard in ShardRouter.from_config(self.config).names] \
+            if self._sharding_enabled() else [collection_name]
+        for name in names:
+            try:
+                self._vector_store(name).delete_collection()
+            except Exception as e:
+                log.error("Could not delete collection", collection=name, error=str(e))
+        if label:
+            shutil.rmtree(local_index_path(label), ignore_errors=True)
+            index_path(label).unlink(missing_ok=True)
+            resolver_path(label).unlink(missing_ok=True)
+        log.info("Dropped catalog generation", generation=label or collection_name)
+
+    def build_product_index(self, label=None):
+        index_cfg = self.config.get("product_index", {})
+        if not index_cfg.get("enabled", True):
+            return None
+        try:
+            llm = self.model_loader.load_llm()
+        except Exception as e:
+            log.warning("LLM unavailable for product summaries, using first review instead", error=str(e))
+            llm = None
+        builder = ProductIndexBuilder(
+            llm=llm,
+            max_concurrency=self.config.get("batch", {}).get("max_concurrency", 8),
+            summary_max_chars=index_cfg.get("summary_max_chars", 300),
+        )
+        index = builder.build(self.product_data)
+        path = builder.save(index, index_path(label))
+        log.info("Product index saved", products=len(index["products"]), path=str(path))
+        return index
+
+    def build_entity_index(self, label=None):
+        if not self.config.get("entity_resolver", {}).get("enabled", True):
+            return None
+        resolver = ProductEntityResolver.from_config(self.product_data.to_dict("records"))
+        path = resolver.save(resolver_path(label))
+        log.info("Entity index saved", products=len(resolver.products), path=str(path))
+        return resolver
+
+    def build_local_index(self, documents:List[Document], label=None):
+        if not self.config.get("local_index", {}).get("enabled", False):
+            return None
+        if self._sharding_enabled():
+            indexes = {}
+            for shard, docs in ShardRouter.from_config(self.config).partition(documents).items():
+                if docs:
+                    indexes[shard] = self._build_index(docs, local_index_path(label) / shard)
+                else:
+                    shutil.rmtree(local_index_path(label) / shard, ignore_errors=True)
+            return indexes
+        return self._build_index(documents, local_index_path(label))
+
+    def _build_index(self, documents:List[Document], path):
+        vectors = self._get_embeddings().embed_documents([doc.page_content for doc in documents])
+        index = QuantizedVectorIndex.from_config(self.config).build(vectors, documents)
+        saved = index.save(path)
+        log.info("Local vector index saved", codec=index.codec.kind, vectors=len(index), path=str(saved),
+                 memory=index.memory_bytes())
+        return index
+
+    def run_pipeline(self, progress=None):
+        """`progress(fraction, message)` is called between stages; an exception it raises aborts the run."""
+        progress = progress or (lambda fraction, message: None)
+        progress(0.05, "Transforming catalog")
         documents = self.transform_data()
-        vstore, _ = self.store_in_vector(documents)
+        if not self._blue_green_config().get("enabled", False):
+            progress(0.2, "Building product and entity indexes")
+            self.build_product_index()
+            self.build_entity_index()
+            progress(0.4, "Building local index")
+            self.build_local_index(documents)
+            progress(0.5, f"Storing {len(documents)} documents")
+            vstore, _ = self.store_in_vector(documents)
+        else:
+            vstore = self.run_blue_green(documents, progress)
+        progress(0.98, "Checking sample search")
 
         query = "Can you tell me low budget iphone?"
         results = vstore.similarity_search(query)
@@ -95,6 +319,31 @@ class DataIngestion:
         for res in results:
             print(f"Content: {res.page_content}\nMetadata: {res.metadata}\n")
 
+    def run_blue_green(self, documents:List[Document], progress=None):
+        """
+        Ingest into a fresh generation, smoke-test it, then switch the live pointer to it in one
+        atomic write. A run that fails at any step is dropped and never served.
+        """
+        label = datetime.datetime.utcnow().strftime("g%Y%m%d%H%M%S")
+        log.info("Building catalog generation", generation=label)
+        progress = progress or (lambda fraction, message: None)
+        try:
+            progress(0.1, f"Writing {len(documents)} documents to generation '{label}'")
+            vstore, inserted_ids = self.build_generation(documents, label)
+            progress(0.7, f"Validating generation '{label}'")
+            self.validate_generation(documents, inserted_ids, label)
+            progress(0.8, "Building product and entity indexes")
+            # written beside the live generation's copies, which keep serving until the pointer switch
+            self.build_product_index(label)
+            self.build_entity_index(label)
+            progress(0.95, f"Publishing generation '{label}'")
+        except Exception:
+            log.error("Catalog generation failed, the live generation is unchanged", generation=label)
+            self.drop_generation(label)
+            raise
+        self._publish(label, len(documents))
+        return vstore
+
 if __name__=="__main__":
     ingestion = DataIngestion()
     ingestion.run_pipeline()
@@ -2,16 +2,34 @@ import csv
 import time
 import re
 import os
-from bs4 import BeautifulSoup
+import asyncio
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
+from prod_assistant.etl.catalog_store import CatalogStore
+from prod_assistant.etl.dedup import NearDuplicateDetector
+from prod_assistant.etl.page_fetcher import FlipkartParser, HttpFetcher, requires_browser
+from prod_assistant.utils.config_loader import load_config
 
 class FlipkartScraper:
-    def __init__(self, output_dir="data"):
+    def __init__(self, output_dir="data", engine=None):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        self.config = load_config()
+        self.dedup = NearDuplicateDetector.from_config(self.config) if self.config.get("dedup", {}).get("enabled", True) else None
+        scraper_cfg = self.config.get("scraper", {})
+        self.engine = (engine or os.getenv("SCRAPER_ENGINE") or scraper_cfg.get("engine", "browser")).lower()
+        self.js_markers = scraper_cfg.get("js_markers")
+        self.fallback_on_empty_reviews = scraper_cfg.get("browser_fallback_on_empty_reviews", True)
+        self.parser = FlipkartParser(scraper_cfg.get("selectors"))
+
+    def _top_reviews(self, reviews, count):
+        # the same review often appears with a different rating badge or "READ MORE" tail
+        if self.dedup:
+            reviews = self.dedup.dedupe_reviews(reviews)
+        reviews = reviews[:count]
+        return " || ".join(reviews) if reviews else "No review found"
 
     def get_top_reviews(self, product_url, count=2):
         options = uc.ChromeOptions()
@@ -35,26 +53,57 @@ class FlipkartScraper:
                 ActionChains(driver).send_keys(Keys.END).perform()
                 time.sleep(1.5)
 
-            soup = BeautifulSoup(driver.page_source,"html.parser")
-            review_blocks = soup.select("div._27M-vq, div.col.EPCmJX, div._6K-7Co")
-            seen = set()
-            reviews = []
-
-            for block in review_blocks:
-                text = block.get_text(separator=" ", strip=True)
-                if text and text not in seen:
-                    reviews.append(text)
-                    seen.add(text)
-                if len(reviews)>=count:
-                    break
-
+            reviews = self.parser.parse_reviews(driver.page_source)
         except Exception:
             reviews = []
         driver.quit()
-        return " || ".join(reviews) if reviews else "No review found"
-            
+        return self._top_reviews(reviews, count)
+
+    async def _fetch_static(self, query, max_products):
+        """Search listing and product pages over pooled HTTP; None when the listing needs a browser."""
+        search_url = f"https://www.flipkart.com/search?q={query.replace(' ','+')}"
+        async with HttpFetcher.from_config(self.config) as fetcher:
+            listing_html = await fetcher.fetch(search_url)
+            if requires_browser(listing_html, self.js_markers):
+                return None
+            items = self.parser.parse_listing(listing_html, max_products=max_products)
+            if not items:
+                return None
+            urls = [item["link"] for item in items if "flipkart.com" in item["link"]]
+            pages = dict(zip(urls, await fetcher.fetch_many(urls)))
+        print(f"HTTP fetch: {fetcher.stats}")
+        return [(item, pages.get(item["link"])) for item in items]
+
+    def _scrape_http(self, query, max_products, review_count):
+        fetched = asyncio.run(self._fetch_static(query, max_products))
+        if fetched is None:
+            return None
+        products = []
+        for item, page_html in fetched:
+            product_link = item["link"]
+            if "flipkart.com" not in product_link:
+                top_reviews = "Invalid product URL"
+            elif requires_browser(page_html, self.js_markers):
+                top_reviews = self.get_top_reviews(product_link, count=review_count)
+            else:
+                reviews = self.parser.parse_reviews(page_html)
+                if not reviews and self.fallback_on_empty_reviews:
+                    top_reviews = self.get_top_reviews(product_link, count=review_count)
+                else:
+                    top_reviews = self._top_reviews(reviews, review_count)
+            products.append([item["product_id"], item["title"], item["rating"], item["total_reviews"],
+                             item["price"], top_reviews])
+        return products
 
     def scrape_flipkart_products(self, query, max_products=1, review_count=2):
+        if self.engine == "http":
+            products = self._scrape_http(query, max_products, review_count)
+            if products is not None:
+                return products
+            print(f"Search page for '{query}' needs JavaScript, falling back to the browser")
+        return self._scrape_browser(query, max_products, review_count)
+
+    def _scrape_browser(self, query, max_products, review_count):
         options = uc.ChromeOptions()
         driver = uc.Chrome(options=options, use_subprocess=True)
         search_url = f"https://www.flipkart.com/search?q={query.replace(' ','+')}"
@@ -67,18 +116,18 @@ class FlipkartScraper:
             print(f"Error occured while closing popup: {e}")
         time.sleep(2)
         products = []
-        
-        items = driver.find_elements(By.CSS_SELECTOR, "div[data-id]")[:max_products]
+        selectors = self.parser.listing
+        items = driver.find_elements(By.CSS_SELECTOR, selectors["item"])[:max_products]
         for item in items:
             try:
-                title = item.find_element(By.CSS_SELECTOR, "div.KzDlHZ").text.strip()
-                price = item.find_element(By.CSS_SELECTOR, "div.Nx9bqj").text.strip()
-                rating = item.find_element(By.CSS_SELECTOR, "div.XQDdHH").text.strip()
-                review_text = item.find_element(By.CSS_SELECTOR, "span.Wphh3N").text.strip()
+                title = item.find_element(By.CSS_SELECTOR, selectors["title"]).text.strip()
+                price = item.find_element(By.CSS_SELECTOR, selectors["price"]).text.strip()
+                rating = item.find_element(By.CSS_SELECTOR, selectors["rating"]).text.strip()
+                review_text = item.find_element(By.CSS_SELECTOR, selectors["reviews"]).text.strip()
                 match = re.search(r"([\d,]+)\s+Reviews", review_text)
                 total_reviews = match.group(1) if match else "N/A"
 
-                link_el = item.find_element(By.CSS_SELECTOR, "a.CGtC98")
+                link_el = item.find_element(By.CSS_SELECTOR, selectors["link"])
                 href = link_el.get_attribute("href")
                 product_link = href if href.startswith("http") else "https://www.flipkart.com"+href
                 match = re.findall(r"/p/(itm[0-9A-Za-z]+)", href)
@@ -91,6 +140,14 @@ class FlipkartScraper:
         driver.quit()
         return products
 
+    def save_to_catalog(self, data, query=None, catalog_root=None):
+        """Append scraped rows as a new typed Parquet partition of the catalog; a no-op (None) with catalog.format csv."""
+        if self.config.get("catalog", {}).get("format", "csv") != "parquet":
+            # ingestion imports the CSV once the format is switched, so nothing is written ahead of it
+            return None
+        store = CatalogStore(catalog_root or os.path.join(self.output_dir, "catalog"))
+        return store.append(data, source_query=query)
+
     def save_to_csv(self, data, filename="product_reviews.csv"):
         if os.path.isabs(filename):
             path = filename
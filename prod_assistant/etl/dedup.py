@@ -0,0 +1,216 @@
+import re
+import json
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from prod_assistant.retriever.entity_resolver import split_title
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def word_shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(str(text).lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def title_shingles(title: str, size: int = 3) -> set:
+    """Character shingles of the model part of a title; colour/storage variants shingle identically."""
+    model_tokens, _ = split_title(title)
+    text = " ".join(model_tokens)
+    return {text[i:i + size] for i in range(max(1, len(text) - size + 1))} if text else set()
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash permutations (seeded, so signatures are reproducible)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingles: set) -> np.ndarray:
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles],
+            dtype=np.uint64,
+        )
+        permuted = ((hashes[:, None] * self.a[None, :] + self.b[None, :]) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        return float(np.mean(sig_a == sig_b))
+
+
+@lru_cache(maxsize=32)
+def lsh_params(num_perm: int, threshold: float, false_negative_weight: float = 0.7):
+    """
+    Pick (bands, rows) with bands * rows <= num_perm minimising the weighted false positive/negative
+    area under the banding S-curve 1 - (1 - s^rows)^bands. Candidates are verified against the
+    threshold afterwards, so missed duplicates cost more than false candidates.
+    """
+    below = np.linspace(0.0, threshold, 64)
+    above = np.linspace(threshold, 1.0, 64)
+    best, best_error = (num_perm, 1), float("inf")
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+            false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+            error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashLSH:
+    """Banded LSH index over MinHash signatures; query() returns candidate keys sharing any band."""
+
+    def __init__(self, num_perm: int = 128, threshold: float = 0.8):
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self.buckets: Dict[tuple, List[str]] = {}
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield (band, chunk.tobytes())
+
+    def insert(self, key: str, signature: np.ndarray):
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def query(self, signature: np.ndarray) -> set:
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        return candidates
+
+
+class NearDuplicateDetector:
+    """
+    Near-duplicate detection for scraped reviews and catalog products.
+    Reviews are compared on word shingles. Products are linked when both their review blobs and
+    their model titles (variant attributes removed) are near-identical, e.g. the same phone in
+    another colour carrying the same top reviews.
+    """
+
+    def __init__(self, review_threshold: float = 0.8, title_threshold: float = 0.7,
+                 num_perm: int = 128, shingle_size: int = 3, min_review_shingles: int = 5):
+        self.review_threshold = review_threshold
+        self.title_threshold = title_threshold
+        self.min_review_shingles = min_review_shingles
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "NearDuplicateDetector":
+        cfg = config.get("dedup", {})
+        return cls(
+            review_threshold=cfg.get("review_threshold", 0.8),
+            title_threshold=cfg.get("title_threshold", 0.7),
+            num_perm=cfg.get("num_perm", 128),
+            shingle_size=cfg.get("shingle_size", 3),
+            min_review_shingles=cfg.get("min_review_shingles", 5),
+        )
+
+    def dedupe_reviews(self, reviews: List[str]) -> List[str]:
+        """Keep the first of every group of near-identical reviews, preserving order."""
+        lsh = MinHashLSH(self.num_perm, self.review_threshold)
+        signatures, unique = {}, []
+        for i, review in enumerate(reviews):
+            sig = self.hasher.signature(word_shingles(review, self.shingle_size))
+            if any(MinHasher.similarity(sig, signatures[c]) >= self.review_threshold for c in lsh.query(sig)):
+                continue
+            key = str(i)
+            signatures[key] = sig
+            lsh.insert(key, sig)
+            unique.append(review)
+        return unique
+
+    def collapse_products(self, products: List[dict], review_key: str = "top_reviews"):
+        """
+        Link near-duplicate products. Returns (canonical products, report). The first product of a
+        group is kept and gains `variant_ids`/`variant_titles`/`variant_prices` listing the products
+        folded into it.
+        """
+        lsh = MinHashLSH(self.num_perm, self.review_threshold)
+        review_sigs, title_sigs = [], []
+        parent = list(range(len(products)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        links = {}
+        for i, product in enumerate(products):
+            shingles = word_shingles(product.get(review_key) or "", self.shingle_size)
+            review_sig = self.hasher.signature(shingles)
+            title_sig = self.hasher.signature(title_shingles(product.get("product_title") or ""))
+            review_sigs.append(review_sig)
+            title_sigs.append(title_sig)
+            if len(shingles) < self.min_review_shingles:
+                # "No review found" placeholders would make unrelated products look identical
+                continue
+            for candidate in lsh.query(review_sig):
+                j = int(candidate)
+                review_sim = MinHasher.similarity(review_sig, review_sigs[j])
+                title_sim = MinHasher.similarity(title_sig, title_sigs[j])
+                if review_sim >= self.review_threshold and title_sim >= self.title_threshold:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+                    links.setdefault(i, (j, review_sim, title_sim))
+            lsh.insert(str(i), review_sig)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(products)):
+            groups.setdefault(find(i), []).append(i)
+
+        canonical, report_groups = [], []
+        for root, members in groups.items():
+            keep = dict(products[root])
+            duplicates = [m for m in members if m != root]
+            if duplicates:
+                keep["variant_ids"] = [str(products[m]["product_id"]) for m in duplicates]
+                keep["variant_titles"] = [products[m]["product_title"] for m in duplicates]
+                keep["variant_prices"] = [products[m].get("price") for m in duplicates]
+                report_groups.append({
+                    "canonical_id": str(products[root]["product_id"]),
+                    "canonical_title": products[root]["product_title"],
+                    "duplicates": [{
+                        "product_id": str(products[m]["product_id"]),
+                        "product_title": products[m]["product_title"],
+                        "review_similarity": round(links[m][1], 3) if m in links else None,
+                        "title_similarity": round(links[m][2], 3) if m in links else None,
+                    } for m in duplicates],
+                })
+            canonical.append(keep)
+
+        report = {
+            "products_in": len(products),
+            "products_out": len(canonical),
+            "review_threshold": self.review_threshold,
+            "title_threshold": self.title_threshold,
+            "groups": report_groups,
+        }
+        return canonical, report
+
+    def save_report(self, report: dict, path: str) -> Optional[Path]:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        log.info("Near-duplicate report saved", path=str(path),
+                 products_in=report["products_in"], products_out=report["products_out"])
+        return path
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import multiprocessing
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, kind);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Persistent job table in SQLite (WAL), shared by the UI, the runner and the worker processes."""
+
+    def __init__(self, path: str = "data/jobs.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # autocommit connection per operation; multi-statement updates use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def dedup_key(kind: str, params: dict) -> str:
+        return kind + ":" + json.dumps(params, sort_keys=True, default=str)
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind: str, params: dict) -> dict:
+        """Queue a job; an identical job that is still queued or running is returned instead."""
+        key = self.dedup_key(kind, params)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running') LIMIT 1", (key,)
+            ).fetchone()
+            if existing is not None:
+                conn.execute("COMMIT")
+                return {**self._row(existing), "deduplicated": True}
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, dedup_key, status, message, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 'Queued', ?)",
+                (job_id, kind, json.dumps(params, default=str), key, time.time()),
+            )
+            conn.execute("COMMIT")
+        return {**self.get(job_id), "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            return self._row(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit: int = 20) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def claim_next(self, limits: Dict[str, int], pid: int) -> Optional[dict]:
+        """Atomically move the oldest queued job whose kind is under its concurrency limit to running."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            running = dict(conn.execute(
+                "SELECT kind, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY kind").fetchall())
+            for row in conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall():
+                if running.get(row["kind"], 0) < limits.get(row["kind"], 1):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', pid = ?, started_at = ?, message = 'Starting' WHERE id = ?",
+                        (pid, time.time(), row["id"]),
+                    )
+                    conn.execute("COMMIT")
+                    return self.get(row["id"])
+            conn.execute("COMMIT")
+        return None
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def finish(self, job_id: str, status: str, message: str = "", result=None, error: Optional[str] = None):
+        self.update(job_id, status=status, message=message, result=result, error=error, finished_at=time.time(),
+                    **({"progress": 1.0} if status == "succeeded" else {}))
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Queued jobs are cancelled at once; running ones stop at their next progress checkpoint."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE jobs SET status = 'cancelled', message = 'Cancelled before start', finished_at = ? "
+                         "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1, message = 'Cancelling' "
+                         "WHERE id = ? AND status = 'running'", (job_id,))
+            conn.execute("COMMIT")
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def recover(self) -> int:
+        """Fail running jobs whose process is gone (runner restart, OOM kill)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, pid FROM jobs WHERE status = 'running'").fetchall()
+        lost = [r["id"] for r in rows if not _pid_alive(r["pid"])]
+        for job_id in lost:
+            self.finish(job_id, "failed", message="Interrupted", error="Worker process exited before finishing")
+        return len(lost)
+
+
+class JobContext:
+    """Handed to job handlers in the worker process: progress reporting doubles as the cancellation checkpoint."""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def progress(self, fraction: float, message: str = ""):
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled(message)
+        self.store.update(self.job_id, progress=round(min(max(fraction, 0.0), 1.0), 4), message=message)
+
+
+def scrape_job(ctx: JobContext, params: dict) -> dict:
+    from prod_assistant.etl.catalog_store import CSV_COLUMNS
+    from prod_assistant.etl.data_scapper import FlipkartScraper
+
+    queries = params["queries"]
+    scraper = FlipkartScraper()
+    unique_products = {}
+    for i, query in enumerate(queries):
+        ctx.progress(i / (len(queries) + 1), f"Scraping '{query}' ({i + 1}/{len(queries)})")
+        for row in scraper.scrape_flipkart_products(query, max_products=params.get("max_products", 1),
+                                                    review_count=params.get("review_count", 2)):
+            unique_products.setdefault(row[1], row)
+    rows = list(unique_products.values())
+    ctx.progress(len(queries) / (len(queries) + 1), f"Saving {len(rows)} products")
+
+    # colour/storage variants are kept in the catalog (prices differ) but reported; ingestion folds them
+    products = [dict(zip(CSV_COLUMNS, row)) for row in rows]
+    _, dedup_report = scraper.dedup.collapse_products(products) if scraper.dedup else (None, None)
+    output_path = params.get("output_path", "data/product_reviews.csv")
+    scraper.save_to_csv(rows, output_path)
+    partition = scraper.save_to_catalog(rows, query=", ".join(queries))
+    return {"products": len(rows), "csv_path": output_path, "catalog": partition is not None,
+            "dedup_groups": dedup_report["groups"] if dedup_report else []}
+
+
+def ingest_job(ctx: JobContext, params: dict) -> dict:
+    from prod_assistant.etl.catalog_refresh import CatalogRefresher
+    from prod_assistant.etl.data_ingestion import DataIngestion
+    from prod_assistant.utils.catalog_version import read_catalog_state
+
+    # the scheduled refresh takes the same lock, so UI ingests and refreshes never overlap
+    lock = CatalogRefresher.from_config(load_config()).lock
+    if not lock.acquire():
+        raise RuntimeError(f"A catalog refresh or ingest is already running ({lock.path})")
+    try:
+        ctx.progress(0.02, "Initializing ingestion pipeline")
+        DataIngestion().run_pipeline(progress=ctx.progress)
+    finally:
+        lock.release()
+    state = read_catalog_state()
+    return {"generation": state.get("generation"), "label": state.get("label"), "documents": state.get("documents")}
+
+
+HANDLERS: Dict[str, Callable[[JobContext, dict], dict]] = {"scrape": scrape_job, "ingest": ingest_job}
+
+
+def run_job(db_path: str, job_id: str):
+    """Entry point in the worker process."""
+    store = JobStore(db_path)
+    job = store.get(job_id)
+    store.update(job_id, pid=os.getpid())
+    try:
+        result = HANDLERS[job["kind"]](JobContext(store, job_id), job["params"])
+    except JobCancelled:
+        store.finish(job_id, "cancelled", message="Cancelled")
+    except Exception as e:
+        store.finish(job_id, "failed", message="Failed", error=f"{type(e).__name__}: {e}")
+    else:
+        store.finish(job_id, "succeeded", message="Done", result=result)
+
+
+class JobRunner:
+    """
+    Dispatches queued jobs to a process pool. Concurrency limits are per job kind and counted in
+    the job table, so they hold across several runners sharing one database.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = 2, limits: Optional[Dict[str, int]] = None,
+                 poll_seconds: float = 1.0):
+        self.store = store
+        self.max_workers = max_workers
+        self.limits = limits or {"scrape": 2, "ingest": 1}
+        self.poll_seconds = poll_seconds
+        self._futures = {}
+        self._pool = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "JobRunner":
+        cfg = config.get("jobs", {})
+        return cls(JobStore(cfg.get("db_path", "data/jobs.sqlite")), max_workers=cfg.get("max_workers", 2),
+                   limits=cfg.get("limits"), poll_seconds=cfg.get("poll_seconds", 1.0))
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a threaded server (Streamlit, uvicorn) can deadlock the child
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self) -> "JobRunner":
+        if self._thread is None:
+            recovered = self.store.recover()
+            if recovered:
+                log.info("Marked interrupted jobs as failed", count=recovered)
+            self._pool = self._new_pool()
+            self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _reap(self):
+        crashed = False
+        for job_id, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[job_id]
+            error = future.exception()
+            if error is not None:
+                # the worker died without recording an outcome (e.g. BrokenProcessPool)
+                self.store.finish(job_id, "failed", message="Worker crashed", error=f"{type(error).__name__}: {error}")
+                crashed = True
+        if crashed:
+            self._pool.shutdown(wait=False)
+            self._pool = self._new_pool()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._reap()
+                while len(self._futures) < self.max_workers:
+                    job = self.store.claim_next(self.limits, os.getpid())
+                    if job is None:
+                        break
+                    self._futures[job["id"]] = self._pool.submit(run_job, str(self.store.path), job["id"])
+            except sqlite3.Error as e:
+                log.error("Job runner database error", error=str(e))
+            self._stop.wait(self.poll_seconds)
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m prod_assistant.etl.job_queue
+    runner = JobRunner.from_config(load_config()).start()
+    log.info("Job runner started", db_path=str(runner.store.path), workers=runner.max_workers, limits=runner.limits)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        runner.stop()
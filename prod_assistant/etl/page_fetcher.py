@@ -0,0 +1,254 @@
+import re
+import time
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # lxml (+cssselect) is the fallback backend
+    LexborHTMLParser = None
+
+DEFAULT_SELECTORS = {
+    "listing": {
+        "item": "div[data-id]",
+        "title": "div.KzDlHZ",
+        "price": "div.Nx9bqj",
+        "rating": "div.XQDdHH",
+        "reviews": "span.Wphh3N",
+        "link": "a.CGtC98",
+    },
+    "review_blocks": "div._27M-vq, div.col.EPCmJX, div._6K-7Co",
+}
+DEFAULT_JS_MARKERS = ["enable javascript", "are you a human", "captcha"]
+RETRY_STATUS = {429, 500, 502, 503, 504}
+FLIPKART_BASE = "https://www.flipkart.com"
+
+
+@lru_cache(maxsize=64)
+def _lxml_selector(css: str):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(css)
+
+
+class FlipkartParser:
+    """
+    Static-HTML parser for Flipkart search-listing and product pages, driven by a selector config.
+    Uses selectolax (lexbor) when installed and lxml otherwise.
+    """
+
+    def __init__(self, selectors: Optional[dict] = None, backend: str = "auto"):
+        selectors = selectors or {}
+        self.listing = {**DEFAULT_SELECTORS["listing"], **selectors.get("listing", {})}
+        self.review_blocks = selectors.get("review_blocks", DEFAULT_SELECTORS["review_blocks"])
+        if backend == "auto":
+            backend = "selectolax" if LexborHTMLParser is not None else "lxml"
+        self.backend = backend
+
+    def _root(self, html: str):
+        if self.backend == "selectolax":
+            return LexborHTMLParser(html)
+        import lxml.html
+        return lxml.html.fromstring(html)
+
+    def _select(self, node, css: str) -> list:
+        return node.css(css) if self.backend == "selectolax" else _lxml_selector(css)(node)
+
+    def _first(self, node, css: str):
+        if self.backend == "selectolax":
+            return node.css_first(css)
+        found = _lxml_selector(css)(node)
+        return found[0] if found else None
+
+    def _text(self, node) -> str:
+        if self.backend == "selectolax":
+            return node.text(separator=" ", strip=True)
+        return " ".join(t.strip() for t in node.itertext() if t.strip())
+
+    def _attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name) if self.backend == "selectolax" else node.get(name)
+
+    def parse_listing(self, html: str, max_products: int = 1) -> List[dict]:
+        """Products on a search page, with the same fields the browser scraper reads."""
+        products = []
+        for item in self._select(self._root(html), self.listing["item"]):
+            if len(products) >= max_products:
+                break
+            nodes = {key: self._first(item, self.listing[key])
+                     for key in ("title", "price", "rating", "reviews", "link")}
+            if any(node is None for node in nodes.values()):
+                continue  # sponsored tiles and banners also carry data-id
+            href = self._attr(nodes["link"], "href") or ""
+            match = re.search(r"([\d,]+)\s+Reviews", self._text(nodes["reviews"]))
+            product_id = re.findall(r"/p/(itm[0-9A-Za-z]+)", href)
+            products.append({
+                "product_id": product_id[0] if product_id else "N/A",
+                "title": self._text(nodes["title"]),
+                "rating": self._text(nodes["rating"]),
+                "total_reviews": match.group(1) if match else "N/A",
+                "price": self._text(nodes["price"]),
+                "link": href if href.startswith("http") else FLIPKART_BASE + href,
+            })
+        return products
+
+    def parse_reviews(self, html: str) -> List[str]:
+        """Review texts in page order, exact duplicates removed."""
+        seen, reviews = set(), []
+        for block in self._select(self._root(html), self.review_blocks):
+            text = self._text(block)
+            if text and text not in seen:
+                seen.add(text)
+                reviews.append(text)
+        return reviews
+
+
+def requires_browser(html: Optional[str], markers: Optional[List[str]] = None) -> bool:
+    """True when a statically fetched page is unusable: no body, or a JS/bot-check interstitial."""
+    if not html:
+        return True
+    head = html[:20_000].lower()
+    return any(marker in head for marker in (markers or DEFAULT_JS_MARKERS))
+
+
+class HttpFetcher:
+    """
+    Pooled async HTTP client for static pages: bounded connection pool, retries with exponential
+    backoff on transport errors and 429/5xx, and a per-host politeness delay between request starts.
+    """
+
+    def __init__(self, max_connections: int = 8, timeout_seconds: float = 15.0, retries: int = 3,
+                 backoff_seconds: float = 1.0, politeness_delay_seconds: float = 1.0,
+                 user_agent: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.timeout_seconds = timeout_seconds
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.politeness_delay_seconds = politeness_delay_seconds
+        self.user_agent = user_agent
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "bytes": 0}
+
+    @classmethod
+    def from_config(cls, config: dict, transport: Optional[httpx.AsyncBaseTransport] = None) -> "HttpFetcher":
+        http_cfg = config.get("scraper", {}).get("http", {})
+        return cls(
+            max_connections=http_cfg.get("max_connections", 8),
+            timeout_seconds=http_cfg.get("timeout_seconds", 15),
+            retries=http_cfg.get("retries", 3),
+            backoff_seconds=http_cfg.get("backoff_seconds", 1.0),
+            politeness_delay_seconds=http_cfg.get("politeness_delay_seconds", 1.0),
+            user_agent=http_cfg.get("user_agent"),
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        headers = {"Accept-Language": "en-IN,en;q=0.9"}
+        if self.user_agent:
+            headers["User-Agent"] = self.user_agent
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=self.timeout_seconds,
+            headers=headers,
+            follow_redirects=True,
+            transport=self.transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+
+    async def _polite(self, host: str):
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._last_request.get(host, 0.0) + self.politeness_delay_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request[host] = time.monotonic()
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """Page HTML, or None once retries are exhausted (the caller falls back to the browser)."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+            await self._polite(host)
+            self.stats["requests"] += 1
+            try:
+                response = await self.client.get(url)
+            except httpx.HTTPError as e:
+                log.warning("HTTP fetch failed", url=url, attempt=attempt, error=str(e))
+                continue
+            if response.status_code in RETRY_STATUS:
+                log.warning("HTTP fetch retryable status", url=url, attempt=attempt, status=response.status_code)
+                continue
+            if response.status_code >= 400:
+                break
+            self.stats["bytes"] += len(response.content)
+            return response.text
+        self.stats["failures"] += 1
+        return None
+
+    async def fetch_many(self, urls: List[str]) -> List[Optional[str]]:
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+
+if __name__ == "__main__":
+    # Parser throughput benchmark on the saved HTML fixtures (no network); parser checks live in
+    # prod_assistant/test/test_page_fetcher.py
+    import tracemalloc
+    from pathlib import Path
+    from bs4 import BeautifulSoup
+
+    fixtures = Path("data/fixtures/flipkart")
+    listing_html = (fixtures / "search_listing.html").read_text(encoding="utf-8")
+    product_html = (fixtures / "product_page.html").read_text(encoding="utf-8")
+
+    def bench(name, fn, html, rounds=200):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            fn(html)
+        elapsed = time.perf_counter() - started
+        # peak Python-heap allocation of a single parse (tracemalloc would distort the timing)
+        tracemalloc.start()
+        fn(html)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<28} {rounds / elapsed:8.0f} pages/s  peak {peak / 1024:8.0f} KiB")
+
+    review_css = DEFAULT_SELECTORS["review_blocks"]
+    bench("bs4 html.parser (reviews)",
+          lambda h: [b.get_text(separator=" ", strip=True) for b in BeautifulSoup(h, "html.parser").select(review_css)],
+          product_html)
+    for backend in ("selectolax", "lxml"):
+        if backend == "selectolax" and LexborHTMLParser is None:
+            continue
+        bench(f"{backend} (reviews)", FlipkartParser(backend=backend).parse_reviews, product_html)
+        bench(f"{backend} (listing)", lambda h, p=FlipkartParser(backend=backend): p.parse_listing(h, 24), listing_html)
+
+    # fetch + parse throughput through the pooled client, pages served from the fixtures
+    def serve(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=listing_html if "/search" in request.url.path else product_html)
+
+    async def crawl(pages: int):
+        fetcher = HttpFetcher(max_connections=8, politeness_delay_seconds=0.0, transport=httpx.MockTransport(serve))
+        parser = FlipkartParser()
+        async with fetcher:
+            listing = parser.parse_listing(await fetcher.fetch(f"{FLIPKART_BASE}/search?q=phone"), max_products=24)
+            urls = [item["link"] for item in listing] * (pages // len(listing))
+            bodies = await fetcher.fetch_many(urls)
+        return sum(len(parser.parse_reviews(body)) for body in bodies), fetcher.stats
+
+    started = time.perf_counter()
+    review_total, stats = asyncio.run(crawl(480))
+    elapsed = time.perf_counter() - started
+    print(f"HTTP fetch+parse: {stats['requests']} pages in {elapsed:.2f}s ({stats['requests'] / elapsed:.0f} pages/s), "
+          f"{review_total} reviews")
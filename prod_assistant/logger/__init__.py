@@ -1,2 +1,2 @@
-from .custom_logger import CustomLogger
-GLOBAL_LOGGER = CustomLogger().get_logger("prod_assistant")
\ No newline at end of file
+from .custom_logger import CustomLogger, bind_request_context, clear_request_context
+GLOBAL_LOGGER = CustomLogger().get_logger("prod_assistant")
@@ -1,48 +1,134 @@
 import os
+import uuid
+import zlib
+import atexit
 import logging
+import threading
+from queue import SimpleQueue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 import structlog
+from prod_assistant.utils.config_loader import load_config
+
+
+QUIET_LOGGERS = ("httpx", "httpcore", "openai", "astrapy", "urllib3")
+
+
+class _PassThroughQueueHandler(QueueHandler):
+    """Enqueue the record untouched; rendering happens on the listener thread, not the caller's."""
+
+    def prepare(self, record):
+        return record
+
+
+def _sample_debug_events(logger, method_name, event_dict):
+    # Per-request debug events are kept for a sampled share of requests (all-or-nothing per request_id)
+    if method_name != "debug":
+        return event_dict
+    rate = CustomLogger.debug_sample_rate
+    if rate >= 1.0:
+        return event_dict
+    request_id = event_dict.get("request_id")
+    if request_id is None or rate <= 0.0:
+        raise structlog.DropEvent
+    if zlib.crc32(str(request_id).encode()) % 10_000 >= rate * 10_000:
+        raise structlog.DropEvent
+    return event_dict
+
 
 class CustomLogger:
+    """
+    Process-wide structured logging. Handlers are set up once per process: callers only put
+    records on a queue, and a QueueListener thread renders JSON and writes the rotating file
+    and the console.
+    """
+
+    _lock = threading.Lock()
+    _listener: Optional[QueueListener] = None
+    log_file_path: Optional[str] = None
+    debug_sample_rate = 0.0
+
     def __init__(self, log_dir='logs'):
         self.log_dir = os.path.join(os.getcwd(),log_dir)
-        os.makedirs(self.log_dir, exist_ok=True)
+        self.settings = load_config().get("logging", {})
 
-        log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-        self.log_file_path = os.path.join(self.log_dir,log_file)
+    def _configure(self):
+        with CustomLogger._lock:
+            if CustomLogger._listener is not None:
+                return
+            os.makedirs(self.log_dir, exist_ok=True)
+            log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+            CustomLogger.log_file_path = os.path.join(self.log_dir, log_file)
 
-    def get_logger(self, name=__file__):
-        logger_name = os.path.basename(name)
+            level = logging.getLevelName(os.getenv("LOG_LEVEL", self.settings.get("level", "INFO")).upper())
+            CustomLogger.debug_sample_rate = float(
+                os.getenv("LOG_DEBUG_SAMPLE_RATE", self.settings.get("debug_sample_rate", 0.0))
+            )
 
-        file_handler = logging.FileHandler(self.log_file_path)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter("%(message)s"))
-
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter("%(message)s"))
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(message)s",
-            handlers=[console_handler,file_handler]
-        )
-
-        structlog.configure(
-            processors=[
-                structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
-                structlog.processors.add_log_level,
-                structlog.processors.EventRenamer(to="event"),
-                structlog.processors.JSONRenderer()
-
-            ],
-            logger_factory=structlog.stdlib.LoggerFactory(),
-            cache_logger_on_first_use=True
-        )
-        return structlog.get_logger(logger_name)
+            formatter = structlog.stdlib.ProcessorFormatter(
+                processors=[
+                    structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                    structlog.processors.JSONRenderer(),
+                ],
+                foreign_pre_chain=[
+                    structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
+                    structlog.processors.add_log_level,
+                ],
+            )
+
+            file_handler = RotatingFileHandler(
+                CustomLogger.log_file_path,
+                maxBytes=self.settings.get("max_bytes", 10 * 1024 * 1024),
+                backupCount=self.settings.get("backup_count", 5),
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(formatter)
+
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
 
+            log_queue = SimpleQueue()
+            root = logging.getLogger()
+            root.handlers = [_PassThroughQueueHandler(log_queue)]
+            root.setLevel(level)
+            # HTTP client libraries log a line per request at INFO; keep only their warnings and errors
+            for name in self.settings.get("quiet_loggers", QUIET_LOGGERS):
+                logging.getLogger(name).setLevel(logging.WARNING)
 
+            listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            CustomLogger._listener = listener
+
+            structlog.configure(
+                processors=[
+                    structlog.contextvars.merge_contextvars,
+                    _sample_debug_events,
+                    structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
+                    structlog.processors.add_log_level,
+                    structlog.processors.EventRenamer(to="event"),
+                    structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+                ],
+                # below-level calls are no-ops that never reach the processors
+                wrapper_class=structlog.make_filtering_bound_logger(level),
+                logger_factory=structlog.stdlib.LoggerFactory(),
+                cache_logger_on_first_use=True
+            )
+
+    def get_logger(self, name=__file__):
+        self._configure()
+        logger_name = os.path.basename(name)
+        return structlog.get_logger(logger_name)
 
 
+def bind_request_context(request_id: Optional[str] = None, **values) -> str:
+    """Bind a request id (and any extra fields) to every log event emitted in this context."""
+    request_id = request_id or uuid.uuid4().hex
+    structlog.contextvars.clear_contextvars()
+    structlog.contextvars.bind_contextvars(request_id=request_id, **values)
+    return request_id
 
 
+def clear_request_context():
+    structlog.contextvars.clear_contextvars()
@@ -1,56 +1,91 @@
 from mcp.server.fastmcp import FastMCP
 from prod_assistant.retriever.retrieval import Retriever
-from langchain_community.tools import DuckDuckGoSearchRun
+from prod_assistant.retriever.entity_resolver import STOP_WORDS, tokenize
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.context_builder import ContextBuilder
+from prod_assistant.utils.web_search import build_web_search
+from prod_assistant.mcp_server.tool_runtime import ToolExecutor, ToolTimeout
+from prod_assistant.utils.single_flight import coalescing_stats
+from prod_assistant.logger import GLOBAL_LOGGER as log
 import re
 mcp = FastMCP("hybrid_search")
 
+# keyword-free miss: the workflow then falls back to web search and the local retriever
+NO_RESULT = "No exact result found"
+
 retriever_obj = Retriever()
 retriever = retriever_obj.load_retriever()
 
-duckduckgo = DuckDuckGoSearchRun()
+config = load_config()
+web_search_service = build_web_search(config)
+context_builder = ContextBuilder.from_config(config)
+# tool bodies run here, never on the server loop, so concurrent agents are not serialized
+tool_executor = ToolExecutor.from_config(config)
 
 
-def format_doc(docs)-> str:
+def format_doc(docs, query:str="")-> str:
     if not docs:
         return ""
-    formatted_chunk = []
-    for d in docs:
-        meta = d.metadata or {}
-        formatted = (
-            f"Title: {meta.get('product_title','N/A')}\n"
-            f"Price: {meta.get('price','N/A')}\n"
-            f"Rating: {meta.get('rating','N/A')}\n"
-            f"Review: \n{d.page_content.strip()}"
-        )
-        formatted_chunk.append(formatted)
-        
-    return "\n\n---\n\n".join(formatted_chunk)
+    return context_builder.build(docs, query)
 
 
 
-@mcp.tool()
-async def get_product_info(query:str)-> str:
-    try:
-        docs = retriever.invoke(query)
+def _product_info(query:str)-> str:
+    # blocking: cache, entity resolution, vector search and reranking
+    docs = retriever_obj.call_retriever(query)
 
+    resolved_ids = {m["product_id"] for m in retriever_obj.resolve_products(query)}
+    if resolved_ids:
+        # a resolved variant may have been folded into another product's document at ingestion
         filtered_docs = [
-            d for d in docs 
-            if any(word in d.metadata.get("product_title","").lower()
-                   for word in query.lower().split())
+            d for d in docs
+            if str(d.metadata.get("product_id")) in resolved_ids
+            or resolved_ids & {str(v) for v in d.metadata.get("variant_ids") or []}
         ]
-        if not filtered_docs:
-            return "No exact result found"
-        context = format_doc(filtered_docs)
-        return context
+    else:
+        query_words = {w for w in tokenize(query) if w not in STOP_WORDS}
+        filtered_docs = [
+            d for d in docs
+            if query_words & set(tokenize(d.metadata.get("product_title","")))
+        ]
+    if not filtered_docs:
+        return NO_RESULT
+    return format_doc(filtered_docs, query)
+
+
+@mcp.tool()
+async def get_product_info(query:str)-> str:
+    try:
+        return await tool_executor.run("get_product_info", _product_info, query)
+    except ToolTimeout as e:
+        log.warning("Product lookup timed out", query=query, error=str(e))
+        return NO_RESULT
     except Exception as e:
-        return f"Error retriving product info: {str(e)}"
+        log.warning("Error retrieving product info", query=query, error=str(e))
+        return NO_RESULT
     
 @mcp.tool()
 async def web_search(query:str)->str:
     try:
-        return duckduckgo.run(query)
+        return await tool_executor.run_async("web_search", web_search_service.search, query)
+    except ToolTimeout as e:
+        log.warning("Web search tool timed out", query=query, error=str(e))
+        return ""
     except Exception as e:
-        return f"Error during web search: {str(e)}"
+        log.warning("Error during web search", query=query, error=str(e))
+        return ""
+
+
+@mcp.resource("metrics://tools")
+def tool_metrics()->dict:
+    """Per-tool queue vs execution latency, plus retrieval, web search and coalescing counters."""
+    return {
+        "tools": tool_executor.stats(),
+        "retrieval_cache": retriever_obj.cache_stats(),
+        "adaptive_depth": retriever_obj.depth_stats(),
+        "web_search": web_search_service.stats(),
+        "coalescing": coalescing_stats(),
+    }
 
 if __name__== "__main__":
     mcp.run(transport="stdio")    
\ No newline at end of file
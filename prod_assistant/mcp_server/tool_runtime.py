@@ -0,0 +1,182 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class ToolTimeout(Exception):
+    pass
+
+
+class ToolStats:
+    """Per-tool counters plus recent queue/exec latencies (milliseconds); updated from loop and pool threads."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.running = 0
+        self.queue_ms = deque(maxlen=window)
+        self.exec_ms = deque(maxlen=window)
+
+    def submitted(self):
+        with self._lock:
+            self.calls += 1
+            self.waiting += 1
+
+    def started(self, queue_ms: float):
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+            self.queue_ms.append(queue_ms)
+
+    def finished(self, exec_ms: float):
+        with self._lock:
+            self.running -= 1
+            self.exec_ms.append(exec_ms)
+
+    def count(self, name: str, never_started: bool = False):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            if never_started:
+                self.waiting -= 1
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(values)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+        return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 2)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "timeouts": self.timeouts,
+                    "waiting": self.waiting, "running": self.running,
+                    "queue_ms": self._percentiles(self.queue_ms), "exec_ms": self._percentiles(self.exec_ms)}
+
+
+class ToolExecutor:
+    """
+    Runs MCP tool bodies off the server's event loop. Each tool has its own concurrency limit and
+    timeout; blocking work goes to one bounded thread pool. Queue time (waiting for a tool slot and
+    a pool thread) and execution time are recorded separately, so saturation shows up as queue time.
+    A timed-out call is answered immediately but keeps its slot until its thread actually finishes,
+    so the limit always bounds the threads really in use.
+    """
+
+    def __init__(self, max_workers: int = 16, default_concurrency: int = 8, default_timeout: float = 20.0,
+                 tools: Optional[Dict[str, dict]] = None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        self.default_concurrency = default_concurrency
+        self.default_timeout = default_timeout
+        self.tool_config = tools or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, ToolStats] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ToolExecutor":
+        cfg = config.get("mcp_server", {})
+        return cls(max_workers=cfg.get("max_workers", 16), default_concurrency=cfg.get("default_concurrency", 8),
+                   default_timeout=cfg.get("default_timeout_seconds", 20.0), tools=cfg.get("tools"))
+
+    def _slot(self, tool: str):
+        # semaphores and stats are only created on the event loop thread
+        if tool not in self._semaphores:
+            limit = self.tool_config.get(tool, {}).get("concurrency", self.default_concurrency)
+            self._semaphores[tool] = asyncio.Semaphore(limit)
+            self._stats[tool] = ToolStats()
+        return self._semaphores[tool], self._stats[tool]
+
+    def timeout(self, tool: str) -> float:
+        return self.tool_config.get(tool, {}).get("timeout_seconds", self.default_timeout)
+
+    async def _acquire(self, tool: str, semaphore: asyncio.Semaphore, stats: ToolStats, timeout: float):
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            stats.count("timeouts", never_started=True)
+            log.warning("MCP tool timed out waiting for a slot", tool=tool, timeout=timeout)
+            raise ToolTimeout(f"{tool} timed out after {timeout}s waiting for a free slot")
+
+    async def run(self, tool: str, fn: Callable, *args):
+        """Run a blocking callable in the pool under the tool's limit and timeout."""
+        semaphore, stats = self._slot(tool)
+        timeout = self.timeout(tool)
+        submitted = time.perf_counter()
+        stats.submitted()
+        await self._acquire(tool, semaphore, stats, timeout)
+
+        def execute():
+            started = time.perf_counter()
+            stats.started((started - submitted) * 1000)
+            try:
+                return fn(*args)
+            finally:
+                stats.finished((time.perf_counter() - started) * 1000)
+
+        future = asyncio.get_running_loop().run_in_executor(self.pool, execute)
+        future.add_done_callback(lambda _: semaphore.release())
+        remaining = max(timeout - (time.perf_counter() - submitted), 0.001)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            stats.count("timeouts")
+            log.warning("MCP tool timed out", tool=tool, timeout=timeout)
+            raise ToolTimeout(f"{tool} timed out after {timeout}s")
+        except Exception:
+            stats.count("errors")
+            raise
+
+    async def run_async(self, tool: str, coro_fn: Callable[..., Awaitable], *args):
+        """Run a natively async tool body under the same limit, timeout and metrics."""
+        semaphore, stats = self._slot(tool)
+        timeout = self.timeout(tool)
+        submitted = time.perf_counter()
+        stats.submitted()
+        await self._acquire(tool, semaphore, stats, timeout)
+        started = time.perf_counter()
+        stats.started((started - submitted) * 1000)
+        try:
+            return await asyncio.wait_for(coro_fn(*args), max(timeout - (started - submitted), 0.001))
+        except asyncio.TimeoutError:
+            stats.count("timeouts")
+            log.warning("MCP tool timed out", tool=tool, timeout=timeout)
+            raise ToolTimeout(f"{tool} timed out after {timeout}s")
+        except Exception:
+            stats.count("errors")
+            raise
+        finally:
+            stats.finished((time.perf_counter() - started) * 1000)
+            semaphore.release()
+
+    def stats(self) -> dict:
+        return {tool: stats.snapshot() for tool, stats in list(self._stats.items())}
+
+
+if __name__ == "__main__":
+    # Head-of-line blocking check: 32 concurrent 200 ms blocking calls, inline vs through the executor
+    async def main():
+        def blocking_call(_):
+            time.sleep(0.2)
+            return "ok"
+
+        async def inline_tool(i):
+            return blocking_call(i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(inline_tool(i) for i in range(32)))
+        print(f"blocking inside async def: {time.perf_counter() - started:.2f}s")
+
+        executor = ToolExecutor(max_workers=16, tools={"demo": {"concurrency": 16, "timeout_seconds": 5}})
+        started = time.perf_counter()
+        await asyncio.gather(*(executor.run("demo", blocking_call, i) for i in range(32)))
+        print(f"through ToolExecutor:      {time.perf_counter() - started:.2f}s")
+        print(executor.stats())
+
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable, RunnableLambda
+from prod_assistant.prompt_library.prompts import PROMPT_REGISTRY, PromptType
+from prod_assistant.utils.context_builder import count_tokens
+from prod_assistant.utils.llm_cache import llm_for_node
+
+# LLM node tag (response cache opt-in, per-node metrics) of each prompt's chain
+CHAIN_NODES: Dict[PromptType, str] = {
+    PromptType.ASSISTANT: "assistant",
+    PromptType.GRADER: "grader",
+    PromptType.REWRITER: "rewriter",
+    PromptType.PRODUCT_BOT: "generator",
+    PromptType.PRODUCT_SUMMARY: "summary",
+    PromptType.GRADE_AND_GENERATE: "grade_generate",
+}
+
+# Azure OpenAI caches prompt prefixes from this length on; shorter prefixes are always re-prefilled
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+
+class TemplateStats:
+    """Static prefix size per template version, and the rendered variable suffix size of every call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prefix_tokens: Dict[str, int] = {}
+        self.calls = defaultdict(int)
+        self.suffix_tokens = defaultdict(int)
+
+    def register(self, name: str, prefix_tokens: int):
+        with self._lock:
+            self.prefix_tokens[name] = prefix_tokens
+
+    def record(self, name: str, suffix_tokens: int):
+        with self._lock:
+            self.calls[name] += 1
+            self.suffix_tokens[name] += suffix_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, prefix in sorted(self.prefix_tokens.items()):
+                calls = self.calls[name]
+                mean_suffix = self.suffix_tokens[name] / calls if calls else 0.0
+                out[name] = {
+                    "calls": calls,
+                    "prefix_tokens": prefix,
+                    "mean_suffix_tokens": round(mean_suffix, 1),
+                    "static_share": round(prefix / (prefix + mean_suffix), 3) if calls else 0.0,
+                    "provider_cacheable": prefix >= PROVIDER_CACHE_MIN_TOKENS,
+                }
+            return out
+
+
+template_stats = TemplateStats()
+
+
+def chain_name(prompt_type: PromptType) -> str:
+    return f"{prompt_type.value}@{PROMPT_REGISTRY[prompt_type].version}"
+
+
+def build_chain(prompt_type: PromptType, llm) -> Runnable:
+    """prompt (static system prefix + variable human suffix) | llm tagged with its node | str."""
+    name = chain_name(prompt_type)
+    prefix, suffix = PROMPT_REGISTRY[prompt_type].split()
+    prompt = ChatPromptTemplate.from_messages([("system", prefix), ("human", suffix)])
+    template_stats.register(name, count_tokens(prefix))
+
+    def measure(prompt_value):
+        template_stats.record(name, sum(count_tokens(m.content) for m in prompt_value.to_messages()[1:]))
+        return prompt_value
+
+    return (prompt | RunnableLambda(measure, name="measure_prompt")
+            | llm_for_node(llm, CHAIN_NODES[prompt_type]) | StrOutputParser()).with_config(run_name=name)
+
+
+class ChainRegistry:
+    """Every registered prompt compiled once against one LLM; nodes look chains up instead of rebuilding them."""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.chains: Dict[PromptType, Runnable] = {t: build_chain(t, llm) for t in CHAIN_NODES}
+
+    def __getitem__(self, prompt_type: PromptType) -> Runnable:
+        return self.chains[prompt_type]
+
+    def versions(self) -> Dict[str, str]:
+        return {t.value: PROMPT_REGISTRY[t].version for t in self.chains}
+
+
+if __name__ == "__main__":
+    # per-call cost of rebuilding a chain vs looking up the precompiled one
+    import time
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    llm = FakeListChatModel(responses=["yes"])
+    registry = ChainRegistry(llm)
+    inputs = {"question": "Is the iPhone 15 good?", "docs": "Apple iPhone 15 (128 GB) rated 4.6"}
+
+    started = time.perf_counter()
+    for _ in range(500):
+        prefix, suffix = PROMPT_REGISTRY[PromptType.GRADER].split()
+        (ChatPromptTemplate.from_messages([("system", prefix), ("human", suffix)]) | llm | StrOutputParser()).invoke(inputs)
+    rebuilt = (time.perf_counter() - started) / 500 * 1000
+
+    started = time.perf_counter()
+    for _ in range(500):
+        registry[PromptType.GRADER].invoke(inputs)
+    precompiled = (time.perf_counter() - started) / 500 * 1000
+
+    print(f"rebuilt per call: {rebuilt:.3f} ms, precompiled: {precompiled:.3f} ms")
+    print(template_stats.stats())
@@ -1,10 +1,15 @@
 from enum import Enum
-from typing import Dict
+from typing import Dict, Tuple
 import string
 
 
 class PromptType(str, Enum):
     PRODUCT_BOT = "product_bot"
+    PRODUCT_SUMMARY = "product_summary"
+    ASSISTANT = "assistant"
+    GRADER = "grader"
+    REWRITER = "rewriter"
+    GRADE_AND_GENERATE = "grade_and_generate"
     # REVIEW_BOT = "review_bot"
     # COMPARISON_BOT = "comparison_bot"
 
@@ -27,8 +32,19 @@ class PromptTemplate:
     def required_placeholders(self):
         return [field_name for _, field_name, _, _ in string.Formatter().parse(self.template) if field_name]
 
+    def split(self) -> Tuple[str, str]:
+        """
+        (static prefix, variable suffix): the lines before the first placeholder and the rest.
+        Templates keep every placeholder at the end so the prefix is byte-identical across calls.
+        """
+        lines = [line.strip() for line in self.template.splitlines()]
+        first = next((i for i, line in enumerate(lines) if "{" in line), len(lines))
+        return "\n".join(lines[:first]).strip(), "\n".join(lines[first:]).strip()
+
 
 # Central Registry
+# Instructions come first and every placeholder last: the static prefix is sent as its own system
+# message, identical on every call, so provider-side prompt caching can reuse its prefill.
 PROMPT_REGISTRY: Dict[PromptType, PromptTemplate] = {
     PromptType.PRODUCT_BOT: PromptTemplate(
         """
@@ -36,13 +52,86 @@ PROMPT_REGISTRY: Dict[PromptType, PromptTemplate] = {
         Analyze the provided product titles, ratings, and reviews to provide accurate, helpful responses.
         Stay relevant to the context, and keep your answers concise and informative.
 
+        QUESTION: {question}
+
         CONTEXT:
         {context}
 
+        YOUR ANSWER:
+        """,
+        description="Handles ecommerce QnA & product recommendation flows",
+        version="v2"
+    ),
+    PromptType.PRODUCT_SUMMARY: PromptTemplate(
+        """
+        Summarize what customers say about the product below in at most two short sentences.
+        Mention the main strengths and any common complaint. Do not repeat the price or rating.
+
+        PRODUCT: {title}
+        REVIEWS:
+        {reviews}
+
+        SUMMARY:
+        """,
+        description="Offline per-product review summary built at ingestion time",
+        version="v2"
+    ),
+    PromptType.ASSISTANT: PromptTemplate(
+        """
+        You are a product assistant. Only return the direct, final answer to the user's question, without explanations or alternative suggestions.
+
+        User Question: {question}
+        Context: {context}
+
+        Final Answer:
+        """,
+        description="Answers non-product questions directly, without retrieval",
+        version="v2"
+    ),
+    PromptType.GRADER: PromptTemplate(
+        """
+        You are a grader. Decide whether the retrieved documents are relevant to the user's question.
+        Answer yes or no.
+
+        Question: {question}
+        Docs: {docs}
+
+        Are docs relevant to the question? Answer yes or no
+        """,
+        description="Grades retrieved context before generation",
+        version="v2"
+    ),
+    PromptType.REWRITER: PromptTemplate(
+        """
+        You are a helpful assistant that rewrites user queries to make them more specific and clear for product searches.
+        Rewrite the query in one line.
+        Only return the rewritten query — no explanations, no examples, and no lists.
+
+        Original query: {question}
+
+        Rewritten query:
+        """,
+        description="Rewrites a query whose retrieved context was graded irrelevant",
+        version="v2"
+    ),
+    PromptType.GRADE_AND_GENERATE: PromptTemplate(
+        """
+        You are an expert EcommerceBot specialized in product recommendations and handling customer queries.
+        First decide whether the provided product titles, ratings, and reviews are relevant to the question.
+        If they are, answer it from them: stay relevant to the context, and keep your answer concise and informative.
+        Reply with one JSON object and nothing else. It must have exactly these keys:
+        "relevant": true if the context is relevant to the question, otherwise false.
+        "answer": your answer to the question; when the context is not relevant, your best short answer without it.
+        "cited_titles": a list of the product Title values your answer relies on, copied exactly.
+
         QUESTION: {question}
 
-        YOUR ANSWER:
+        CONTEXT:
+        {context}
+
+        JSON:
         """,
-        description="Handles ecommerce QnA & product recommendation flows"
+        description="Single-call relevance verdict + answer + citations (fused grader and generator)",
+        version="v1"
     )
 }
@@ -0,0 +1,90 @@
+import threading
+from collections import Counter, deque
+from typing import Callable, List, Tuple
+from langchain_core.documents import Document
+
+ScoredList = List[Tuple[Document, float]]
+
+
+class AdaptiveDepth:
+    """
+    Chooses how many documents a query gets from its score distribution instead of a fixed k.
+    Candidates (AstraDB scale, (1 + cos) / 2) are kept while their cosine stays within
+    `relative_threshold` of the best one and no gap between neighbours exceeds `max_gap`.
+    Remote stores are searched once at `max_k` and cut locally, one round trip per query. Against
+    the in-process index, where a search is cheap, it starts at `initial_k` and is repeated `step`
+    deeper while every fetched candidate still qualifies.
+    """
+
+    def __init__(self, min_k: int = 2, max_k: int = 20, initial_k: int = 5, step: int = 5,
+                 relative_threshold: float = 0.85, max_gap: float = 0.08):
+        self.min_k = min_k
+        self.max_k = max(max_k, min_k)
+        self.initial_k = min(max(initial_k, min_k), self.max_k)
+        self.step = max(step, 1)
+        self.relative_threshold = relative_threshold
+        self.max_gap = max_gap
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptiveDepth":
+        cfg = config.get("retriever", {}).get("adaptive", {})
+        return cls(min_k=cfg.get("min_k", 2), max_k=cfg.get("max_k", 20), initial_k=cfg.get("initial_k", 5),
+                   step=cfg.get("step", 5), relative_threshold=cfg.get("relative_threshold", 0.85),
+                   max_gap=cfg.get("max_gap", 0.08))
+
+    def cut(self, scored: ScoredList) -> Tuple[int, str]:
+        """(depth, reason) for candidates sorted by descending score."""
+        if not scored:
+            return 0, "empty"
+        cosines = [2 * score - 1 for _, score in scored]
+        depth, reason = len(scored), "exhausted"
+        for i in range(1, len(scored)):
+            if cosines[0] > 0 and cosines[i] < cosines[0] * self.relative_threshold:
+                depth, reason = i, "relative"
+                break
+            if cosines[i - 1] - cosines[i] > self.max_gap:
+                depth, reason = i, "gap"
+                break
+        return max(min(depth, self.max_k), min(self.min_k, len(scored))), reason
+
+    def search(self, search_fn: Callable[[int], ScoredList], incremental: bool = False) -> Tuple[ScoredList, dict]:
+        k, rounds = (self.initial_k if incremental else self.max_k), 0
+        while True:
+            scored = sorted(search_fn(k), key=lambda pair: pair[1], reverse=True)
+            rounds += 1
+            depth, reason = self.cut(scored)
+            # no cut point inside a full window: deeper results may qualify as well
+            if reason == "exhausted" and len(scored) >= k and k < self.max_k:
+                k = min(k + self.step, self.max_k)
+                continue
+            return scored[:depth], {"depth": depth, "fetched_k": k, "rounds": rounds, "reason": reason}
+
+
+class DepthRecorder:
+    """Per-process record of chosen retrieval depths: histogram, cut reasons and the latest queries."""
+
+    def __init__(self, recent: int = 100):
+        self._lock = threading.Lock()
+        self.depths = Counter()
+        self.reasons = Counter()
+        self.recent = deque(maxlen=recent)
+
+    def record(self, query: str, info: dict):
+        with self._lock:
+            self.depths[info["depth"]] += 1
+            self.reasons[info["reason"]] += 1
+            self.recent.append({"query": query, **info})
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.depths.values())
+            return {
+                "queries": total,
+                "mean_depth": round(sum(d * n for d, n in self.depths.items()) / total, 2) if total else 0.0,
+                "depth_histogram": dict(sorted(self.depths.items())),
+                "reasons": dict(self.reasons),
+                "recent": list(self.recent),
+            }
+
+
+depth_recorder = DepthRecorder()
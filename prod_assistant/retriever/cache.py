@@ -0,0 +1,84 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from prod_assistant.utils.catalog_version import get_catalog_generation
+
+
+class RetrievalCache:
+    """
+    In-process LRU + TTL cache for retrieval results.
+    Keys are (normalized query, top_k, filters). Every entry is tied to the catalog generation
+    it was computed under; when ingestion bumps the generation the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600,
+                 generation_fn: Callable[[], int] = get_catalog_generation):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation_fn = generation_fn
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def make_key(self, query: str, top_k: int, filters: Optional[dict] = None) -> tuple:
+        filter_key = json.dumps(filters, sort_keys=True, default=str) if filters else ""
+        return (self.normalize_query(query), top_k, filter_key)
+
+    def _sync_generation(self):
+        generation = self.generation_fn()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: tuple):
+        with self._lock:
+            self._sync_generation()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(value)
+
+    def put(self, key: tuple, value, generation: Optional[int] = None):
+        with self._lock:
+            self._sync_generation()
+            # Results computed before a re-ingest must not land in the new generation
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+                "generation": self._generation,
+            }
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.catalog_version import active_catalog_label, generation_path
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+# "iPhone15 128GB" -> ["iphone", "15", "128", "gb"]
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+_PAREN_RE = re.compile(r"\((.*?)\)")
+# Connectivity suffixes users leave out ("Galaxy S24 Ultra 5G" is asked for as "galaxy s24 ultra")
+_NOISE_RE = re.compile(r"\b(?:[345]g|lte|volte)\b", flags=re.I)
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "with", "and", "or", "is", "are", "it", "its",
+    "what", "whats", "which", "how", "much", "me", "my", "i", "you", "can", "could", "please", "tell",
+    "show", "give", "about", "this", "that", "price", "cost", "review", "reviews", "product", "details",
+    "good", "buy", "should", "does", "do", "any",
+}
+# Tokens that turn one model into another ("iPhone 15" vs "iPhone 15 Plus")
+MODEL_QUALIFIERS = {"plus", "pro", "max", "mini", "ultra", "lite", "fe", "neo", "prime", "air", "se"}
+
+
+def tokenize(text) -> List[str]:
+    return _TOKEN_RE.findall(_NOISE_RE.sub(" ", str(text).lower()))
+
+
+def split_title(title: str):
+    """Split a catalog title into model tokens and variant attributes (colour, storage)."""
+    model, attributes = str(title), []
+    for group in _PAREN_RE.findall(model):
+        # "(Black, 128 GB)" is a variant; "(2)" in "Nothing Phone (2)" is part of the model
+        if "," in group:
+            attributes.extend(tokenize(group))
+            model = model.replace(f"({group})", " ")
+    return tokenize(model), set(attributes)
+
+
+def char_ngrams(token: str, n: int = 2) -> set:
+    padded = f"#{token}#"
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def resolver_path(label: Optional[str] = None) -> Path:
+    """Entity index file; each blue/green catalog generation gets its own `label` copy."""
+    config = load_config()
+    path = Path(config.get("entity_resolver", {}).get("path", "data/entity_index.json"))
+    if not path.is_absolute():
+        path = Path(os.getcwd()) / path
+    return generation_path(path, label)
+
+
+def active_resolver_path() -> Path:
+    return resolver_path(active_catalog_label())
+
+
+class ProductEntityResolver:
+    """
+    Resolves product names in a query to catalog product_ids.
+    Model names live in a token trie (longest match wins, so "iPhone 15 Plus" never resolves to
+    "iPhone 15"), variant attributes narrow the match, and a character n-gram index corrects
+    misspelt model words before the trie walk.
+    """
+
+    _lock = threading.Lock()
+    _loaded = {}
+
+    def __init__(self, records: Iterable[dict], fuzzy_threshold: float = 0.5, ngram_size: int = 2):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.ngram_size = ngram_size
+        self.products: Dict[str, dict] = {}
+        self.trie = {}
+        self.attribute_vocab = set()
+        self.ngram_index: Dict[str, set] = {}
+        self.vocab = set()
+
+        for record in records:
+            product_id = str(record["product_id"])
+            model_tokens, attributes = split_title(record["product_title"])
+            if not model_tokens:
+                continue
+            self.products[product_id] = {"title": record["product_title"], "attributes": attributes}
+            self.attribute_vocab |= attributes
+            self._insert(model_tokens, product_id)
+            # also reachable without the leading brand ("iphone 15" for "apple iphone 15")
+            if len(model_tokens) > 2:
+                self._insert(model_tokens[1:], product_id)
+
+        for token in self.vocab:
+            if token.isalpha() and len(token) >= 4:
+                for gram in char_ngrams(token, ngram_size):
+                    self.ngram_index.setdefault(gram, set()).add(token)
+
+    def _insert(self, tokens: List[str], product_id: str):
+        node = self.trie
+        for token in tokens:
+            self.vocab.add(token)
+            node = node.setdefault(token, {})
+        node.setdefault("$ids", [])
+        if product_id not in node["$ids"]:
+            node["$ids"].append(product_id)
+
+    @classmethod
+    def from_config(cls, records: Iterable[dict]) -> "ProductEntityResolver":
+        cfg = load_config().get("entity_resolver", {})
+        return cls(records, fuzzy_threshold=cfg.get("fuzzy_threshold", 0.5), ngram_size=cfg.get("ngram_size", 2))
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        path = path or resolver_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        records = [{"product_id": pid, "product_title": p["title"]} for pid, p in self.products.items()]
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fuzzy_threshold": self.fuzzy_threshold, "ngram_size": self.ngram_size, "records": records},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        log.info("Entity index saved", path=str(path), products=len(records))
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional["ProductEntityResolver"]:
+        """Load the live generation's resolver, reusing it until the file changes. None if absent."""
+        path = path or active_resolver_path()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with cls._lock:
+            cached = cls._loaded.get(path)
+            if cached and cached[0] == mtime_ns:
+                return cached[1]
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                resolver = cls(data.get("records", []), fuzzy_threshold=data.get("fuzzy_threshold", 0.5),
+                               ngram_size=data.get("ngram_size", 2))
+            except (ValueError, OSError, KeyError) as e:
+                log.warning("Failed to load entity index", path=str(path), error=str(e))
+                return None
+            cls._loaded[path] = (mtime_ns, resolver)
+            return resolver
+
+    def _correct(self, token: str) -> str:
+        if token in self.vocab or token in STOP_WORDS or not token.isalpha() or len(token) < 4:
+            return token
+        grams = char_ngrams(token, self.ngram_size)
+        candidates = set()
+        for gram in grams:
+            candidates |= self.ngram_index.get(gram, set())
+        best, best_score = token, 0.0
+        for candidate in candidates:
+            other = char_ngrams(candidate, self.ngram_size)
+            score = len(grams & other) / len(grams | other)
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= self.fuzzy_threshold else token
+
+    def meaningful_tokens(self, query: str) -> List[str]:
+        return [t for t in tokenize(query) if t not in STOP_WORDS]
+
+    def resolve(self, query: str) -> List[dict]:
+        """Products named in the query: [{"product_id", "title", "exact"}], empty if none is named."""
+        raw = tokenize(query)
+        tokens = [self._correct(t) for t in raw]
+        exact = tokens == raw
+
+        best_len, best_ids, best_span = 0, [], set()
+        for start in range(len(tokens)):
+            node, end = self.trie, start
+            match_end, match_ids = None, None
+            while end < len(tokens) and tokens[end] in node:
+                node = node[tokens[end]]
+                end += 1
+                if "$ids" in node:
+                    match_end, match_ids = end, node["$ids"]
+            if match_ids is None:
+                continue
+            # "iphone 15 plus" must not fall back to "iphone 15" when Plus is not in the catalog
+            if match_end < len(tokens) and tokens[match_end] in MODEL_QUALIFIERS:
+                continue
+            length = match_end - start
+            if length > best_len:
+                best_len, best_ids, best_span = length, list(match_ids), set(tokens[start:match_end])
+            elif length == best_len:
+                best_ids += [pid for pid in match_ids if pid not in best_ids]
+                best_span |= set(tokens[start:match_end])
+
+        if not best_ids:
+            return []
+
+        wanted = (set(tokens) - best_span) & self.attribute_vocab
+        narrowed = [pid for pid in best_ids if wanted <= self.products[pid]["attributes"]] if wanted else best_ids
+        ids = narrowed or best_ids
+        return [{"product_id": pid, "title": self.products[pid]["title"], "exact": exact} for pid in ids]
+
+    def resolve_ids(self, query: str) -> List[str]:
+        return [m["product_id"] for m in self.resolve(query)]
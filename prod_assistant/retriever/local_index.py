@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from prod_assistant.retriever.quantization import VectorCodec, build_codec, normalize
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.catalog_version import active_catalog_label
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+MANIFEST = "manifest.json"
+
+
+def local_index_path(label: Optional[str] = None) -> Path:
+    """Index directory; each blue/green catalog generation gets its own `label` subdirectory."""
+    config = load_config()
+    path = Path(config.get("local_index", {}).get("path", "data/vector_index"))
+    if not path.is_absolute():
+        path = Path(os.getcwd()) / path
+    return path / label if label else path
+
+
+def active_local_index_path() -> Path:
+    return local_index_path(active_catalog_label())
+
+
+class QuantizedVectorIndex:
+    """
+    In-process vector index over compressed embeddings (float16, int8 or PQ codes).
+    Search scores the query against the codes without decompressing them, then re-ranks the
+    best `rerank_candidates` with the full-precision vectors, which stay on disk and are
+    memory-mapped, so only the codes count against the worker's resident memory.
+    """
+
+    _lock = threading.Lock()
+    _loaded = {}
+
+    def __init__(self, codec: VectorCodec, rerank_candidates: int = 50):
+        self.codec = codec
+        self.rerank_candidates = rerank_candidates
+        self.encoded = None
+        self.full_vectors: Optional[np.ndarray] = None
+        self.payloads: List[dict] = []
+
+    @classmethod
+    def from_config(cls, config: dict) -> "QuantizedVectorIndex":
+        cfg = config.get("local_index", {})
+        codec = build_codec(cfg.get("codec", "int8"), pq_subspaces=cfg.get("pq_subspaces", 64),
+                            pq_centroids=cfg.get("pq_centroids", 256))
+        return cls(codec, rerank_candidates=cfg.get("rerank_candidates", 50))
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def build(self, vectors, documents: List[Document]) -> "QuantizedVectorIndex":
+        vectors = normalize(vectors)
+        self.codec.fit(vectors)
+        self.encoded = self.codec.encode(vectors)
+        self.full_vectors = vectors
+        self.payloads = [{"page_content": d.page_content, "metadata": d.metadata} for d in documents]
+        log.info("Local vector index built", vectors=len(vectors), codec=self.codec.kind,
+                 code_bytes=VectorCodec.nbytes(self.encoded))
+        return self
+
+    def search(self, query_vector, k: int = 10, rerank: bool = True) -> List[Tuple[Document, float]]:
+        if not self.payloads:
+            return []
+        query = normalize(query_vector)
+        scores = self.codec.scores(query, self.encoded)
+        n_candidates = min(len(scores), max(k, self.rerank_candidates if rerank else k))
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        if rerank and self.full_vectors is not None:
+            # exact cosine on the short list; sorted so only those rows of the memmap are paged in, in order
+            candidates = np.sort(candidates)
+            candidate_scores = np.asarray(self.full_vectors[candidates]) @ query
+        else:
+            candidate_scores = scores[candidates]
+        order = np.argsort(-candidate_scores)[:k]
+        return [(self._document(candidates[j]), float(candidate_scores[j])) for j in order]
+
+    def _document(self, i) -> Document:
+        payload = self.payloads[i]
+        return Document(page_content=payload["page_content"], metadata=payload["metadata"])
+
+    def memory_bytes(self) -> dict:
+        resident_full = 0 if isinstance(self.full_vectors, np.memmap) or self.full_vectors is None \
+            else self.full_vectors.nbytes
+        return {
+            "codes": VectorCodec.nbytes(self.encoded) if self.encoded else 0,
+            "codec_state": sum(np.asarray(v).nbytes for v in self.codec.state().values()),
+            "full_precision_resident": resident_full,
+        }
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write a new version directory, then atomically repoint the manifest at it."""
+        path = path or local_index_path()
+        version = f"v{time.time_ns()}"
+        version_dir = path / version
+        version_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(version_dir / "codes.npz", **self.encoded)
+        np.savez(version_dir / "codec.npz", **self.codec.state())
+        np.save(version_dir / "vectors.npy", np.asarray(self.full_vectors, dtype=np.float32))
+        with open(version_dir / "payloads.json", "w", encoding="utf-8") as f:
+            json.dump(self.payloads, f, ensure_ascii=False, separators=(",", ":"))
+
+        manifest = {"version": version, "codec": self.codec.kind, "count": len(self.payloads),
+                    "rerank_candidates": self.rerank_candidates}
+        tmp_path = path / (MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path / MANIFEST)
+        # readers holding an older version keep their open memmaps on POSIX
+        for old in path.glob("v*"):
+            if old.is_dir() and old.name != version:
+                shutil.rmtree(old, ignore_errors=True)
+        log.info("Local vector index saved", path=str(version_dir), count=len(self.payloads))
+        return version_dir
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional["QuantizedVectorIndex"]:
+        """Load the current version, reusing it until the manifest changes. Returns None if absent."""
+        path = path or active_local_index_path()
+        try:
+            mtime_ns = os.stat(path / MANIFEST).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with cls._lock:
+            cached = cls._loaded.get(path)
+            if cached and cached[0] == mtime_ns:
+                return cached[1]
+            try:
+                with open(path / MANIFEST, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                version_dir = path / manifest["version"]
+                index = cls(build_codec(manifest["codec"]), rerank_candidates=manifest.get("rerank_candidates", 50))
+                with np.load(version_dir / "codec.npz") as state:
+                    index.codec.load_state(dict(state))
+                with np.load(version_dir / "codes.npz") as codes:
+                    index.encoded = dict(codes)
+                index.full_vectors = np.load(version_dir / "vectors.npy", mmap_mode="r")
+                with open(version_dir / "payloads.json", "r", encoding="utf-8") as f:
+                    index.payloads = json.load(f)
+            except (ValueError, OSError, KeyError) as e:
+                log.warning("Failed to load local vector index", path=str(path), error=str(e))
+                return None
+            cls._loaded[path] = (mtime_ns, index)
+            return index
+
+
+if __name__ == "__main__":
+    # Recall-vs-memory benchmark. Uses the catalog embeddings of the built local index when present,
+    # otherwise a synthetic clustered set shaped like 1536-d text embeddings.
+    import sys
+
+    existing = QuantizedVectorIndex.load()
+    if existing is not None and len(existing) >= 50:
+        base = np.asarray(existing.full_vectors, dtype=np.float32)
+        source = f"catalog index ({len(base)} vectors)"
+    else:
+        rng = np.random.default_rng(0)
+        n, dim = int(sys.argv[1]) if len(sys.argv) > 1 else 20000, 1536
+        centers = rng.normal(size=(200, dim)).astype(np.float32)
+        base = centers[rng.integers(0, 200, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+        source = f"synthetic ({n} x {dim})"
+    base = normalize(base)
+    rng = np.random.default_rng(1)
+    queries = normalize(base[rng.choice(len(base), 100, replace=False)] +
+                        0.3 * rng.normal(size=(100, base.shape[1])).astype(np.float32) / np.sqrt(base.shape[1]) * 10)
+    k = 10
+    truth = [set(np.argsort(-(base @ q))[:k]) for q in queries]
+    docs = [Document(page_content=str(i), metadata={"i": i}) for i in range(len(base))]
+
+    print(f"Benchmark on {source}, recall@{k} over {len(queries)} queries")
+    print(f"{'codec':<10}{'rerank':<8}{'codes MiB':>10}{'x smaller':>11}{'recall':>8}{'ms/query':>10}")
+    full_bytes = base.nbytes
+    for kind in ("float32", "float16", "int8", "pq"):
+        index = QuantizedVectorIndex(build_codec(kind, pq_subspaces=96), rerank_candidates=100).build(base, docs)
+        for rerank in (False, True):
+            started = time.perf_counter()
+            found = [{d.metadata["i"] for d, _ in index.search(q, k=k, rerank=rerank)} for q in queries]
+            elapsed = (time.perf_counter() - started) / len(queries) * 1000
+            recall = np.mean([len(f & t) / k for f, t in zip(found, truth)])
+            code_bytes = index.memory_bytes()["codes"]
+            print(f"{kind:<10}{str(rerank):<8}{code_bytes / 2**20:>10.1f}{full_bytes / code_bytes:>11.1f}"
+                  f"{recall:>8.3f}{elapsed:>10.2f}")
@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import List, Optional
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.catalog_version import active_catalog_label, generation_path
+from prod_assistant.utils.context_builder import clean_review_text, REVIEW_SEPARATOR
+from prod_assistant.prompt_library.prompts import PromptType
+from prod_assistant.retriever.entity_resolver import ProductEntityResolver
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+_WORD_RE = re.compile(r"\w+")
+_PAREN_RE = re.compile(r"\(.*?\)")
+
+PRICE_WORDS = {"price", "cost", "costs", "priced"}
+REVIEW_WORDS = {"review", "reviews", "good", "worth", "rating", "rated"}
+# Open-ended questions still go through retrieval and generation
+OPEN_ENDED_WORDS = {"vs", "versus", "compare", "compared", "comparison", "best", "better", "suggest", "recommend", "cheaper"}
+
+
+def normalize_price(value) -> Optional[float]:
+    """'₹59,900' -> 59900.0"""
+    digits = re.sub(r"[^\d.]", "", str(value))
+    try:
+        return float(digits) if digits else None
+    except ValueError:
+        return None
+
+
+def normalize_count(value) -> Optional[int]:
+    """'9,461' -> 9461"""
+    digits = re.sub(r"[^\d]", "", str(value))
+    return int(digits) if digits else None
+
+
+def normalize_rating(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(str(text).lower())
+
+
+def title_aliases(title: str) -> List[str]:
+    """Full title, title without the variant in brackets, and the same without the leading brand."""
+    full = " ".join(tokenize(title))
+    base = " ".join(tokenize(_PAREN_RE.sub(" ", str(title))))
+    aliases = [full, base]
+    if len(base.split()) > 2:
+        aliases.append(base.split(" ", 1)[1])
+    return list(dict.fromkeys(a for a in aliases if a))
+
+
+def index_path(label: Optional[str] = None) -> Path:
+    """Index file; each blue/green catalog generation gets its own `label` copy."""
+    config = load_config()
+    path = Path(config.get("product_index", {}).get("path", "data/product_index.json"))
+    if not path.is_absolute():
+        path = Path(os.getcwd()) / path
+    return generation_path(path, label)
+
+
+def active_index_path() -> Path:
+    return index_path(active_catalog_label())
+
+
+class ProductIndexBuilder:
+    """Precomputes per-product facts and an LLM review summary at ingestion time."""
+
+    def __init__(self, llm=None, max_concurrency: int = 8, summary_max_chars: int = 300):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.summary_max_chars = summary_max_chars
+
+    def _fallback_summary(self, reviews: str) -> str:
+        first = reviews.split(REVIEW_SEPARATOR)[0] if reviews else ""
+        return first[:self.summary_max_chars]
+
+    def _summaries(self, rows: List[dict]) -> List[str]:
+        cleaned = [clean_review_text(r["top_reviews"]) for r in rows]
+        if self.llm is None:
+            return [self._fallback_summary(c) for c in cleaned]
+
+        from prod_assistant.prompt_library.chains import build_chain
+
+        chain = build_chain(PromptType.PRODUCT_SUMMARY, self.llm)
+        outputs = chain.batch(
+            [{"title": r["product_title"], "reviews": c} for r, c in zip(rows, cleaned)],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True,
+        )
+        summaries = []
+        for row, text, out in zip(rows, cleaned, outputs):
+            if isinstance(out, Exception) or not out.strip():
+                log.warning("Summary generation failed, using first review", product_id=row["product_id"],
+                            error=str(out) if isinstance(out, Exception) else "empty")
+                summaries.append(self._fallback_summary(text))
+            else:
+                summaries.append(" ".join(out.split())[:self.summary_max_chars])
+        return summaries
+
+    def build(self, product_data) -> dict:
+        rows = product_data.to_dict("records") if hasattr(product_data, "to_dict") else list(product_data)
+        summaries = self._summaries(rows)
+
+        products, aliases = {}, {}
+        for row, summary in zip(rows, summaries):
+            product_id = str(row["product_id"])
+            products[product_id] = {
+                "title": row["product_title"],
+                "price": normalize_price(row["price"]),
+                "price_display": str(row["price"]),
+                "rating": normalize_rating(row["rating"]),
+                "total_reviews": normalize_count(row["total_reviews"]),
+                "summary": summary,
+            }
+            for alias in title_aliases(row["product_title"]):
+                ids = aliases.setdefault(alias, [])
+                if product_id not in ids:
+                    ids.append(product_id)
+
+        log.info("Product index built", products=len(products), aliases=len(aliases))
+        return {"products": products, "aliases": aliases}
+
+    def save(self, index: dict, path: Optional[Path] = None) -> Path:
+        path = path or index_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        log.info("Product index saved", path=str(path))
+        return path
+
+
+class ProductIndex:
+    """Read side of the product index: answers price/review lookups without retrieval or generation."""
+
+    _lock = threading.Lock()
+    _loaded = {}
+
+    def __init__(self, data: dict):
+        self.products = data.get("products", {})
+        self.aliases = data.get("aliases", {})
+        self.resolver = ProductEntityResolver(
+            {"product_id": pid, "product_title": p["title"]} for pid, p in self.products.items()
+        )
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional["ProductIndex"]:
+        """Load the live generation's index, reusing the parsed copy until the file changes. None if absent."""
+        path = path or active_index_path()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with cls._lock:
+            cached = cls._loaded.get(path)
+            if cached and cached[0] == mtime_ns:
+                return cached[1]
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    index = cls(json.load(f))
+            except (ValueError, OSError) as e:
+                log.warning("Failed to load product index", path=str(path), error=str(e))
+                return None
+            cls._loaded[path] = (mtime_ns, index)
+            return index
+
+    def get(self, product_id) -> Optional[dict]:
+        return self.products.get(str(product_id))
+
+    def summary_for(self, product_id) -> Optional[str]:
+        entry = self.get(product_id)
+        return entry.get("summary") if entry else None
+
+    def match(self, query: str) -> List[dict]:
+        """Products named in the query, via an exact alias or the entity resolver."""
+        ids = self.aliases.get(" ".join(tokenize(query)))
+        if not ids:
+            # only exact model matches; a fuzzy guess is not enough to answer without retrieval
+            ids = [m["product_id"] for m in self.resolver.resolve(query) if m["exact"]]
+        return [dict(self.products[pid], product_id=pid) for pid in ids if pid in self.products]
+
+    def answer(self, query: str) -> Optional[str]:
+        """Direct answer for "price of X" / "reviews of X" / "is X good", or None to fall through."""
+        query_tokens = set(tokenize(query))
+        wants_price = bool(query_tokens & PRICE_WORDS)
+        wants_reviews = bool(query_tokens & REVIEW_WORDS)
+        if not (wants_price or wants_reviews) or query_tokens & OPEN_ENDED_WORDS:
+            return None
+        matches = self.match(query)
+        if not matches:
+            return None
+
+        entry = matches[0]
+        parts = []
+        if wants_price:
+            prices = {m["price_display"] for m in matches}
+            if len(prices) == 1:
+                parts.append(f"{entry['title']} is priced at {entry['price_display']}.")
+            else:
+                parts.append("; ".join(f"{m['title']}: {m['price_display']}" for m in matches[:3]) + ".")
+        if wants_reviews:
+            if entry.get("rating") is not None:
+                reviews = f" from {entry['total_reviews']:,} reviews" if entry.get("total_reviews") else ""
+                subject = "It" if wants_price else entry["title"]
+                parts.append(f"{subject} is rated {entry['rating']}/5{reviews}.")
+            if entry.get("summary"):
+                parts.append(entry["summary"])
+        return " ".join(parts)
@@ -0,0 +1,259 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _chunked_dot(codes: np.ndarray, query: np.ndarray, chunk_size: int = 1024) -> np.ndarray:
+    # widen to float32 a cache-sized chunk at a time; the full-precision matrix is never materialised
+    out = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), chunk_size):
+        out[start:start + chunk_size] = codes[start:start + chunk_size].astype(np.float32) @ query
+    return out
+
+
+class VectorCodec:
+    """
+    Compressed vector representation. encode() returns a dict of arrays; scores() computes
+    query-vs-code inner products directly on the compressed form (asymmetric distance).
+    """
+
+    kind = "base"
+
+    def fit(self, vectors: np.ndarray) -> "VectorCodec":
+        return self
+
+    def encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def decode(self, encoded: Dict[str, np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+    def scores(self, query: np.ndarray, encoded: Dict[str, np.ndarray]) -> np.ndarray:
+        return self.decode(encoded) @ query
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        pass
+
+    @staticmethod
+    def nbytes(encoded: Dict[str, np.ndarray]) -> int:
+        return sum(a.nbytes for a in encoded.values())
+
+
+class Float32Codec(VectorCodec):
+    kind = "float32"
+
+    def encode(self, vectors):
+        return {"codes": np.asarray(vectors, dtype=np.float32)}
+
+    def decode(self, encoded):
+        return encoded["codes"]
+
+
+class Float16Codec(VectorCodec):
+    kind = "float16"
+
+    def encode(self, vectors):
+        return {"codes": np.asarray(vectors, dtype=np.float16)}
+
+    def decode(self, encoded):
+        return encoded["codes"].astype(np.float32)
+
+    def scores(self, query, encoded):
+        return _chunked_dot(encoded["codes"], query)
+
+
+class Int8Codec(VectorCodec):
+    """Symmetric scalar quantization with one float32 scale per vector; needs no training."""
+
+    kind = "int8"
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=-1), 1e-12) / 127.0
+        codes = np.clip(np.rint(vectors / scales[..., None]), -127, 127).astype(np.int8)
+        return {"codes": codes, "scales": scales.astype(np.float32)}
+
+    def decode(self, encoded):
+        return encoded["codes"].astype(np.float32) * encoded["scales"][..., None]
+
+    def scores(self, query, encoded):
+        return _chunked_dot(encoded["codes"], query) * encoded["scales"]
+
+
+class PQCodec(VectorCodec):
+    """
+    Product quantization: the vector is split into `subspaces` chunks, each replaced by the id of
+    its nearest of `n_centroids` k-means centroids (one byte per chunk).
+    """
+
+    kind = "pq"
+
+    def __init__(self, subspaces: int = 64, n_centroids: int = 256, iterations: int = 20,
+                 train_size: int = 20000, seed: int = 0):
+        self.subspaces = subspaces
+        self.n_centroids = n_centroids
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None  # (subspaces, n_centroids, sub_dim)
+        self.dim = None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        sub_dim = self.centroids.shape[2] if self.centroids is not None else -(-vectors.shape[1] // self.subspaces)
+        padded = sub_dim * self.subspaces
+        if vectors.shape[1] < padded:
+            vectors = np.pad(vectors, ((0, 0), (0, padded - vectors.shape[1])))
+        return vectors.reshape(len(vectors), self.subspaces, sub_dim)
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (points ** 2).sum(1)[:, None] - 2 * points @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        return distances.argmin(axis=1)
+
+    def fit(self, vectors):
+        rng = np.random.default_rng(self.seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.dim = vectors.shape[1]
+        if len(vectors) > self.train_size:
+            vectors = vectors[rng.choice(len(vectors), self.train_size, replace=False)]
+        chunks = self._split(vectors)
+        k = min(self.n_centroids, len(vectors))
+        centroids = np.empty((self.subspaces, k, chunks.shape[2]), dtype=np.float32)
+        for m in range(self.subspaces):
+            points = chunks[:, m, :]
+            center = points[rng.choice(len(points), k, replace=False)]
+            for _ in range(self.iterations):
+                assign = self._nearest(points, center)
+                counts = np.bincount(assign, minlength=k)
+                sums = np.zeros_like(center)
+                np.add.at(sums, assign, points)
+                filled = counts > 0
+                center[filled] = sums[filled] / counts[filled, None]
+            centroids[m] = center
+        self.centroids = centroids
+        return self
+
+    def encode(self, vectors):
+        chunks = self._split(vectors)
+        codes = np.empty((len(chunks), self.subspaces), dtype=np.uint8)
+        for m in range(self.subspaces):
+            codes[:, m] = self._nearest(chunks[:, m, :], self.centroids[m])
+        return {"codes": codes}
+
+    def decode(self, encoded):
+        codes = encoded["codes"]
+        parts = [self.centroids[m][codes[:, m]] for m in range(self.subspaces)]
+        return np.concatenate(parts, axis=1)[:, :self.dim]
+
+    def scores(self, query, encoded):
+        # one lookup table of query-chunk x centroid products per subspace, then gather-and-sum
+        table = np.einsum("md,mkd->mk", self._split(query[None, :])[0], self.centroids)
+        return table[np.arange(self.subspaces), encoded["codes"]].sum(axis=1)
+
+    def state(self):
+        return {"centroids": self.centroids, "dim": np.array(self.dim)}
+
+    def load_state(self, state):
+        self.centroids = state["centroids"]
+        self.subspaces, self.n_centroids = self.centroids.shape[:2]
+        self.dim = int(state["dim"])
+
+
+def build_codec(kind: str, **options) -> VectorCodec:
+    kind = kind.lower()
+    if kind == "float32":
+        return Float32Codec()
+    if kind == "float16":
+        return Float16Codec()
+    if kind == "int8":
+        return Int8Codec()
+    if kind == "pq":
+        return PQCodec(subspaces=options.get("pq_subspaces", 64), n_centroids=options.get("pq_centroids", 256))
+    raise ValueError(f"Unsupported vector codec: {kind}")
+
+
+class QuantizedEmbeddingCache:
+    """LRU cache of text embeddings kept in compressed form (float16 or int8, no training needed)."""
+
+    def __init__(self, max_entries: int = 4096, codec: str = "float16"):
+        if codec not in ("float16", "int8"):
+            raise ValueError("Embedding cache codec must be float16 or int8")
+        self.max_entries = max_entries
+        self.codec = build_codec(codec)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            encoded = self._entries.get(self.key(text))
+            if encoded is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(self.key(text))
+            self.hits += 1
+        return self.codec.decode({k: v[None] for k, v in encoded.items()})[0].tolist()
+
+    def put(self, text: str, vector: List[float]):
+        encoded = {k: v[0] for k, v in self.codec.encode(np.asarray([vector], dtype=np.float32)).items()}
+        with self._lock:
+            self._entries[self.key(text)] = encoded
+            self._entries.move_to_end(self.key(text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "bytes": sum(VectorCodec.nbytes(e) for e in self._entries.values()),
+                "codec": self.codec.kind,
+            }
+
+
+class CachingEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from a QuantizedEmbeddingCache."""
+
+    def __init__(self, base: Embeddings, cache: QuantizedEmbeddingCache):
+        self.base = base
+        self.cache = cache
+
+    # some providers embed queries and documents differently, so they are cached apart
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self.cache.get("doc:" + t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self.base.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                self.cache.put("doc:" + texts[i], vector)
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get("query:" + text)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put("query:" + text, vector)
+        return vector
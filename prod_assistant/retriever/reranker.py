@@ -0,0 +1,143 @@
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from prod_assistant.retriever.entity_resolver import STOP_WORDS, tokenize
+from prod_assistant.retriever.product_index import normalize_count, normalize_rating
+
+FEATURES = ("similarity", "title_match", "rating", "review_count")
+DEFAULT_WEIGHTS = {"similarity": 0.55, "title_match": 0.25, "rating": 0.1, "review_count": 0.1}
+
+ScoredDocs = Sequence[Tuple[Document, Optional[float]]]
+
+
+def _number(value, parse):
+    # metadata holds scraped strings ("9,461") or native numbers from the typed catalog
+    if isinstance(value, (int, float)):
+        return None if isinstance(value, float) and math.isnan(value) else value
+    return parse(value)
+
+
+@lru_cache(maxsize=4096)
+def _title_tokens(title: str) -> frozenset:
+    return frozenset(tokenize(title))
+
+
+class FeatureReranker:
+    """
+    CPU reranker between retrieval and generation. Each candidate gets a weighted score over
+    embedding similarity, query/title token overlap, rating and review count; the best `top_n`
+    at or above `min_score` are kept. Features a candidate lacks (no title, no rating, no vector
+    score) are left out of its weighted average instead of counting as zero.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, top_n: int = 5,
+                 min_score: float = 0.3, min_keep: int = 1):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = np.array([weights[f] for f in FEATURES], dtype=np.float32)
+        self.top_n = top_n
+        self.min_score = min_score
+        self.min_keep = min_keep
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FeatureReranker":
+        cfg = config.get("reranker", {})
+        return cls(weights=cfg.get("weights"), top_n=cfg.get("top_n", 5),
+                   min_score=cfg.get("min_score", 0.3), min_keep=cfg.get("min_keep", 1))
+
+    @staticmethod
+    def _query_terms(query: str) -> set:
+        return {t for t in tokenize(query) if t not in STOP_WORDS}
+
+    def features(self, query: str, candidates: ScoredDocs):
+        """(values, available) matrices of shape (n_candidates, n_features)."""
+        terms = self._query_terms(query)
+        values = np.zeros((len(candidates), len(FEATURES)), dtype=np.float32)
+        available = np.zeros_like(values, dtype=bool)
+        counts = []
+        for i, (doc, score) in enumerate(candidates):
+            meta = doc.metadata or {}
+            if score is not None:
+                # AstraDB cosine scores are (1 + cos) / 2; the feature is the cosine, floored at 0
+                values[i, 0], available[i, 0] = max(0.0, 2 * score - 1), True
+            title = meta.get("product_title")
+            if title and terms:
+                values[i, 1] = len(terms & _title_tokens(str(title))) / len(terms)
+                available[i, 1] = True
+            rating = _number(meta.get("rating"), normalize_rating)
+            if rating is not None and not math.isnan(rating):
+                values[i, 2], available[i, 2] = min(rating, 5.0) / 5.0, True
+            counts.append(_number(meta.get("total_reviews"), normalize_count))
+        # review counts are log-scaled against the most-reviewed candidate
+        known = [c for c in counts if c is not None]
+        top = math.log1p(max(known)) if known and max(known) > 0 else None
+        for i, count in enumerate(counts):
+            if count is not None and top:
+                values[i, 3], available[i, 3] = math.log1p(count) / top, True
+        return values, available
+
+    def score(self, query: str, candidates: ScoredDocs) -> np.ndarray:
+        if not candidates:
+            return np.zeros(0, dtype=np.float32)
+        values, available = self.features(query, candidates)
+        weights = self.weights * available
+        totals = weights.sum(axis=1)
+        return np.where(totals > 0, (values * weights).sum(axis=1) / np.maximum(totals, 1e-9), 0.0)
+
+    def _select(self, candidates: ScoredDocs, scores: np.ndarray, top_n: Optional[int] = None) -> List[Document]:
+        order = np.argsort(-scores, kind="stable")
+        keep = [i for i in order[:top_n or self.top_n] if scores[i] >= self.min_score]
+        if len(keep) < self.min_keep:
+            keep = list(order[:self.min_keep])
+        return [candidates[i][0] for i in keep]
+
+    def rerank(self, query: str, candidates: ScoredDocs, top_n: Optional[int] = None) -> List[Document]:
+        return self._select(candidates, self.score(query, candidates), top_n)
+
+    def rerank_batch(self, queries: List[str], candidate_lists: List[ScoredDocs],
+                     top_n: Optional[int] = None) -> List[List[Document]]:
+        """Rerank many queries; features are stacked so the weighting is one vectorised pass."""
+        blocks = [self.features(q, c) for q, c in zip(queries, candidate_lists)]
+        if not any(len(c) for c in candidate_lists):
+            return [[] for _ in queries]
+        values = np.concatenate([b[0] for b in blocks])
+        weights = self.weights * np.concatenate([b[1] for b in blocks])
+        totals = weights.sum(axis=1)
+        scores = np.where(totals > 0, (values * weights).sum(axis=1) / np.maximum(totals, 1e-9), 0.0)
+        results, offset = [], 0
+        for candidates in candidate_lists:
+            results.append(self._select(candidates, scores[offset:offset + len(candidates)], top_n) if candidates else [])
+            offset += len(candidates)
+        return results
+
+
+if __name__ == "__main__":
+    # Latency benchmark on catalog-shaped candidates
+    import time
+    import random
+
+    random.seed(0)
+    titles = ["Apple iPhone 15 (Black, 128 GB)", "SAMSUNG Galaxy S24 5G (Onyx Black, 256 GB)",
+              "Google Pixel 9 (Obsidian, 256 GB)", "OnePlus 12 (Silky Black, 256 GB)",
+              "Motorola Edge 50 Fusion (Marshmallow Blue, 128 GB)"]
+    pool = [Document(page_content="review text " * 20,
+                     metadata={"product_title": random.choice(titles), "rating": f"{random.uniform(3.5, 4.8):.1f}",
+                               "total_reviews": f"{random.randint(10, 200000):,}", "price": "₹59,900"})
+            for _ in range(1000)]
+    reranker = FeatureReranker()
+    query = "iphone 15 camera and battery reviews"
+
+    for n_candidates in (10, 20, 50, 200):
+        candidates = [(doc, random.uniform(0.7, 0.95)) for doc in pool[:n_candidates]]
+        rounds = 500
+        started = time.perf_counter()
+        for _ in range(rounds):
+            reranker.rerank(query, candidates)
+        per_query = (time.perf_counter() - started) / rounds * 1e6
+        print(f"{n_candidates:>4} candidates: {per_query:8.1f} us/query")
+
+    batch = [[(doc, random.uniform(0.7, 0.95)) for doc in random.sample(pool, 20)] for _ in range(64)]
+    started = time.perf_counter()
+    reranker.rerank_batch([query] * len(batch), batch)
+    print(f"batch of {len(batch)} x 20 candidates: {(time.perf_counter() - started) * 1000:.2f} ms")
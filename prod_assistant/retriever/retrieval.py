@@ -1,18 +1,71 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from langchain_astradb import AstraDBVectorStore
-from typing import List
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 from prod_assistant.utils.config_loader import load_config
 from prod_assistant.utils.model_loader import ModelLoader
+from prod_assistant.logger import GLOBAL_LOGGER as log
+from prod_assistant.retriever.cache import RetrievalCache
+from prod_assistant.retriever.entity_resolver import ProductEntityResolver
+from prod_assistant.retriever.local_index import QuantizedVectorIndex, local_index_path
+from prod_assistant.retriever.quantization import CachingEmbeddings, QuantizedEmbeddingCache
+from prod_assistant.retriever.sharding import ShardRouter, ShardedCatalog, shard_collection_name
+from prod_assistant.retriever.reranker import FeatureReranker
+from prod_assistant.retriever.adaptive_depth import AdaptiveDepth, depth_recorder
+from prod_assistant.utils.catalog_version import active_catalog_label, catalog_collection_name, get_catalog_generation
+from prod_assistant.utils.single_flight import SingleFlight
 from dotenv import load_dotenv
 
+# module level: a Retriever is built per request, coalescing has to span all of them
+_retrieval_flight = SingleFlight("retriever")
+
+# the API builds a Retriever per request: the caches are process-wide so hits (and cache warming) carry over
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def _shared_cache(name: str, factory):
+    with _shared_caches_lock:
+        if name not in _shared_caches:
+            _shared_caches[name] = factory()
+        return _shared_caches[name]
+
 class Retriever:
     def __init__(self):
         self.model_loader = ModelLoader()
         self.config = load_config()
         self.load_env_variables()
+        self.embeddings = None
         self.vstore = None
         self.retriever = None
+        self.sharded = None
+        self.catalog_label = None
+        self._load_lock = threading.Lock()
+        self.cache = self._build_cache()
+        self.reranker = FeatureReranker.from_config(self.config) \
+            if self.config.get("reranker", {}).get("enabled", False) else None
+        self.adaptive = AdaptiveDepth.from_config(self.config) \
+            if self.config.get("retriever", {}).get("adaptive", {}).get("enabled", False) else None
+
+    def _build_cache(self):
+        cache_cfg = self.config.get("retriever", {}).get("cache", {})
+        if not cache_cfg.get("enabled", True):
+            return None
+        return _shared_cache("retrieval", lambda: RetrievalCache(
+            max_entries=cache_cfg.get("max_entries", 1024),
+            ttl_seconds=cache_cfg.get("ttl_seconds", 600),
+        ))
+
+    def _wrap_embeddings(self, embeddings):
+        cache_cfg = self.config.get("retriever", {}).get("embedding_cache", {})
+        if not cache_cfg.get("enabled", True):
+            return embeddings
+        cache = _shared_cache("embedding", lambda: QuantizedEmbeddingCache(
+            max_entries=cache_cfg.get("max_entries", 4096), codec=cache_cfg.get("codec", "float16")))
+        return CachingEmbeddings(embeddings, cache)
 
     def load_env_variables(self):
         load_dotenv()
@@ -28,28 +81,253 @@ class Retriever:
         self.db_application_token = os.getenv("ASTRA_DB_APPLICATION_TOKEN")
         self.db_keyspace = os.getenv("ASTRA_DB_KEYSPACE")
 
+    def top_k(self) -> int:
+        return self.config.get("retriever", {}).get("top_k", 3)
+
+    def candidate_k(self) -> int:
+        # retrieve wide when a reranker narrows the list afterwards
+        if self.reranker:
+            return max(self.top_k(), self.config.get("reranker", {}).get("candidate_k", 20))
+        return self.top_k()
+
+    def batch_max_concurrency(self) -> int:
+        return self.config.get("batch", {}).get("max_concurrency", 8)
+
+    def _vector_store(self, collection_name:str):
+        return AstraDBVectorStore(
+            embedding=self.embeddings,
+            collection_name=collection_name,
+            api_endpoint=self.db_api_endpoint,
+            token=self.db_application_token,
+            namespace=self.db_keyspace
+        )
+
     def load_retriever(self):
-        if not self.vstore:
-            collection_name = self.config["astra_db"]["collection_name"]
-
-            self.vstore = AstraDBVectorStore(
-                embedding=self.model_loader.load_embeddings(),
-                collection_name=collection_name,
-                api_endpoint=self.db_api_endpoint,
-                token=self.db_application_token,
-                namespace=self.db_keyspace
-            )
-        if not self.retriever:
-            top_k = self.config.get("retriever", {}).get("top_k", 3)
-            retriever = self.vstore.as_retriever(search_kwargs={"k":top_k})
-            print("Retriver loaded successfully")
-            return retriever
-
-    def call_retriever(self,query):
-        retriever = self.load_retriever()
-        output = retriever.invoke(query)
+        with self._load_lock:
+            label = active_catalog_label()
+            if self.vstore is None or label != self.catalog_label:
+                if self.vstore is not None:
+                    # a refresh published a new index generation (or rolled back): later calls use it,
+                    # searches already running finish on the stores they hold
+                    log.info("Switching catalog generation", previous=self.catalog_label, label=label)
+                if self.embeddings is None:
+                    self.embeddings = self._wrap_embeddings(self.model_loader.load_embeddings())
+                # stores are swapped by assignment, so concurrent callers see the old or the new set, never None
+                vstore = self._vector_store(catalog_collection_name(self.config, label))
+                self.catalog_label = label
+                self.sharded = self._build_sharded_catalog() \
+                    if self.config.get("sharding", {}).get("enabled", False) else None
+                self.vstore = vstore
+                self.retriever = vstore.as_retriever(search_kwargs={"k":self.top_k()})
+                log.info("Retriever loaded successfully", label=label)
+            return self.retriever
+
+    def _build_sharded_catalog(self) -> ShardedCatalog:
+        collection_name = catalog_collection_name(self.config, self.catalog_label)
+        log.info("Sharded catalog enabled", shards=ShardRouter.from_config(self.config).names)
+        return ShardedCatalog(
+            ShardRouter.from_config(self.config),
+            store_factory=lambda shard: self._vector_store(shard_collection_name(collection_name, shard)),
+            embeddings=self.embeddings,
+            max_workers=self.config.get("sharding", {}).get("max_workers", 4),
+            use_local_index=self.config.get("local_index", {}).get("enabled", False),
+            local_index_root=lambda label=self.catalog_label: local_index_path(label),
+        )
+
+    def call_retriever(self,query, filters:Optional[dict]=None):
+        key = self.cache.make_key(query, self.top_k(), filters) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if key is None or not self.config.get("single_flight", {}).get("retriever", True):
+            return self._retrieve(query, filters, key)
+        # identical queries already being retrieved wait for that result instead of searching again
+        return list(_retrieval_flight.do(key, lambda: self._retrieve(query, filters, key)))
+
+    def _retrieve(self, query, filters:Optional[dict], key):
+        generation = get_catalog_generation()
+        self.load_retriever()
+        output = None if filters else self.exact_product_lookup(query)
+        if not output:
+            output = self._rank(query, self._scored_search(query, filters))
+        if key:
+            self.cache.put(key, output, generation=generation)
         return output
 
+    def resolve_products(self, query:str)->List[dict]:
+        if not self.config.get("entity_resolver", {}).get("enabled", True):
+            return []
+        resolver = ProductEntityResolver.load()
+        return resolver.resolve(query) if resolver else []
+
+    def exact_product_lookup(self, query:str)->List[Document]:
+        """
+        When the query names catalog products, fetch exactly those by product_id with a metadata
+        lookup instead of embedding the query and running a vector search.
+        """
+        max_exact = self.config.get("entity_resolver", {}).get("max_exact_products", 5)
+        # only exact model matches, as in ProductIndex.match: a fuzzy guess must not skip the vector search
+        matches = [m for m in self.resolve_products(query) if m["exact"]]
+        ids = [m["product_id"] for m in matches]
+        if not ids or len(ids) > max_exact:
+            return []
+        self.load_retriever()
+        # variants folded into another document at ingestion are found through variant_ids
+        id_filter = {"$or": [{"product_id": {"$in": ids}}, {"variant_ids": {"$in": ids}}]}
+        try:
+            if self.sharded is not None:
+                docs = self.sharded.metadata_search(id_filter, n=len(ids), titles=[m["title"] for m in matches])
+            else:
+                docs = self.vstore.metadata_search(filter=id_filter, n=len(ids))
+        except Exception as e:
+            log.warning("Exact product lookup failed, using vector search", error=str(e))
+            return []
+        # interaction docs carry no product_id, so only catalog docs come back
+        log.info("Resolved query to catalog products", query=query, product_ids=ids, found=len(docs))
+        return docs
+
+    def local_index(self) -> Optional[QuantizedVectorIndex]:
+        # with sharding on, local indexes are per shard and searched through the sharded catalog
+        if not self.config.get("local_index", {}).get("enabled", False) or self.sharded is not None:
+            return None
+        return QuantizedVectorIndex.load(local_index_path(self.catalog_label))
+
+    def _scored_search(self, query: str, filters: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """(document, score) candidates, scores on AstraDB's (1 + cos) / 2 scale."""
+        if self.adaptive is not None:
+            local_index = None if filters else self.local_index()
+            return self._adaptive_scored(self.embeddings.embed_query(query), query, local_index, filters)
+        k = self.candidate_k()
+        if self.sharded is not None:
+            return self.sharded.search_with_scores(query, k=k, filters=filters)
+        local_index = None if filters else self.local_index()
+        if local_index is not None:
+            return self._local_scored(local_index, self.embeddings.embed_query(query), k)
+        return self.vstore.similarity_search_with_score(query, k=k, filter=filters)
+
+    def _scored_search_by_vector(self, vector, query: str, local_index=None, k: Optional[int] = None,
+                                 filters: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        k = k or self.candidate_k()
+        if self.sharded is not None:
+            return self.sharded.search_with_scores_by_vector(vector, query, k=k, filters=filters)
+        if local_index is not None:
+            return self._local_scored(local_index, vector, k)
+        return self.vstore.similarity_search_with_score_by_vector(vector, k=k, filter=filters)
+
+    def _adaptive_scored(self, vector, query: str, local_index=None,
+                         filters: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        # the query is embedded once; only the in-process index is searched again in deeper rounds,
+        # AstraDB and the shards get a single max_k search that is cut locally
+        scored, info = self.adaptive.search(
+            lambda k: self._scored_search_by_vector(vector, query, local_index, k=k, filters=filters),
+            incremental=local_index is not None and self.sharded is None)
+        depth_recorder.record(query, info)
+        log.info("Adaptive retrieval depth", query=query, **info)
+        return scored
+
+    @staticmethod
+    def _local_scored(index: QuantizedVectorIndex, vector, k: int) -> List[Tuple[Document, float]]:
+        return [(doc, (1 + score) / 2) for doc, score in index.search(vector, k=k)]
+
+    def _rank(self, query: str, scored: List[Tuple[Document, float]]) -> List[Document]:
+        if self.reranker is None:
+            return [doc for doc, _ in scored]
+        started = time.perf_counter()
+        docs = self.reranker.rerank(query, scored, top_n=self._rerank_top_n())
+        log.debug("Reranked candidates", candidates=len(scored), kept=len(docs),
+                  rerank_ms=round((time.perf_counter() - started) * 1000, 3))
+        return docs
+
+    def _rerank_top_n(self) -> Optional[int]:
+        # adaptive depth already sized each list; the reranker then only reorders and applies min_score
+        return self.adaptive.max_k if self.adaptive is not None else None
+
+    def depth_stats(self)->dict:
+        return depth_recorder.stats() if self.adaptive is not None else {}
+
+    def cache_stats(self)->dict:
+        return self.cache.stats() if self.cache else {}
+
+    def embedding_cache_stats(self)->dict:
+        return self.embeddings.cache.stats() if isinstance(self.embeddings, CachingEmbeddings) else {}
+
+    def retrieve_batch(self, queries: List[str], max_concurrency: Optional[int] = None) -> List[dict]:
+        """
+        Retrieve documents for many queries at once.
+        Queries naming catalog products are answered by exact lookup, as in call_retriever; the rest
+        are embedded in a single bulk call, then the vector searches run concurrently.
+        Returns one {"query", "result", "error"} dict per query, in input order.
+        """
+        self.load_retriever()
+        queries = list(queries)
+        results = [{"query": q, "result": None, "error": None} for q in queries]
+        top_k = self.top_k()
+
+        # Serve cache hits first; only misses are embedded and searched
+        misses = []
+        for item in results:
+            cached = self.cache.get(self.cache.make_key(item["query"], top_k)) if self.cache else None
+            if cached is not None:
+                item["result"] = cached
+            else:
+                misses.append(item)
+        if not misses:
+            return results
+
+        generation = get_catalog_generation()
+        max_workers = max(1, min(max_concurrency or self.batch_max_concurrency(), len(misses)))
+        # same path as call_retriever: queries naming catalog products skip embedding and vector search
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            exact = list(pool.map(self.exact_product_lookup, [item["query"] for item in misses]))
+        for item, docs in zip(misses, exact):
+            if docs:
+                item["result"] = docs
+                if self.cache:
+                    self.cache.put(self.cache.make_key(item["query"], top_k), docs, generation=generation)
+        misses = [item for item in misses if item["result"] is None]
+        if not misses:
+            return results
+
+        try:
+            vectors = self.embeddings.embed_documents([item["query"] for item in misses])
+        except Exception as e:
+            log.error("Bulk query embedding failed", count=len(misses), error=str(e))
+            for item in misses:
+                item["error"] = f"Embedding failed: {e}"
+            return results
+
+        local_index = self.local_index()
+        max_workers = min(max_workers, len(misses))
+        searched, candidate_lists = [], []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            search = self._adaptive_scored if self.adaptive is not None else self._scored_search_by_vector
+            futures = [pool.submit(search, v, item["query"], local_index)
+                       for v, item in zip(vectors, misses)]
+            for item, future in zip(misses, futures):
+                try:
+                    candidate_lists.append(future.result())
+                    searched.append(item)
+                except Exception as e:
+                    log.warning("Vector search failed in batch", query=item["query"], error=str(e))
+                    item["error"] = str(e)
+
+        # one reranking pass over every query's candidates
+        if self.reranker is not None:
+            ranked = self.reranker.rerank_batch([item["query"] for item in searched], candidate_lists,
+                                                top_n=self._rerank_top_n())
+        else:
+            ranked = [[doc for doc, _ in scored] for scored in candidate_lists]
+        for item, docs in zip(searched, ranked):
+            item["result"] = docs
+            if self.cache:
+                self.cache.put(self.cache.make_key(item["query"], top_k), docs, generation=generation)
+
+        log.info("Batch retrieval finished", count=len(queries),
+                 failed=sum(1 for item in results if item["error"]))
+        return results
+
 if __name__=='__main__':
     retriver_obj = Retriever()
     user_query = "Can you suggest good budget iphone?"
@@ -0,0 +1,121 @@
+import heapq
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from prod_assistant.retriever.entity_resolver import tokenize
+from prod_assistant.retriever.local_index import QuantizedVectorIndex, active_local_index_path
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class ShardRouter:
+    """
+    Maps catalog products and queries to shards. Each shard is named by a list of brand/category
+    keywords; a product belongs to the shard of the first keyword in its title, and a query is
+    routed to every shard it names (or to all shards when it names none).
+    """
+
+    def __init__(self, shards: Dict[str, List[str]], default_shard: str = "other"):
+        self.default_shard = default_shard
+        self.keyword_shard = {}
+        for name, keywords in shards.items():
+            for keyword in keywords:
+                self.keyword_shard.setdefault(keyword.lower(), name)
+        self.names = list(dict.fromkeys(list(shards) + [default_shard]))
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ShardRouter":
+        cfg = config.get("sharding", {})
+        return cls(cfg.get("shards", {}), cfg.get("default_shard", "other"))
+
+    def shard_for_title(self, title: str) -> str:
+        for token in tokenize(title):
+            if token in self.keyword_shard:
+                return self.keyword_shard[token]
+        return self.default_shard
+
+    def route(self, query: str, resolved_titles: Iterable[str] = ()) -> List[str]:
+        shards = {self.keyword_shard[t] for t in tokenize(query) if t in self.keyword_shard}
+        shards.update(self.shard_for_title(title) for title in resolved_titles)
+        return [name for name in self.names if name in shards] or list(self.names)
+
+    def partition(self, documents: List[Document]) -> Dict[str, List[Document]]:
+        groups = {name: [] for name in self.names}
+        for doc in documents:
+            groups[self.shard_for_title(doc.metadata.get("product_title", ""))].append(doc)
+        return groups
+
+
+def shard_collection_name(collection_name: str, shard: str) -> str:
+    return f"{collection_name}_{shard}"
+
+
+class ShardedCatalog:
+    """
+    Scatter-gather search over catalog shards. The query is embedded once, the routed shards are
+    searched concurrently (a local quantized shard index when one is built, otherwise the shard's
+    AstraDB collection) and the per-shard top-k lists are merged by score.
+    """
+
+    def __init__(self, router: ShardRouter, store_factory: Callable[[str], object],
+                 embeddings=None, max_workers: int = 4, use_local_index: bool = False,
+                 local_index_root: Optional[Callable[[], Path]] = None):
+        self.router = router
+        self.store_factory = store_factory
+        self.embeddings = embeddings
+        self.max_workers = max_workers
+        self.use_local_index = use_local_index
+        self.local_index_root = local_index_root or active_local_index_path
+        self._stores = {}
+        self._stores_lock = threading.Lock()
+
+    def store(self, shard: str):
+        # filled lazily from the scatter-gather threads; one store per shard, never a racing duplicate
+        store = self._stores.get(shard)
+        if store is None:
+            with self._stores_lock:
+                store = self._stores.get(shard)
+                if store is None:
+                    store = self._stores[shard] = self.store_factory(shard)
+        return store
+
+    def _local_index(self, shard: str) -> Optional[QuantizedVectorIndex]:
+        return QuantizedVectorIndex.load(self.local_index_root() / shard) if self.use_local_index else None
+
+    def _search_shard(self, shard: str, vector, k: int, filters: Optional[dict]) -> List[Tuple[Document, float]]:
+        index = None if filters else self._local_index(shard)
+        if index is not None:
+            # AstraDB reports cosine as (1 + cos) / 2; local shards use the same scale so lists merge
+            return [(doc, (1 + score) / 2) for doc, score in index.search(vector, k=k)]
+        return self.store(shard).similarity_search_with_score_by_vector(vector, k=k, filter=filters)
+
+    def search_with_scores_by_vector(self, vector, query: str, k: int, filters: Optional[dict] = None,
+                                     resolved_titles: Iterable[str] = ()) -> List[Tuple[Document, float]]:
+        shards = self.router.route(query, resolved_titles)
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(shards)))) as pool:
+            futures = {shard: pool.submit(self._search_shard, shard, vector, k, filters) for shard in shards}
+            for shard, future in futures.items():
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    log.warning("Shard search failed", shard=shard, error=str(e))
+        log.debug("Sharded search", query=query, shards=shards, candidates=len(results))
+        return heapq.nlargest(k, results, key=lambda pair: pair[1])
+
+    def search_with_scores(self, query: str, k: int, filters: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        return self.search_with_scores_by_vector(self.embeddings.embed_query(query), query, k, filters)
+
+    def search_by_vector(self, vector, query: str, k: int, filters: Optional[dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores_by_vector(vector, query, k, filters)]
+
+    def search(self, query: str, k: int, filters: Optional[dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query, k, filters)]
+
+    def metadata_search(self, filter: dict, n: int, titles: Iterable[str]) -> List[Document]:
+        """Exact metadata lookup, only in the shards the resolved product titles live in."""
+        docs = []
+        for shard in dict.fromkeys(self.router.shard_for_title(t) for t in titles):
+            docs.extend(self.store(shard).metadata_search(filter=filter, n=n))
+        return docs
@@ -1,15 +1,36 @@
+import os
+import hmac
+import asyncio
+import threading
 import uvicorn
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse
+import structlog
+from typing import Optional
+from fastapi import FastAPI, Request, Form, Header, Depends, HTTPException
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from langchain_core.messages import HumanMessage
 from workflow.agentic_rag_workflow_with_mcp import AgenticRAG
+from prod_assistant.logger import GLOBAL_LOGGER as log, bind_request_context, clear_request_context
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.single_flight import AsyncSingleFlight, coalescing_stats, normalize_query
+from prod_assistant.retriever.adaptive_depth import depth_recorder
+from prod_assistant.utils.profiler import PROFILER
+from prod_assistant.utils.llm_cache import llm_cache_stats
+from prod_assistant.utils.model_routing import routing_stats
+from prod_assistant.prompt_library.chains import template_stats
+from prod_assistant.utils.query_log import QueryLog
+from prod_assistant.workflow.cache_warmer import CacheWarmer
+from prod_assistant.workflow.speculation import speculation_stats, shutdown_speculation
+from prod_assistant.workflow.fused_generation import fused_stats
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name='static')
 templates = Jinja2Templates(directory='templates')
+chat_flight = AsyncSingleFlight("http_get")
+query_log = QueryLog.from_config(load_config())
+cache_warmer = CacheWarmer.from_config(load_config(), AgenticRAG)
 
 app.add_middleware(
   CORSMiddleware,
@@ -19,14 +40,107 @@ app.add_middleware(
   allow_headers = ["*"]
  )
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # every log event emitted while serving this request carries its request_id
+    request_id = bind_request_context(request.headers.get("X-Request-ID"))
+    try:
+        response = await call_next(request)
+    finally:
+        clear_request_context()
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.on_event("startup")
+async def start_cache_warming():
+    cache_warmer.start()
+
+@app.on_event("shutdown")
+async def stop_speculation():
+    shutdown_speculation()
+
+@app.get("/health/ready")
+async def readiness():
+    # readiness probe: the pod only takes traffic once the first cache warm-up pass has ended
+    status = cache_warmer.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.get("/",response_class=HTMLResponse)
 async def index(request:Request):
     return templates.TemplateResponse("chat.html",{"request":request})
 
+def _answer(msg:str, request_id:Optional[str], cancel:threading.Event)->str:
+    with PROFILER.profile(request_id, label="/get"):
+        return AgenticRAG().run(msg, cancel=cancel)
+
 @app.post("/get",response_class=HTMLResponse)
 async def chat(msg:str = Form(...)):
-    rag_agent = AgenticRAG()
-    answer = rag_agent.run(msg)
-    print(f"Agentic Response: {answer}")
+    # the workflow is synchronous; it runs in a worker thread so the event loop keeps serving
+    if cache_warmer.enabled:
+        query_log.record(msg)
+    # cancelling the to_thread task does not stop its thread; the workflow checks `cancel` between nodes
+    run = lambda cancel: asyncio.to_thread(_answer, msg, structlog.contextvars.get_contextvars().get("request_id"), cancel)
+    if load_config().get("single_flight", {}).get("http", True):
+        answer = await chat_flight.do(normalize_query(msg), run)
+    else:
+        cancel = threading.Event()
+        try:
+            answer = await run(cancel)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+    log.info("Agentic response", answer=answer)
     return answer
 
+@app.get("/metrics/coalescing")
+async def coalescing_metrics():
+    return coalescing_stats()
+
+@app.get("/metrics/speculation")
+async def speculation_metrics():
+    # process-wide: every request's AgenticRAG shares one speculative retrieval pool and its counters
+    return speculation_stats()
+
+@app.get("/metrics/retrieval")
+async def retrieval_metrics():
+    return depth_recorder.stats()
+
+@app.get("/metrics/llm-cache")
+async def llm_cache_metrics():
+    return llm_cache_stats()
+
+@app.get("/metrics/prompts")
+async def prompt_metrics():
+    return template_stats.stats()
+
+@app.get("/metrics/models")
+async def model_metrics():
+    return routing_stats.report()
+
+@app.get("/metrics/fused-generation")
+async def fused_generation_metrics():
+    return fused_stats.stats()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    expected = os.getenv(load_config().get("profiling", {}).get("admin_token_env", "PROFILER_ADMIN_TOKEN"))
+    if not expected or not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_settings():
+    return PROFILER.settings()
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+async def configure_profiling(enabled: Optional[bool] = Form(None), sample_rate: Optional[float] = Form(None)):
+    return PROFILER.configure(enabled=enabled, sample_rate=sample_rate)
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return PROFILER.list_profiles()
+
+@app.get("/admin/profiles/{name}", dependencies=[Depends(require_admin)])
+async def download_profile(name: str):
+    path = PROFILER.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
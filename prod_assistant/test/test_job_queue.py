@@ -0,0 +1,34 @@
+import os
+from prod_assistant.etl.job_queue import JobStore
+
+
+def test_claim_next_respects_per_kind_limits(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    scrapes = [store.submit("scrape", {"queries": [f"q{i}"]}) for i in range(3)]
+    ingest = store.submit("ingest", {})
+    second_ingest = store.submit("ingest", {"run": 2})
+    limits = {"scrape": 2, "ingest": 1}
+
+    claimed = [store.claim_next(limits, os.getpid()) for _ in range(4)]
+    assert [job["id"] for job in claimed[:3]] == [scrapes[0]["id"], scrapes[1]["id"], ingest["id"]]
+    assert claimed[3] is None
+    assert store.get(scrapes[2]["id"])["status"] == "queued"
+    assert store.get(second_ingest["id"])["status"] == "queued"
+
+    store.finish(scrapes[0]["id"], "succeeded")
+    assert store.claim_next(limits, os.getpid())["id"] == scrapes[2]["id"]
+
+
+def test_claim_next_defaults_unknown_kinds_to_one(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    first = store.submit("export", {"n": 1})
+    store.submit("export", {"n": 2})
+    assert store.claim_next({}, os.getpid())["id"] == first["id"]
+    assert store.claim_next({}, os.getpid()) is None
+
+
+def test_submit_deduplicates_active_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    first = store.submit("scrape", {"queries": ["iphone"]})
+    again = store.submit("scrape", {"queries": ["iphone"]})
+    assert again["deduplicated"] and again["id"] == first["id"]
@@ -0,0 +1,50 @@
+import time
+from langchain_core.messages import AIMessage
+from prod_assistant.utils import llm_cache
+from prod_assistant.utils.llm_cache import LLMResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+    return LLMResponseCache(path=str(tmp_path / "llm_cache.sqlite"), nodes=["grader"], evict_every=1, **kwargs)
+
+
+def test_round_trip_and_node_stats(tmp_path):
+    cache = _cache(tmp_path)
+    key = cache.key("azure:gpt:0", "is this relevant?", {})
+    assert cache.get(key, "grader") is None
+    cache.put(key, "grader", AIMessage(content="yes"))
+    assert cache.get(key, "grader").content == "yes"
+    assert cache.stats()["nodes"]["grader"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert cache.enabled_for("grader") and not cache.enabled_for("generator")
+
+
+def test_evicts_least_recently_used_over_max_entries(tmp_path):
+    cache = _cache(tmp_path, max_entries=10)
+    keys = [cache.key("m", f"prompt {i}", {}) for i in range(11)]
+    for i, key in enumerate(keys[:10]):
+        cache.put(key, "grader", AIMessage(content=str(i)))
+    # touch the oldest entry so it outlives the next eviction
+    assert cache.get(keys[0], "grader") is not None
+    cache.put(keys[10], "grader", AIMessage(content="10"))
+
+    stats = cache.stats()
+    assert stats["entries"] == 9 and stats["evicted"] == 2
+    assert cache.get(keys[0], "grader") is not None
+    assert cache.get(keys[1], "grader") is None and cache.get(keys[2], "grader") is None
+
+
+def test_evicts_over_max_bytes(tmp_path):
+    cache = _cache(tmp_path, max_bytes=2000)
+    for i in range(20):
+        cache.put(cache.key("m", f"prompt {i}", {}), "grader", AIMessage(content="x" * 200))
+    assert cache.stats()["bytes"] <= 2000
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    key = cache.key("m", "p", {})
+    cache.put(key, "grader", AIMessage(content="stale"))
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert cache.get(key, "grader") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,35 @@
+from pathlib import Path
+import pytest
+from prod_assistant.etl.page_fetcher import FlipkartParser, LexborHTMLParser, requires_browser
+
+FIXTURES = Path(__file__).resolve().parents[2] / "data" / "fixtures" / "flipkart"
+BACKENDS = ["lxml"] + (["selectolax"] if LexborHTMLParser is not None else [])
+
+
+def _fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_listing(backend):
+    listing = FlipkartParser(backend=backend).parse_listing(_fixture("search_listing.html"), max_products=50)
+    assert len(listing) == 24
+    assert listing[0]["product_id"].startswith("itm")
+    assert listing[0]["title"] == "Apple iPhone 15 (Black, 128 GB)"
+    assert listing[0]["price"] == "₹59,900"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_listing_respects_max_products(backend):
+    assert len(FlipkartParser(backend=backend).parse_listing(_fixture("search_listing.html"), max_products=3)) == 3
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_reviews(backend):
+    assert len(FlipkartParser(backend=backend).parse_reviews(_fixture("product_page.html"))) == 10
+
+
+def test_requires_browser():
+    assert requires_browser(_fixture("js_required.html"))
+    assert not requires_browser(_fixture("product_page.html"))
+    assert requires_browser(None)
@@ -0,0 +1,88 @@
+import time
+import asyncio
+import threading
+import pytest
+from prod_assistant.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    group = SingleFlight("test-threads")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do("q", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(group.do("q", work))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while group.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+    assert results == ["answer"] * 4 and len(calls) == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_single_flight_shares_the_leader_exception():
+    group = SingleFlight("test-errors")
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        group.do("q", fail)
+    assert group.stats()["errors"] == 1 and group.stats()["in_flight"] == 0
+    assert group.do("q", lambda: 2) == 2
+
+
+def test_async_single_flight_keeps_running_while_a_caller_waits():
+    async def scenario():
+        group = AsyncSingleFlight("test-async-partial")
+        cancel_events = []
+
+        async def work(cancel):
+            cancel_events.append(cancel)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        first = asyncio.ensure_future(group.do("q", work))
+        second = asyncio.ensure_future(group.do("q", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "answer"
+        assert len(cancel_events) == 1 and not cancel_events[0].is_set()
+        return group.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["executions"] == 1 and stats["coalesced"] == 1 and stats["cancelled"] == 0
+
+
+def test_async_single_flight_cancels_when_every_caller_left():
+    async def scenario():
+        group = AsyncSingleFlight("test-async-cancel")
+        cancel_events = []
+
+        async def work(cancel):
+            cancel_events.append(cancel)
+            await asyncio.sleep(10)
+
+        callers = [asyncio.ensure_future(group.do("q", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return group.stats(), cancel_events
+
+    stats, cancel_events = asyncio.run(scenario())
+    # the blocking-work signal is raised and the shared task is gone
+    assert cancel_events[0].is_set()
+    assert stats["cancelled"] == 1 and stats["in_flight"] == 0
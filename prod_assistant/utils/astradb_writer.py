@@ -1,6 +1,6 @@
 import os
 import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_astradb import AstraDBVectorStore
 from prod_assistant.utils.model_loader import ModelLoader
@@ -21,7 +21,8 @@ class AstraWriter:
                 return
 
             self.model_loader = ModelLoader()
-            collection_name = self.config["astra_db"]["collection_name"]
+            astra_cfg = self.config["astra_db"]
+            collection_name = astra_cfg.get("interaction_collection") or astra_cfg["collection_name"]
 
             self.vstore = AstraDBVectorStore(
                 embedding=self.model_loader.load_embeddings(),
@@ -50,6 +51,28 @@ class AstraWriter:
             log.warning("AstraWriter duplicate check failed, assuming not duplicate", error=str(e))
             return False
 
+    def recent_questions(self, limit: int = 1000, since: Optional[float] = None) -> List[Tuple[str, str]]:
+        """
+        (question, ISO timestamp) of up to `limit` stored interactions, newest first; empty when
+        disabled or unreachable. `since` (epoch seconds) is filtered on in AstraDB, which has no
+        ordering for metadata searches, so the limit only samples within that window.
+        """
+        if not self.enabled:
+            return []
+        metadata_filter = {"source": "agentic_rag"}
+        if since is not None:
+            # interactions saved before timestamp_epoch was stored are not matched
+            metadata_filter["timestamp_epoch"] = {"$gte": since}
+        try:
+            docs = self.vstore.metadata_search(filter=metadata_filter, n=limit)
+        except Exception as e:
+            log.warning("Failed to read interactions from AstraDB", error=str(e))
+            return []
+        # ISO timestamps sort chronologically as strings
+        docs = sorted(docs, key=lambda d: d.metadata.get("timestamp", ""), reverse=True)
+        return [(d.metadata.get("user_question", ""), d.metadata.get("timestamp", "")) for d in docs
+                if d.metadata.get("user_question")]
+
     def save_interaction(self, question: str, retrieved_context: Optional[str], final_answer: str, thread_id: Optional[str] = None) -> bool:
         """Save a single Q/A interaction to AstraDB. Returns True if written, False otherwise."""
         if not self.enabled:
@@ -61,10 +84,13 @@ class AstraWriter:
                 log.info("Duplicate interaction found - skipping insert", question=question)
                 return False
 
+            now = datetime.datetime.now(datetime.timezone.utc)
             metadata = {
                 "user_question": question,
                 "retrieved_context": retrieved_context or "",
-                "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+                "timestamp": now.replace(tzinfo=None).isoformat() + "Z",
+                # numeric copy for range filters (recent_questions)
+                "timestamp_epoch": now.timestamp(),
                 "source": "agentic_rag",
             }
             if thread_id:
@@ -0,0 +1,148 @@
+import os
+import json
+import datetime
+import threading
+from pathlib import Path
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+# Catalog generation number, bumped by every ingestion run or generation switch.
+# Readers (retrieval caches etc.) compare it against the generation their data was built from.
+# With blue/green refreshes the same file is the pointer to the live index generation: `label`
+# names the collection / local index being served, `history` the previous ones kept for rollback.
+# The file lives on the ingesting host, so both only reach processes that share its data/ directory;
+# blue/green is therefore off by default and limited to single-host deployments.
+
+_lock = threading.Lock()
+_cached = {"path": None, "mtime_ns": None, "state": {"generation": 0}}
+
+
+def generation_file() -> Path:
+    config = load_config()
+    path = Path(config.get("catalog", {}).get("generation_file", "data/catalog_generation.json"))
+    if not path.is_absolute():
+        path = Path(os.getcwd()) / path
+    return path
+
+
+def _read_state_file(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state["generation"] = int(state.get("generation", 0))
+    return state
+
+
+def _write_state_file(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state["updated_at"] = datetime.datetime.utcnow().isoformat() + "Z"
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    _cached.update(path=None, mtime_ns=None)
+
+
+def read_catalog_state(path: Path | None = None) -> dict:
+    path = path or generation_file()
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {"generation": 0}
+
+    with _lock:
+        # Re-read only when the file changed; the stat call keeps this in the microsecond range
+        if _cached["path"] == path and _cached["mtime_ns"] == mtime_ns:
+            return _cached["state"]
+        try:
+            state = _read_state_file(path)
+        except (ValueError, OSError) as e:
+            log.warning("Unreadable catalog generation file", path=str(path), error=str(e))
+            state = _cached["state"] if _cached["path"] == path else {"generation": 0}
+        _cached.update(path=path, mtime_ns=mtime_ns, state=state)
+        return state
+
+
+def get_catalog_generation(path: Path | None = None) -> int:
+    return read_catalog_state(path).get("generation", 0)
+
+
+def active_catalog_label(path: Path | None = None) -> str | None:
+    """Label of the index generation being served; None for the un-suffixed legacy collection."""
+    return read_catalog_state(path).get("label")
+
+
+def catalog_collection_name(config: dict, label: str | None = None) -> str:
+    collection_name = config["astra_db"]["collection_name"]
+    return f"{collection_name}_{label}" if label else collection_name
+
+
+def generation_path(path: Path, label: str | None = None) -> Path:
+    """Per-generation copy of a side file (data/x.json -> data/x.<label>.json); unlabelled for legacy."""
+    return path.with_name(f"{path.stem}.{label}{path.suffix}") if label else path
+
+
+def _load_for_update(path: Path) -> dict:
+    if not path.exists():
+        return {"generation": 0}
+    try:
+        return _read_state_file(path)
+    except (ValueError, OSError):
+        return {"generation": 0}
+
+
+def bump_catalog_generation(path: Path | None = None) -> int:
+    path = path or generation_file()
+    with _lock:
+        state = _load_for_update(path)
+        state["generation"] += 1
+        _write_state_file(path, state)
+    log.info("Catalog generation bumped", generation=state["generation"])
+    return state["generation"]
+
+
+def publish_catalog_generation(label: str | None, documents: int | None = None, keep: int = 2,
+                               path: Path | None = None) -> list:
+    """
+    Atomically make `label` the served generation. The previous one moves to the rollback history,
+    which holds at most keep - 1 entries; returns the entries that fell off it (safe to delete).
+    """
+    path = path or generation_file()
+    with _lock:
+        state = _load_for_update(path)
+        history = state.get("history", [])
+        # a catalog ingested before blue/green refreshes is served from the un-suffixed collection
+        if "label" in state or state["generation"] > 0:
+            history.insert(0, {"label": state.get("label"), "documents": state.get("documents"),
+                               "published_at": state.get("published_at")})
+        history = [entry for entry in history if entry["label"] != label]
+        dropped = history[max(keep - 1, 0):]
+        state.update(generation=state["generation"] + 1, label=label, documents=documents,
+                     published_at=datetime.datetime.utcnow().isoformat() + "Z",
+                     history=history[:max(keep - 1, 0)])
+        _write_state_file(path, state)
+    log.info("Catalog generation published", generation=state["generation"], label=label,
+             dropped=[entry["label"] for entry in dropped])
+    return dropped
+
+
+def rollback_catalog_generation(path: Path | None = None) -> dict:
+    """
+    Switch back to the most recent previous generation. The generation being rolled back from goes
+    to the end of the history, so it is the first one pruned by the next publish.
+    """
+    path = path or generation_file()
+    with _lock:
+        state = _load_for_update(path)
+        history = state.get("history", [])
+        if not history:
+            raise ValueError("No previous catalog generation to roll back to")
+        previous, rest = history[0], history[1:]
+        retired = {"label": state.get("label"), "documents": state.get("documents"),
+                   "published_at": state.get("published_at")}
+        state.update(generation=state["generation"] + 1, label=previous["label"],
+                     documents=previous.get("documents"), published_at=previous.get("published_at"),
+                     history=rest + [retired])
+        _write_state_file(path, state)
+    log.info("Catalog generation rolled back", generation=state["generation"], label=state["label"],
+             retired=retired["label"])
+    return state
@@ -0,0 +1,159 @@
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+# Flipkart review blocks end with a reviewer footer:
+#   "READ MORE <name> Certified Buyer , <city> <Mon>, <YYYY> <likes> <dislikes> Permalink Report Abuse"
+_FOOTER_RE = re.compile(r"READ MORE.*?Permalink Report Abuse", flags=re.S)
+_BOILERPLATE_RE = re.compile(r"READ MORE|Certified Buyer|Permalink Report Abuse")
+_WORD_RE = re.compile(r"\w+")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+REVIEW_SEPARATOR = " || "
+EMPTY_CONTEXT = "No relevant documents found"
+
+
+def clean_review_text(text) -> str:
+    """Strip scraper boilerplate (READ MORE, reviewer footer, report links) from a review blob."""
+    if not isinstance(text, str):
+        return ""
+    reviews = []
+    for review in text.split("||"):
+        review = _FOOTER_RE.sub(" ", review)
+        review = _BOILERPLATE_RE.sub(" ", review)
+        review = " ".join(review.split())
+        if review:
+            reviews.append(review)
+    return REVIEW_SEPARATOR.join(reviews)
+
+
+def _word_set(text: str) -> set:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def dedupe_reviews(reviews: List[str], threshold: float = 0.85, seen: Optional[List[set]] = None) -> List[str]:
+    """
+    Drop reviews whose word-set Jaccard similarity with an earlier review is >= threshold.
+    Pass a shared `seen` list to dedupe across several products.
+    """
+    seen = seen if seen is not None else []
+    unique = []
+    for review in reviews:
+        words = _word_set(review)
+        if not words:
+            continue
+        if any(len(words & other) / len(words | other) >= threshold for other in seen):
+            continue
+        seen.append(words)
+        unique.append(review)
+    return unique
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    enc = _get_encoding(encoding)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # Offline fallback: words and punctuation, slightly over-counting like a BPE tokenizer would
+    return len(_TOKEN_RE.findall(text))
+
+
+class ContextBuilder:
+    """
+    Builds the retrieval context shared by the grader and generator prompts.
+    Reviews are cleaned, near-duplicates (also across colour/storage variants) are dropped,
+    and the snippets most relevant to the question are packed into a fixed token budget.
+    When a summary source (the ingestion-time product index) has a summary for a product,
+    that summary replaces its raw reviews.
+    """
+
+    def __init__(self, token_budget: int = 1500, max_reviews_per_product: int = 3,
+                 dedupe_threshold: float = 0.85, encoding: str = "cl100k_base",
+                 summary_source: Optional[Callable] = None):
+        self.token_budget = token_budget
+        self.max_reviews_per_product = max_reviews_per_product
+        self.dedupe_threshold = dedupe_threshold
+        self.encoding = encoding
+        self.summary_source = summary_source
+
+    @classmethod
+    def from_config(cls, config: dict, summary_source: Optional[Callable] = None) -> "ContextBuilder":
+        ctx_cfg = config.get("context", {})
+        return cls(
+            token_budget=ctx_cfg.get("token_budget", 1500),
+            max_reviews_per_product=ctx_cfg.get("max_reviews_per_product", 3),
+            dedupe_threshold=ctx_cfg.get("dedupe_threshold", 0.85),
+            encoding=ctx_cfg.get("tokenizer_encoding", "cl100k_base"),
+            summary_source=summary_source if ctx_cfg.get("use_summaries", True) else None,
+        )
+
+    def _score(self, review: str, question_words: set) -> float:
+        words = _word_set(review)
+        if not words:
+            return 0.0
+        return len(words & question_words) / (len(words) ** 0.5)
+
+    def build(self, docs, question: str = "") -> str:
+        if not docs:
+            return EMPTY_CONTEXT
+
+        question_words = _word_set(question)
+        summaries = self.summary_source() if self.summary_source else None
+        seen = []
+        products = []
+        for d in docs:
+            meta = d.metadata or {}
+            header = (
+                f"Title:{meta.get('product_title','N/A')}\n"
+                f"Price:{meta.get('price','N/A')}\n"
+                f"Rating:{meta.get('rating','N/A')}"
+            )
+            if meta.get("variant_titles"):
+                # variants folded into this document at ingestion keep their own title and price
+                titles = meta["variant_titles"]
+                variants = zip(titles, meta.get("variant_prices") or [None] * len(titles))
+                header += "\nVariants:" + "; ".join(f"{title} {price or 'N/A'}" for title, price in variants)
+            summary = summaries.summary_for(meta.get("product_id")) if summaries else None
+            reviews = [summary] if summary else clean_review_text(d.page_content).split(REVIEW_SEPARATOR)
+            reviews = dedupe_reviews(reviews, self.dedupe_threshold, seen)
+            # sorted() is stable, so equally scored reviews keep the scraper's order
+            reviews = sorted(reviews, key=lambda r: self._score(r, question_words), reverse=True)
+            products.append({"header": header, "reviews": reviews[:self.max_reviews_per_product], "packed": []})
+
+        # Headers first in retrieval order, then snippets round-robin by rank so every product gets its best one
+        used = 0
+        packed_products = []
+        for product in products:
+            cost = count_tokens(product["header"], self.encoding)
+            if used + cost > self.token_budget:
+                break
+            used += cost
+            packed_products.append(product)
+
+        for rank in range(self.max_reviews_per_product):
+            for product in packed_products:
+                if rank >= len(product["reviews"]):
+                    continue
+                snippet = product["reviews"][rank]
+                cost = count_tokens(snippet, self.encoding)
+                if used + cost > self.token_budget:
+                    continue
+                used += cost
+                product["packed"].append(snippet)
+
+        if not packed_products:
+            return EMPTY_CONTEXT
+        # Variants whose reviews were all duplicates of an earlier product keep only their facts
+        chunks = [
+            p["header"] + (f"\nReview:\n{REVIEW_SEPARATOR.join(p['packed'])}" if p["packed"] else "")
+            for p in packed_products
+        ]
+        return "\n\n---\n\n".join(chunks)
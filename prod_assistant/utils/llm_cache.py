@@ -0,0 +1,161 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+NODE_KEY = "llm_node"
+# set in response_metadata of responses served from the cache, so callers can tell them from model calls
+CACHE_HIT_KEY = "llm_cache_hit"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+_CACHES: Dict[str, "LLMResponseCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def llm_for_node(llm, node: str):
+    """Tag an LLM's calls with the graph node making them; the response cache is opted into per node."""
+    return llm.with_config(metadata={NODE_KEY: node})
+
+
+def llm_cache_stats() -> dict:
+    """Stats of every response cache opened in this process, keyed by database path."""
+    return {path: cache.stats() for path, cache in list(_CACHES.items())}
+
+
+class LLMResponseCache:
+    """
+    Persistent exact-match cache of chat model responses in SQLite (WAL), shared by every process
+    using the same file. Entries are keyed on a hash of (provider, model, parameters, rendered prompt)
+    and evicted least-recently-used once `max_entries` or `max_bytes` is exceeded. Only calls tagged
+    with one of `nodes` are cached; hits and misses are counted per node.
+    """
+
+    def __init__(self, path: str = "data/llm_cache.sqlite", max_entries: int = 20000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl_seconds: Optional[float] = None,
+                 nodes: Iterable[str] = (), evict_every: int = 50):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.nodes = set(nodes)
+        self.evict_every = max(evict_every, 1)
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+        self._writes = 0
+        self.evicted = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LLMResponseCache":
+        """Caches are shared per database path, so every loader in a process reports into the same stats."""
+        cfg = config.get("llm_cache", {})
+        path = cfg.get("path", "data/llm_cache.sqlite")
+        with _CACHES_LOCK:
+            if path not in _CACHES:
+                _CACHES[path] = cls(path=path, max_entries=cfg.get("max_entries", 20000),
+                                    max_bytes=int(cfg.get("max_mb", 64) * 1024 * 1024),
+                                    ttl_seconds=cfg.get("ttl_seconds"), nodes=cfg.get("nodes", []))
+            return _CACHES[path]
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(identity: str, prompt, params: dict) -> str:
+        payload = json.dumps([identity, prompt, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def enabled_for(self, node: Optional[str]) -> bool:
+        return node is not None and node in self.nodes
+
+    def get(self, key: str, node: str) -> Optional[BaseMessage]:
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row:
+                    conn.execute("UPDATE responses SET hits = hits + 1, last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            log.warning("LLM cache read failed", error=str(e))
+            row = None
+        with self._lock:
+            (self._hits if row else self._misses)[node] += 1
+        return messages_from_dict([json.loads(row[0])])[0] if row else None
+
+    def put(self, key: str, node: str, message: BaseMessage):
+        data = json.dumps(message_to_dict(message), default=str)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, node, response, size, hits, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?)", (key, node, data, len(data), now, now))
+                with self._lock:
+                    self._writes += 1
+                    evict = self._writes % self.evict_every == 0
+                if evict:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            log.warning("LLM cache write failed", error=str(e))
+
+    def _evict(self, conn):
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        # trim to 90% of both bounds so eviction does not run again on the next few writes
+        target_count, target_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        doomed, freed = [], 0
+        for key, row_size in conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if count - len(doomed) <= target_count and size - freed <= target_bytes:
+                break
+            doomed.append((key,))
+            freed += row_size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        with self._lock:
+            self.evicted += len(doomed)
+        log.info("LLM cache evicted entries", evicted=len(doomed), freed_bytes=freed)
+
+    def stats(self) -> dict:
+        try:
+            with self._connect() as conn:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        with self._lock:
+            nodes = {}
+            for node in sorted(set(self._hits) | set(self._misses)):
+                hits, misses = self._hits[node], self._misses[node]
+                nodes[node] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3)}
+            return {"entries": entries, "bytes": size, "evicted": self.evicted,
+                    "cached_nodes": sorted(self.nodes), "nodes": nodes}
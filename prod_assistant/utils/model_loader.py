@@ -1,9 +1,18 @@
 import os
 import json
 import sys
+import time
 import asyncio
+from typing import Callable, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.single_flight import SingleFlight
+from prod_assistant.utils.llm_cache import LLMResponseCache, NODE_KEY, CACHE_HIT_KEY
+from prod_assistant.utils.model_routing import VALIDATORS, routing_stats, message_tokens
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
 
 from langchain_openai import AzureChatOpenAI
 from langchain_groq import ChatGroq
@@ -51,7 +60,7 @@ class ApiKeyManager:
                 env_val = os.getenv(key)
                 if env_val:
                     self.api_keys[key] = env_val
-                    log.info(f"Loaded {key} from individual env var")
+                    log.debug(f"Loaded {key} from individual env var")
             
         missing = [k for k in required_keys if not self.api_keys.get(k)]
         if missing:
@@ -62,29 +71,151 @@ class ApiKeyManager:
                 log.warning("Non-primary provider keys missing", missing_keys=missing)
 
 
-        log.info("API keys loaded", provider=self.provider, available_keys=list(self.api_keys.keys()))
+        log.debug("API keys loaded", provider=self.provider, available_keys=list(self.api_keys.keys()))
     def get(self, key:str)->str:
-        val = self.api_keys.get(key)
+        # keys of providers other than LLM_PROVIDER (per-node models) are read on demand
+        val = self.api_keys.get(key) or os.getenv(key)
         if not val:
             raise KeyError(f"API key for {key} is missing")
         return val
 
+_llm_flight = SingleFlight("llm")
+
+
+def _prompt(input):
+    """Rendered prompt as plain (role, content) pairs, comparable across calls."""
+    if isinstance(input, PromptValue):
+        return [(m.type, m.content) for m in input.to_messages()]
+    if isinstance(input, list):
+        return [(getattr(m, "type", None), getattr(m, "content", m)) for m in input]
+    return input
+
+
+class CoalescingLLM(Runnable):
+    """
+    Chat model wrapper that coalesces identical concurrent invocations: while a prompt is in flight,
+    the same prompt sent to the same model waits for that call's response instead of issuing another.
+    Everything other than invoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, llm, identity: str):
+        self.llm = llm
+        self.identity = identity
+
+    def _key(self, input, kwargs) -> str:
+        return json.dumps([self.identity, _prompt(input), kwargs], sort_keys=True, default=str)
+
+    def invoke(self, input, config=None, **kwargs):
+        return _llm_flight.do(self._key(input, kwargs), lambda: self.llm.invoke(input, config, **kwargs))
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class CachingLLM(CoalescingLLM):
+    """
+    Serves repeated prompts from the persistent response cache. Only calls whose config carries an
+    opted-in node tag (see llm_cache.llm_for_node) are looked up; misses go to the wrapped model
+    (coalesced when single-flight is on) and are stored. Hits are marked with CACHE_HIT_KEY in their
+    response_metadata. A node with a cascade validator only stores (and serves) answers that pass it.
+    """
+
+    def __init__(self, llm, identity: str, cache: LLMResponseCache,
+                 validators: Optional[Dict[str, Callable[[str], bool]]] = None):
+        super().__init__(llm, identity)
+        self.cache = cache
+        self.validators = validators or {}
+
+    def invoke(self, input, config=None, **kwargs):
+        node = (config or {}).get("metadata", {}).get(NODE_KEY)
+        if not self.cache.enabled_for(node):
+            return self.llm.invoke(input, config, **kwargs)
+        check = self.validators.get(node)
+        key = self.cache.key(self.identity, _prompt(input), kwargs)
+        cached = self.cache.get(key, node)
+        if cached is not None and (check is None or check(cached.content)):
+            cached.response_metadata[CACHE_HIT_KEY] = True
+            return cached
+        response = self.llm.invoke(input, config, **kwargs)
+        # an answer the cascade rejects is escalated; cached, it would fail and escalate on every call
+        if isinstance(response, BaseMessage) and response.content and (check is None or check(response.content)):
+            self.cache.put(key, node, response)
+        return response
+
+
+class RoutedLLM(Runnable):
+    """
+    Sends each call to the model assigned to its node (the llm_node tag in the run config); untagged
+    and unassigned nodes use the default model. For cascaded nodes the assigned model answers first
+    and the call is repeated on the default model when that answer fails the node's validator
+    (or the call raises). Everything other than invoke is delegated to the default model.
+    """
+
+    def __init__(self, default: Tuple[str, Runnable], routes: Dict[str, Tuple[str, Runnable]],
+                 cascade: Optional[Dict[str, str]] = None):
+        self.default = default
+        self.routes = routes
+        self.cascade = {node: VALIDATORS[check] for node, check in (cascade or {}).items()}
+
+    @staticmethod
+    def _timed(model, input, config, kwargs):
+        started = time.perf_counter()
+        response = model[1].invoke(input, config, **kwargs)
+        return response, (time.perf_counter() - started) * 1000
+
+    def _record(self, node, model, input, response, ms, escalated=False):
+        if getattr(response, "response_metadata", {}).get(CACHE_HIT_KEY):
+            # served by the response cache: no model call, so no latency, tokens or savings to report
+            routing_stats.cache_hit(node, model[0])
+            return
+        routing_stats.record(node, model[0], ms, *message_tokens(_prompt(input), response), escalated=escalated)
+
+    def invoke(self, input, config=None, **kwargs):
+        node = (config or {}).get("metadata", {}).get(NODE_KEY)
+        model = self.routes.get(node, self.default)
+        check = self.cascade.get(node) if model is not self.default else None
+        try:
+            response, ms = self._timed(model, input, config, kwargs)
+        except Exception as e:
+            if check is None:
+                raise
+            routing_stats.escalate(node, failed=True)
+            log.warning("Routed model failed, escalating to default model", node=node, model=model[0], error=str(e))
+        else:
+            passed = check is None or check(response.content)
+            self._record(node, model, input, response, ms, escalated=not passed)
+            if passed:
+                return response
+            routing_stats.escalate(node)
+            log.info("Routed model answer failed validation, escalating", node=node, model=model[0])
+        response, ms = self._timed(self.default, input, config, kwargs)
+        self._record(node, self.default, input, response, ms)
+        return response
+
+    def __getattr__(self, name):
+        if name == "default":
+            raise AttributeError(name)
+        return getattr(self.default[1], name)
+
+
 class ModelLoader:
     def __init__(self):
         if os.getenv("ENV","local").lower() != "production":
             load_dotenv()
-            log.info("Running in LOCAL mode: .env loaded")
+            log.debug("Running in LOCAL mode: .env loaded")
         else:
-            log.info("Running in PRODUCTION mode")
+            log.debug("Running in PRODUCTION mode")
 
         self.api_key_mgr = ApiKeyManager()
         self.config = load_config()
-        log.info("YAML config loaded", config_keys = list(self.config.keys()))
+        log.debug("YAML config loaded", config_keys = list(self.config.keys()))
 
 
     def load_embeddings(self):
         try:
-            log.info("Loading Azure OpenAI embedding model")
+            log.debug("Loading Azure OpenAI embedding model")
 
             # Ensure event loop exists (Windows / async safety)
             try:
@@ -107,8 +238,54 @@ class ModelLoader:
 
 
     def load_llm(self):
+        default_key = os.getenv("LLM_PROVIDER", "azure").lower()
+        llm = self._load_model(default_key)
+        routing = self.config.get("model_routing", {})
+        if not routing.get("enabled", False):
+            return llm
+        routes = {}
+        cascade = routing.get("cascade") or {}
+        nodes = routing.get("nodes") or {}
+        for node, block in nodes.items():
+            if block == default_key:
+                continue
+            # only the checks of the nodes this model serves; another node's answers never hit them
+            validators = {n: VALIDATORS[check] for n, check in cascade.items() if nodes.get(n) == block}
+            try:
+                routes[node] = (block, self._load_model(block, validators))
+            except Exception as e:
+                # a node whose model cannot be built (e.g. missing key) stays on the default model
+                log.warning("Per-node model unavailable, using default", node=node, model=block, error=str(e))
+        if not routes:
+            return llm
+        routing_stats.configure(default_key, {key: {"input": cfg.get("price_per_1k_input", 0.0),
+                                                    "output": cfg.get("price_per_1k_output", 0.0)}
+                                              for key, cfg in self.config["llm"].items()})
+        log.info("Per-node models loaded", default=default_key, routes={n: m for n, (m, _) in routes.items()})
+        cascade = {node: check for node, check in cascade.items() if node in routes}
+        return RoutedLLM((default_key, llm), routes, cascade)
+
+    def _load_model(self, provider_key: str, validators: Optional[Dict[str, Callable[[str], bool]]] = None):
+        """
+        One llm.<provider_key> model with single-flight coalescing and the response cache applied;
+        `validators` are the cascade checks of the nodes routed to it (see CachingLLM).
+        """
+        llm = self._build_llm(provider_key)
+        llm_config = self.config["llm"][provider_key]
+        temperature = llm_config.get("temperature", 0.2)
+        identity = f"{provider_key}:{llm_config.get('model_name') or os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')}:" \
+                   f"{temperature}:{llm_config.get('max_output_tokens', 2048)}"
+        if self.config.get("single_flight", {}).get("llm", True):
+            llm = CoalescingLLM(llm, identity)
+        cache_config = self.config.get("llm_cache", {})
+        # sampled outputs are not reusable; only (near-)deterministic models are cached
+        if cache_config.get("enabled", False) and temperature <= cache_config.get("max_temperature", 0):
+            llm = CachingLLM(llm, identity, LLMResponseCache.from_config(self.config), validators)
+        return llm
+
+    def _build_llm(self, provider_key: Optional[str] = None):
         llm_block = self.config['llm']
-        provider_key = os.getenv("LLM_PROVIDER", "azure").lower()
+        provider_key = provider_key or os.getenv("LLM_PROVIDER", "azure").lower()
 
         if provider_key not in llm_block:
             log.error("LLM provider not found in config", provider = provider_key)
@@ -120,7 +297,7 @@ class ModelLoader:
         temperature = llm_config.get("temperature",0.2)
         max_tokens = llm_config.get("max_output_tokens", 2048)
 
-        log.info("Loading LLM", provider = provider, model = model_name)
+        log.debug("Loading LLM", provider = provider, model = model_name)
 
         if provider == "azure":
             
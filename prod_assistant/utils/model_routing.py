@@ -0,0 +1,143 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+from prod_assistant.utils.context_builder import count_tokens
+
+_REASONING = re.compile(r"<think>.*?</think>", re.S)
+ESCALATED = " (escalated)"
+
+
+def _answer_text(text: str) -> str:
+    # reasoning models wrap their scratchpad in <think> tags; only the answer is validated
+    return _REASONING.sub("", text or "").strip()
+
+
+def _yes_no(text: str) -> bool:
+    return re.match(r"^\W*(yes|no)\b", _answer_text(text), re.I) is not None
+
+
+def _one_line(text: str) -> bool:
+    answer = _answer_text(text)
+    return bool(answer) and "\n" not in answer and len(answer) <= 200
+
+
+def _non_empty(text: str) -> bool:
+    return bool(_answer_text(text))
+
+
+# output checks a cascaded node's small-model answer must pass; a failure escalates to the default model
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "yes_no": _yes_no,
+    "one_line": _one_line,
+    "non_empty": _non_empty,
+}
+
+
+class ModelRoutingStats:
+    """
+    Per node and model: calls, latency and tokens, plus cascade escalations. The savings report
+    prices every call served by a routed model as if the default model had answered it: tokens at
+    the default model's prices, latency at the default model's mean on that node (or on all nodes
+    while that node has never reached it). Small-model calls that were escalated count as overhead.
+    Responses served by the LLM response cache are only counted, as cache_hits: they made no model call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = defaultdict(lambda: {"calls": 0, "ms": 0.0, "input_tokens": 0, "output_tokens": 0})
+        self.cache_hits = defaultdict(int)
+        self.escalations = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.default_model: Optional[str] = None
+        self.prices: Dict[str, dict] = {}
+
+    def configure(self, default_model: str, prices: Dict[str, dict]):
+        with self._lock:
+            self.default_model = default_model
+            self.prices.update(prices)
+
+    def record(self, node: Optional[str], model: str, ms: float, input_tokens: int, output_tokens: int,
+               escalated: bool = False):
+        with self._lock:
+            entry = self.calls[(node or "untagged", model + ESCALATED if escalated else model)]
+            entry["calls"] += 1
+            entry["ms"] += ms
+            entry["input_tokens"] += input_tokens
+            entry["output_tokens"] += output_tokens
+
+    def cache_hit(self, node: Optional[str], model: str):
+        with self._lock:
+            self.cache_hits[(node or "untagged", model)] += 1
+
+    def escalate(self, node: str, failed: bool = False):
+        with self._lock:
+            self.escalations[node] += 1
+            if failed:
+                self.failures[node] += 1
+
+    def _cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        price = self.prices.get(model, {})
+        return (input_tokens * price.get("input", 0.0) + output_tokens * price.get("output", 0.0)) / 1000
+
+    def report(self) -> dict:
+        with self._lock:
+            default = self.default_model
+            totals = {"calls": 0, "ms": 0.0}
+            for (_, model), entry in self.calls.items():
+                if model == default:
+                    totals["calls"] += entry["calls"]
+                    totals["ms"] += entry["ms"]
+            global_default_ms = totals["ms"] / totals["calls"] if totals["calls"] else None
+
+            nodes = {}
+
+            def node_item(node):
+                return nodes.setdefault(node, {"models": {}, "cache_hits": {},
+                                               "escalations": self.escalations.get(node, 0),
+                                               "small_model_errors": self.failures.get(node, 0),
+                                               "cost_saved_usd": 0.0, "latency_saved_ms": 0.0})
+
+            for (node, model), hits in sorted(self.cache_hits.items()):
+                node_item(node)["cache_hits"][model] = hits
+            for (node, model), entry in sorted(self.calls.items()):
+                calls = entry["calls"]
+                item = node_item(node)
+                cost = self._cost(model, entry["input_tokens"], entry["output_tokens"])
+                item["models"][model] = {"calls": calls, "mean_ms": round(entry["ms"] / calls, 1),
+                                         "input_tokens": entry["input_tokens"],
+                                         "output_tokens": entry["output_tokens"], "cost_usd": round(cost, 6)}
+                if model == default:
+                    continue
+                if model.endswith(ESCALATED):
+                    # the default model answered anyway: the small model's call is pure overhead
+                    item["cost_saved_usd"] -= cost
+                    item["latency_saved_ms"] -= entry["ms"]
+                    continue
+                baseline = self.calls.get((node, default))
+                baseline_ms = baseline["ms"] / baseline["calls"] if baseline and baseline["calls"] else global_default_ms
+                item["cost_saved_usd"] += self._cost(default, entry["input_tokens"], entry["output_tokens"]) - cost
+                if baseline_ms is not None:
+                    item["latency_saved_ms"] += baseline_ms * calls - entry["ms"]
+
+            for item in nodes.values():
+                item["cost_saved_usd"] = round(item["cost_saved_usd"], 6)
+                item["latency_saved_ms"] = round(item["latency_saved_ms"], 1)
+            return {"default_model": default, "nodes": nodes,
+                    "cost_saved_usd": round(sum(n["cost_saved_usd"] for n in nodes.values()), 6),
+                    "latency_saved_ms": round(sum(n["latency_saved_ms"] for n in nodes.values()), 1)}
+
+
+routing_stats = ModelRoutingStats()
+
+
+def message_tokens(prompt, response) -> tuple:
+    """(input, output) tokens: provider usage when the response carries it, else a local count."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    if isinstance(prompt, list):
+        prompt_text = "\n".join(str(content) for _, content in prompt)
+    else:
+        prompt_text = str(prompt)
+    return count_tokens(prompt_text), count_tokens(str(getattr(response, "content", "")))
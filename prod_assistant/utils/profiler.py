@@ -0,0 +1,261 @@
+import re
+import sys
+import json
+import time
+import zlib
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+PROFILE_SUFFIX = ".speedscope.json"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.speedscope\.json$")
+MAX_STACK_DEPTH = 128
+
+_current_session = contextvars.ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """Samples collected for one request, from every thread registered while serving it."""
+
+    def __init__(self, request_id: str, label: str, max_samples: int):
+        self.request_id = request_id
+        self.label = label
+        self.max_samples = max_samples
+        self.started = time.perf_counter()
+        self.node_path: List[str] = []
+        self.thread_nodes: Dict[int, List[str]] = {}
+        self.frames: Dict[tuple, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self.dropped = 0
+
+    def frame_id(self, key: tuple) -> int:
+        if key not in self.frames:
+            self.frames[key] = len(self.frames)
+        return self.frames[key]
+
+    def add_sample(self, thread_id: int, frame, weight_ms: float):
+        if len(self.samples) >= self.max_samples:
+            self.dropped += 1
+            return
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append(self.frame_id((code.co_name, code.co_filename, code.co_firstlineno)))
+            frame = frame.f_back
+        stack.reverse()
+        # the LangGraph node the thread is executing becomes the root frame, so flamegraphs split by node
+        nodes = self.thread_nodes.get(thread_id)
+        root = f"[node] {nodes[-1]}" if nodes else "[request]"
+        self.samples.append([self.frame_id((root, "", 0))] + stack)
+        self.weights.append(round(weight_ms, 3))
+
+    def to_speedscope(self) -> dict:
+        frames = [{"name": name, "file": file, "line": line} if file else {"name": name}
+                  for (name, file, line) in self.frames]
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.label} {self.request_id} [{' > '.join(self.node_path)}]",
+            "exporter": "prod_assistant.utils.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": " > ".join(self.node_path) or self.label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(duration_ms, 3),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for live requests. A sampled request registers the threads
+    serving it; one daemon thread reads their stacks through sys._current_frames() every
+    `interval_ms` and sleeps while nothing is being profiled. Sampling is decided per request_id,
+    at most `max_concurrent` requests are profiled at once, and each writes one speedscope file.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.01, interval_ms: float = 10,
+                 output_dir: str = "data/profiles", max_profiles: int = 50, max_samples: int = 20000,
+                 max_concurrent: int = 4):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.output_dir = Path(output_dir)
+        self.max_profiles = max_profiles
+        self.max_samples = max_samples
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._threads: Dict[int, ProfileSession] = {}
+        self._sessions = 0
+        self._wake = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.recent: Dict[str, dict] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SamplingProfiler":
+        cfg = config.get("profiling", {})
+        return cls(enabled=cfg.get("enabled", False), sample_rate=cfg.get("sample_rate", 0.01),
+                   interval_ms=cfg.get("interval_ms", 10), output_dir=cfg.get("output_dir", "data/profiles"),
+                   max_profiles=cfg.get("max_profiles", 50), max_samples=cfg.get("max_samples", 20000),
+                   max_concurrent=cfg.get("max_concurrent", 4))
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None) -> dict:
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        log.info("Profiler configured", enabled=self.enabled, sample_rate=self.sample_rate)
+        return self.settings()
+
+    def settings(self) -> dict:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "interval_ms": self.interval_ms,
+                "active_sessions": self._sessions, "max_concurrent": self.max_concurrent}
+
+    def should_sample(self, request_id: str) -> bool:
+        # same all-or-nothing-per-request_id bucketing as debug log sampling
+        if not self.enabled or self.sample_rate <= 0:
+            return False
+        return zlib.crc32(str(request_id).encode()) % 10_000 < self.sample_rate * 10_000
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._sampler.start()
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        last = time.perf_counter()
+        while True:
+            if not self._threads:
+                self._wake.wait()
+                self._wake.clear()
+                last = time.perf_counter()
+            time.sleep(interval)
+            now = time.perf_counter()
+            weight_ms, last = (now - last) * 1000, now
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, session in self._threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        session.add_sample(thread_id, frame, weight_ms)
+            del frames
+
+    def _register(self, session: ProfileSession, thread_id: int):
+        with self._lock:
+            self._threads[thread_id] = session
+        self._wake.set()
+
+    def _unregister(self, thread_id: int, session: ProfileSession):
+        with self._lock:
+            if self._threads.get(thread_id) is session:
+                del self._threads[thread_id]
+
+    @contextmanager
+    def profile(self, request_id: str, label: str = "request"):
+        """Profile the enclosed block (and the graph nodes it runs) if this request is sampled."""
+        with self._lock:
+            sampled = self.should_sample(request_id) and self._sessions < self.max_concurrent
+            if sampled:
+                self._sessions += 1
+                self._ensure_sampler()
+        if not sampled:
+            yield None
+            return
+        session = ProfileSession(request_id, label, self.max_samples)
+        token = _current_session.set(session)
+        thread_id = threading.get_ident()
+        self._register(session, thread_id)
+        try:
+            yield session
+        finally:
+            self._unregister(thread_id, session)
+            _current_session.reset(token)
+            with self._lock:
+                self._sessions -= 1
+            self._save(session)
+
+    @contextmanager
+    def node(self, name: str):
+        """Mark the running LangGraph node; the thread is sampled for the node even if it is a pool worker."""
+        session = _current_session.get()
+        if session is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            session.node_path.append(name)
+            session.thread_nodes.setdefault(thread_id, []).append(name)
+            registered = self._threads.get(thread_id) is session
+        if not registered:
+            self._register(session, thread_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                session.thread_nodes[thread_id].pop()
+            if not registered:
+                self._unregister(thread_id, session)
+
+    def _save(self, session: ProfileSession):
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            safe_id = re.sub(r"[^\w-]", "_", str(session.request_id))[:64]
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}_{safe_id}{PROFILE_SUFFIX}"
+            with open(self.output_dir / name, "w", encoding="utf-8") as f:
+                json.dump(session.to_speedscope(), f, separators=(",", ":"))
+            self.recent[name] = {"request_id": session.request_id, "node_path": session.node_path,
+                                 "samples": len(session.samples), "dropped": session.dropped}
+            log.info("Request profile saved", profile=name, samples=len(session.samples),
+                     node_path=session.node_path)
+            self._prune()
+        except OSError as e:
+            log.warning("Failed to save request profile", error=str(e))
+
+    def _prune(self):
+        profiles = sorted(self.output_dir.glob("*" + PROFILE_SUFFIX), key=lambda p: p.stat().st_mtime)
+        for old in profiles[:max(len(profiles) - self.max_profiles, 0)]:
+            old.unlink(missing_ok=True)
+            self.recent.pop(old.name, None)
+
+    def list_profiles(self) -> List[dict]:
+        if not self.output_dir.exists():
+            return []
+        profiles = []
+        for path in sorted(self.output_dir.glob("*" + PROFILE_SUFFIX), key=lambda p: p.stat().st_mtime, reverse=True):
+            stat = path.stat()
+            profiles.append({"name": path.name, "bytes": stat.st_size,
+                             "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+                             **self.recent.get(path.name, {})})
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.output_dir / name
+        return path if path.is_file() else None
+
+
+def profiled_node(name: str, fn):
+    """Wrap a graph node so samples taken while it runs are attributed to it (signature is preserved)."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with PROFILER.node(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+PROFILER = SamplingProfiler.from_config(load_config())
@@ -0,0 +1,54 @@
+import json
+import os
+import time
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class QueryLog:
+    """
+    Append-only JSONL log of the questions served by this instance ({"ts", "query"} per line).
+    Rotated to `<path>.1` once it exceeds `max_bytes`; read back by the cache warmer.
+    """
+
+    def __init__(self, path: str = "data/query_log.jsonl", max_bytes: int = 20 * 1024 * 1024):
+        self.path = Path(path)
+        self.backup = Path(str(path) + ".1")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "QueryLog":
+        cfg = config.get("cache_warming", {})
+        return cls(path=cfg.get("query_log", "data/query_log.jsonl"),
+                   max_bytes=int(cfg.get("query_log_max_mb", 20) * 1024 * 1024))
+
+    def record(self, query: str):
+        line = json.dumps({"ts": time.time(), "query": query}, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    os.replace(self.path, self.backup)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            log.warning("Failed to append to query log", error=str(e))
+
+    def read(self, since: Optional[float] = None) -> List[Tuple[float, str]]:
+        """(timestamp, query) pairs logged at or after `since`, oldest first."""
+        entries = []
+        for path in (self.backup, self.path):
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if since is None or item.get("ts", 0) >= since:
+                        entries.append((item.get("ts", 0), item.get("query", "")))
+        return entries
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, Union
+
+_GROUPS: Dict[str, Union["SingleFlight", "AsyncSingleFlight"]] = {}
+
+
+class RunCancelled(Exception):
+    """Raised by a workflow that stopped between nodes because nobody waits for its result any more."""
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def coalescing_stats() -> dict:
+    """Counters of every single-flight group in this process, keyed by group name."""
+    return {name: group.stats() for name, group in _GROUPS.items()}
+
+
+class SingleFlight:
+    """
+    Thread-safe request coalescing: while a call for `key` is running, identical calls wait for it
+    and receive its result (or its exception) instead of running their own.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        _GROUPS[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self.errors += 1
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.executions + self.coalesced
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+                "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio request coalescing. The shared execution runs as its own task; a caller that is
+    cancelled (client disconnect) only stops waiting. Once no caller is left waiting, the task is
+    cancelled and the threading.Event passed to `coro_fn` is set: cancelling an asyncio.to_thread
+    task does not stop its thread, so blocking work has to check the event and stop itself.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, list] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.cancelled = 0
+        _GROUPS[name] = self
+
+    def _finished(self, key: Hashable, entry: list, task: asyncio.Task):
+        if self._calls.get(key) is entry:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    async def do(self, key: Hashable, coro_fn: Callable[[threading.Event], Awaitable]):
+        entry = self._calls.get(key)
+        if entry is None:
+            cancel = threading.Event()
+            task = asyncio.ensure_future(coro_fn(cancel))
+            entry = [task, 0, cancel]
+            self._calls[key] = entry
+            self.executions += 1
+            task.add_done_callback(lambda t: self._finished(key, entry, t))
+        else:
+            self.coalesced += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                entry[1] -= 1
+                if entry[1] == 0:
+                    entry[2].set()
+                    task.cancel()
+                    self.cancelled += 1
+            raise
+
+    def stats(self) -> dict:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._calls),
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
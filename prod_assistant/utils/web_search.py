@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class WebSearchProvider(ABC):
+    """Provider interface: a blocking search call returning the result text."""
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str) -> str:
+        ...
+
+
+class DuckDuckGoProvider(WebSearchProvider):
+    name = "duckduckgo"
+
+    def __init__(self):
+        from langchain_community.tools import DuckDuckGoSearchRun
+        self.tool = DuckDuckGoSearchRun()
+
+    def search(self, query: str) -> str:
+        return self.tool.run(query)
+
+
+class FixtureSearchProvider(WebSearchProvider):
+    """Offline provider backed by a JSON file {query: result}; used for tests and benchmarks."""
+
+    name = "fixture"
+
+    def __init__(self, path: str, latency_seconds: float = 0.0):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.results = {WebSearchService.normalize_query(q): r for q, r in data.get("results", {}).items()}
+        self.default = data.get("default", "No web results found")
+        self.latency_seconds = latency_seconds
+
+    def search(self, query: str) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.results.get(WebSearchService.normalize_query(query), self.default)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if available; otherwise return seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self, max_wait: float) -> bool:
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._reserve()
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class WebSearchService:
+    """
+    Web search behind the MCP web_search tool: TTL cache keyed by normalized query, token-bucket
+    rate limiting, per-call timeout, and the blocking provider call run off the event loop.
+    Throttled, timed-out and failed searches return "" (a miss), so callers fall through to
+    their next source instead of passing the failure on as context.
+    """
+
+    def __init__(self, provider: WebSearchProvider, timeout_seconds: float = 8.0,
+                 cache_ttl_seconds: float = 3600, cache_max_entries: int = 512,
+                 rate_per_second: float = 1.0, burst: int = 3, max_wait_seconds: float = 5.0):
+        self.provider = provider
+        self.timeout_seconds = timeout_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self.max_wait_seconds = max_wait_seconds
+        self.limiter = TokenBucket(rate_per_second, burst)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counts = {"hits": 0, "misses": 0, "throttled": 0, "timeouts": 0, "errors": 0}
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._cache.pop(key, None)
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key: str, value: str):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats_counts[name] += 1
+
+    async def search(self, query: str) -> str:
+        key = self.normalize_query(query)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        self._count("misses")
+
+        if not await self.limiter.acquire(self.max_wait_seconds):
+            self._count("throttled")
+            log.warning("Web search throttled", provider=self.provider.name, query=query)
+            return ""
+
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(self.provider.search, query), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            log.warning("Web search timed out", provider=self.provider.name, timeout=self.timeout_seconds)
+            return ""
+        except Exception as e:
+            self._count("errors")
+            log.warning("Web search failed", provider=self.provider.name, error=str(e))
+            return ""
+
+        # only real results are cached; errors and timeouts are retried on the next call
+        self._cache_put(key, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.stats_counts)
+            counts["cache_size"] = len(self._cache)
+        total = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = round(counts["hits"] / total, 4) if total else 0.0
+        return counts
+
+
+def build_web_search(config: dict) -> WebSearchService:
+    cfg = config.get("web_search", {})
+    provider_name = os.getenv("WEB_SEARCH_PROVIDER", cfg.get("provider", "duckduckgo")).lower()
+    if provider_name == "fixture":
+        fixture_path = Path(cfg.get("fixture_path", "data/web_search_fixture.json"))
+        if not fixture_path.is_absolute():
+            fixture_path = Path(os.getcwd()) / fixture_path
+        provider = FixtureSearchProvider(str(fixture_path), cfg.get("fixture_latency_seconds", 0.0))
+    elif provider_name == "duckduckgo":
+        provider = DuckDuckGoProvider()
+    else:
+        raise ValueError(f"Unsupported web search provider: {provider_name}")
+
+    log.info("Web search provider loaded", provider=provider.name)
+    return WebSearchService(
+        provider,
+        timeout_seconds=cfg.get("timeout_seconds", 8),
+        cache_ttl_seconds=cfg.get("cache_ttl_seconds", 3600),
+        cache_max_entries=cfg.get("cache_max_entries", 512),
+        rate_per_second=cfg.get("rate_per_second", 1.0),
+        burst=cfg.get("burst", 3),
+        max_wait_seconds=cfg.get("max_wait_seconds", 5),
+    )
+
+
+if __name__ == "__main__":
+    # Offline benchmark: repeated and concurrent queries against the fixture provider
+    from prod_assistant.utils.config_loader import load_config
+
+    config = load_config()
+    config.setdefault("web_search", {}).update(provider="fixture", fixture_latency_seconds=0.2,
+                                               rate_per_second=20, burst=20)
+    service = build_web_search(config)
+    queries = ["iphone 16 price", "pixel 9 price", "galaxy s24 review", "oneplus 12 price"] * 25
+
+    async def run_round():
+        started = time.perf_counter()
+        await asyncio.gather(*(service.search(q) for q in queries))
+        return time.perf_counter() - started
+
+    async def main():
+        # cold round fills the cache (every concurrent miss still hits the provider), warm round is cache-only
+        return await run_round(), await run_round()
+
+    cold, warm = asyncio.run(main())
+    print(f"{len(queries)} searches: cold {cold:.2f}s, warm {warm * 1000:.1f}ms")
+    print("Stats:", service.stats())
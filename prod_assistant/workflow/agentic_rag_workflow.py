@@ -1,13 +1,21 @@
-from typing import Annotated, Sequence, TypedDict, Literal
+import uuid
+import threading
+from typing import Annotated, Sequence, TypedDict, Literal, List, Optional
 from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
-from prod_assistant.prompt_library.prompts import PROMPT_REGISTRY, PromptType
+from prod_assistant.prompt_library.prompts import PromptType
+from prod_assistant.prompt_library.chains import ChainRegistry
 from prod_assistant.retriever.retrieval import Retriever
 from prod_assistant.utils.model_loader import ModelLoader
+from prod_assistant.logger import GLOBAL_LOGGER as log
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.context_builder import ContextBuilder
+from prod_assistant.workflow.speculation import build_speculation, speculation_stats
+from prod_assistant.utils.single_flight import RunCancelled
+from prod_assistant.utils.profiler import profiled_node
 from langgraph.checkpoint.memory import MemorySaver
 import asyncio
 from prod_assistant.evaluation.ragas_eval import evaluate_context_precision, evaluate_response_relevancy
@@ -20,94 +28,75 @@ class AgenticRAG:
         self.retriever_obj = Retriever()
         self.model_loader = ModelLoader()
         self.llm = self.model_loader.load_llm()
+        self.chains = ChainRegistry(self.llm)
         self.checkpointer = MemorySaver()
+        self.config = load_config()
+        self.context_builder = ContextBuilder.from_config(self.config)
+        self.speculation = build_speculation(self.config)
         self.workflow = self._build_workflow()
         self.app = self.workflow.compile(checkpointer=self.checkpointer)
 
-    def format_docs(self, docs)->str:
-        if not docs:
-            return "No relevant documents found"
-        formatted_chunks = []
-        for d in docs:
-            meta = d.metadata or {}
-            formatted = (
-                f"Title:{meta.get('product_title','N/A')}\n"
-                f"Price:{meta.get('price','N/A')}\n"
-                f"Rating:{meta.get('rating','N/A')}\n"
-                f"Review:\n{d.page_content.strip()}"
-            )
-            formatted_chunks.append(formatted)
-        return "\n\n---\n\n".join(formatted_chunks)
+    def format_docs(self, docs, question:str="")->str:
+        return self.context_builder.build(docs, question)
+
+    def _is_product_query(self, text:str)->bool:
+        return any(word in text.lower() for word in ["price","review","product"])
 
     def _ai_assistant(self, state:AgentState):
-        print("---CALL ASSISTANT---")
+        log.debug("---CALL ASSISTANT---")
         messages = state["messages"]
         last_message = messages[-1].content
 
-        if any(word in last_message.lower() for word in ["price","review","product"]):
-            return {"messages":[HumanMessage(content="TOOL: retriever")]}
+        if self._is_product_query(last_message):
+            return {"messages":[HumanMessage(content=f"TOOL: retriever||{last_message}")]}
         
-        prompt = ChatPromptTemplate.from_template(
-            """You are a product assistant. Only return the direct, final answer to the user's question, without explanations or alternative suggestions.
-
-            User Question: {question}
-            Context: {context}
-
-            Final Answer:
-            """
-        )
-        chain = prompt| self.llm| StrOutputParser()
-        response = chain.invoke({"question": last_message})
+        response = self.chains[PromptType.ASSISTANT].invoke({"question": last_message, "context": ""})
         return {"messages": [HumanMessage(content=response)]}
     
-    def _vector_retriever(self, state: AgentState):
-        print("---RETRIEVER---")
-        query = state["messages"][-1].content
-        retriever = self.retriever_obj.load_retriever()
-        docs = retriever.invoke(query)
-        context = self.format_docs(docs)
+    def _retrieve_context(self, query:str)->str:
+        docs = self.retriever_obj.call_retriever(query)
+        return self.format_docs(docs, query)
+
+    def _vector_retriever(self, state: AgentState, config: RunnableConfig):
+        log.debug("---RETRIEVER---")
+        raw = state["messages"][-1].content
+        query = raw.split("||", 1)[1].strip() if raw.startswith("TOOL: retriever||") else raw
+        run_key = config.get("configurable", {}).get("run_key")
+        context = self.speculation.take(run_key, query) if self.speculation and run_key else None
+        if context is None:
+            context = self._retrieve_context(query)
         return {"messages":[HumanMessage(content=context)]}
     
     def _grade_documents(self, state:AgentState)->Literal["generator","rewriter"]:
-        print("---GRADER---")
+        log.debug("---GRADER---")
         question = state["messages"][0].content
         docs = state["messages"][-1].content
 
-        prompt = PromptTemplate(
-            template="""You are a grader. Question:{question}\nDocs:{docs}\n
-            Are docs relevant to the question? Answer yes or no""",
-            input_variables=["question","docs"]
-        )
-        chain = prompt |self.llm | StrOutputParser()
+        chain = self.chains[PromptType.GRADER]
         score = chain.invoke({"question":question,"docs":docs})
         return "generator" if "yes" in score.lower() else "rewriter"
 
     def _generate(self, state: AgentState):
-        print("---GENERATE---")
+        log.debug("---GENERATE---")
         question = state["messages"][0].content
         docs = state["messages"][-1].content
-        prompt = ChatPromptTemplate.from_template(
-            PROMPT_REGISTRY[PromptType.PRODUCT_BOT].template
-        )
-        chain = prompt | self.llm | StrOutputParser()
+        chain = self.chains[PromptType.PRODUCT_BOT]
         response = chain.invoke({"context":docs, "question":question})
         return {"messages":[HumanMessage(content=response)]}
     
     def _rewrite(self, state:AgentState):
-        print("--- REWRITE --")
+        log.debug("--- REWRITE --")
         question = state["messages"][0].content
-        new_q = self.llm.invoke(
-            [HumanMessage(content=f"Rewrite the query to be more clear: {question}")]
-        )
-        return {"messages":[HumanMessage(content=new_q.content)]}
+        new_q = self.chains[PromptType.REWRITER].invoke({"question": question})
+        return {"messages":[HumanMessage(content=new_q)]}
 
 
     def _build_workflow(self):
         workflow = StateGraph(self.AgentState)
-        workflow.add_node("Assistant", self._ai_assistant)
-        workflow.add_node("Retriever", self._vector_retriever)
-        workflow.add_node("Generator", self._generate)
-        workflow.add_node("Rewriter", self._rewrite)
+        workflow.add_node("Assistant", profiled_node("Assistant", self._ai_assistant))
+        workflow.add_node("Retriever", profiled_node("Retriever", self._vector_retriever))
+        workflow.add_node("Generator", profiled_node("Generator", self._generate))
+        workflow.add_node("Rewriter", profiled_node("Rewriter", self._rewrite))
 
         workflow.add_edge(START, "Assistant")
         workflow.add_conditional_edges(
@@ -118,7 +107,7 @@ class AgenticRAG:
 
         workflow.add_conditional_edges(
             "Retriever",
-            self._grade_documents,
+            profiled_node("Grader", self._grade_documents),
             {"generator":"Generator","rewriter":"Rewriter"}
         )
 
@@ -126,10 +115,81 @@ class AgenticRAG:
         workflow.add_edge("Rewriter",END)
         return workflow
     
-    def run(self, query:str, thread_id: str="default_thread")->str:
-        result = self.app.invoke({"messages":[HumanMessage(content=query)]},
-                                 config = {"configurable": {"thread_id": thread_id}})
+    def run(self, query:str, thread_id: str="default_thread", cancel: Optional[threading.Event]=None)->str:
+        """`cancel` is checked between graph nodes; once set, the run stops with RunCancelled."""
+        run_key = uuid.uuid4().hex
+        # Speculatively retrieve while the Assistant node routes, only for queries it sends to the retriever
+        if self.speculation and self._is_product_query(query):
+            self.speculation.start(run_key, query, self._retrieve_context)
+        try:
+            result = None
+            for result in self.app.stream({"messages":[HumanMessage(content=query)]},
+                                          config = {"configurable": {"thread_id": thread_id, "run_key": run_key}},
+                                          stream_mode="values"):
+                if cancel is not None and cancel.is_set():
+                    log.info("Run cancelled between nodes", run_key=run_key)
+                    raise RunCancelled(query)
+        finally:
+            if self.speculation:
+                self.speculation.discard(run_key)
         return result["messages"][-1].content
+
+    def speculation_stats(self)->dict:
+        return speculation_stats()
+
+    def run_batch(self, queries:List[str], max_concurrency:Optional[int]=None)->List[dict]:
+        """
+        Answer many queries in one pass for offline jobs. Mirrors the graph (route -> retrieve -> grade ->
+        generate, or rewrite and stop) but runs each stage for the whole batch: one bulk embedding call
+        for retrieval and llm.batch with a concurrency cap for every LLM stage. No checkpointer thread is
+        touched, so repeated batches never see each other's history.
+        Returns one {"query", "answer", "error"} dict per query, in input order.
+        """
+        queries = list(queries)
+        max_concurrency = max_concurrency or self.retriever_obj.batch_max_concurrency()
+        batch_config = {"max_concurrency": max_concurrency}
+        results = [{"query": q, "answer": None, "error": None} for q in queries]
+
+        def _run_stage(prompt_type, idx, inputs):
+            if not idx:
+                return
+            outputs = self.chains[prompt_type].batch(inputs, config=batch_config, return_exceptions=True)
+            for i, out in zip(idx, outputs):
+                if isinstance(out, Exception):
+                    results[i]["error"] = str(out)
+                else:
+                    results[i]["answer"] = out
+
+        product_idx = [i for i, q in enumerate(queries) if self._is_product_query(q)]
+        direct_idx = [i for i, q in enumerate(queries) if not self._is_product_query(q)]
+        _run_stage(PromptType.ASSISTANT, direct_idx, [{"question": queries[i], "context": ""} for i in direct_idx])
+
+        contexts = {}
+        retrieved = self.retriever_obj.retrieve_batch([queries[i] for i in product_idx], max_concurrency=max_concurrency)
+        for i, item in zip(product_idx, retrieved):
+            if item["error"]:
+                results[i]["error"] = str(item["error"])
+            else:
+                contexts[i] = self.format_docs(item["result"], queries[i])
+
+        graded = list(contexts)
+        scores = self.chains[PromptType.GRADER].batch(
+            [{"question": queries[i], "docs": contexts[i]} for i in graded], config=batch_config, return_exceptions=True,
+        ) if graded else []
+        gen_idx, rewrite_idx = [], []
+        for i, score in zip(graded, scores):
+            if isinstance(score, Exception):
+                results[i]["error"] = str(score)
+            else:
+                (gen_idx if "yes" in score.lower() else rewrite_idx).append(i)
+
+        _run_stage(PromptType.PRODUCT_BOT, gen_idx, [{"context": contexts[i], "question": queries[i]} for i in gen_idx])
+        # as in the graph, an irrelevant context ends the run with the rewritten question
+        _run_stage(PromptType.REWRITER, rewrite_idx, [{"question": queries[i]} for i in rewrite_idx])
+
+        log.info("Batch run finished", count=len(queries),
+                 failed=sum(1 for r in results if r["error"]))
+        return results
     
 if __name__=="__main__":
     rag_agent = AgenticRAG()
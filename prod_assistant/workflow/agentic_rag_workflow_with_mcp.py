@@ -1,16 +1,19 @@
 import sys
 import os
 import re
-from typing import Annotated, Sequence, TypedDict, Literal
+import uuid
+import threading
+from typing import Annotated, Sequence, TypedDict, Literal, List, Optional
 from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
 
-from prod_assistant.prompt_library.prompts import PROMPT_REGISTRY, PromptType
+from prod_assistant.prompt_library.prompts import PromptType
+from prod_assistant.prompt_library.chains import ChainRegistry
 from prod_assistant.retriever.retrieval import Retriever
+from prod_assistant.retriever.product_index import ProductIndex
 from prod_assistant.utils.model_loader import ModelLoader
 from langgraph.checkpoint.memory import MemorySaver
 import asyncio
@@ -18,16 +21,28 @@ from prod_assistant.evaluation.ragas_eval import evaluate_context_precision, eva
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from prod_assistant.logger import GLOBAL_LOGGER as log
 from prod_assistant.utils.astradb_writer import AstraWriter
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.context_builder import ContextBuilder
+from prod_assistant.workflow.speculation import build_speculation, speculation_stats
+from prod_assistant.utils.single_flight import RunCancelled
+from prod_assistant.utils.profiler import profiled_node
+from prod_assistant.workflow.fused_generation import parse_graded_answer, fused_stats
 
 class AgenticRAG:
     class AgentState(TypedDict):
         messages: Annotated[Sequence[BaseMessage],add_messages]
+        # set by the fused GradeGenerate node
+        relevant: Optional[bool]
+        cited_product_ids: List[str]
 
     def __init__(self):
         self.retriever_obj = Retriever()
         self.model_loader = ModelLoader()
         self.llm = self.model_loader.load_llm()
+        self.chains = ChainRegistry(self.llm)
         self.checkpointer = MemorySaver()
+        self.config = load_config()
+        self.context_builder = ContextBuilder.from_config(self.config, summary_source=ProductIndex.load)
 
         self.mcp_client = MultiServerMCPClient(
             {
@@ -57,52 +72,64 @@ class AgenticRAG:
             log.warning("Failed to instantiate AstraWriter", error=str(e))
             self.astra_writer = None
 
+        self.speculation = build_speculation(self.config)
+
         self.workflow = self._build_workflow()
         self.app = self.workflow.compile(checkpointer=self.checkpointer)
 
         
-    def format_docs(self, docs)->str:
-        if not docs:
-            return "No relevant documents found"
-        formatted_chunks = []
-        for d in docs:
-            meta = d.metadata or {}
-            formatted = (
-                f"Title:{meta.get('product_title','N/A')}\n"
-                f"Price:{meta.get('price','N/A')}\n"
-                f"Rating:{meta.get('rating','N/A')}\n"
-                f"Review:\n{d.page_content.strip()}"
-            )
-            formatted_chunks.append(formatted)
-        return "\n\n---\n\n".join(formatted_chunks)
+    def format_docs(self, docs, question:str="")->str:
+        return self.context_builder.build(docs, question)
+
+    def _is_product_query(self, text:str)->bool:
+        return any(word in text.lower() for word in ["price","review","product"])
+
+    def _index_answer(self, query:str)->Optional[str]:
+        """Answer factual lookups (price / reviews of a known product) from the ingestion-time index."""
+        if not self.config.get("product_index", {}).get("enabled", True):
+            return None
+        index = ProductIndex.load()
+        return index.answer(query) if index else None
+
+    def _is_empty_context(self, docs)->bool:
+        return isinstance(docs, str) and docs.strip().lower() in ("no relevant documents found", "")
+
+    def _names_retrieved_product(self, question:str, docs:str)->bool:
+        """True when the question names catalog products that are in the context; no grading needed."""
+        matches = self.retriever_obj.resolve_products(question)
+        return any(m["exact"] and m["title"] in docs for m in matches)
+
+    def _is_relevant(self, score:str, docs:str)->bool:
+        return "yes" in score.lower() or any(keyword in docs.lower() for keyword in [
+            "price", "product", "model", "specification", "details", "features", "buy", "cost"
+        ])
+
+    def _clean_rewrite(self, rewritten_query:str)->str:
+        cleaned_q = self.clean_response(rewritten_query, max_chars=200)
+        return cleaned_q.split("\n")[0].strip()  # keep only first line
 
     def _ai_assistant(self, state:AgentState):
-        print("---CALL ASSISTANT---")
+        log.debug("---CALL ASSISTANT---")
         messages = state["messages"]
         last_message = messages[-1].content if messages else ""
 
-        if any(word in last_message.lower() for word in ["price","review","product"]):
+        if self._is_product_query(last_message):
+            indexed = self._index_answer(last_message)
+            if indexed:
+                log.info("Answered from product index", query=last_message)
+                return {"messages":[HumanMessage(content=indexed)]}
             return {"messages":[HumanMessage(content=f"TOOL: retriever||{last_message}")]}
         
-        prompt = ChatPromptTemplate.from_template(
-            """You are a product assistant. Only return the direct, final answer to the user's question, without explanations or alternative suggestions.
-
-            User Question: {question}
-            Context: {context}
-
-            Final Answer:
-            """
-        )
-        chain = prompt| self.llm| StrOutputParser()
+        chain = self.chains[PromptType.ASSISTANT]
         safe_context = ""
         try:
             response = chain.invoke({"question": last_message, "context": safe_context})
         except Exception as e:
-            print("Error invoking assistant chain:", e)
+            log.warning("Error invoking assistant chain", error=str(e))
             response = "Sorry — I couldn't generate an answer right now."
         return {"messages": [HumanMessage(content=response)]}
     
-    def _vector_retriever(self, state: AgentState):
+    def _vector_retriever(self, state: AgentState, config: RunnableConfig):
         log.info("---RETRIEVER(MCP)---")
         raw = state["messages"][-1].content
 
@@ -111,6 +138,14 @@ class AgenticRAG:
         else:
             query = raw
 
+        run_key = config.get("configurable", {}).get("run_key")
+        context = self.speculation.take(run_key, query) if self.speculation and run_key else None
+        if context is None:
+            context = self._retrieve_context(query)
+        return {"messages": [HumanMessage(content=context)]}
+
+    def _retrieve_context(self, query:str)->str:
+        """MCP product tool, then MCP web search, then the local retriever; returns the context text."""
         product_tool = next(
             (t for t in self.mcp_tools if getattr(t, "name", None) == "get_product_info"),
             None
@@ -153,37 +188,33 @@ class AgenticRAG:
             if not context:
                 try:
                     retriever_results = self.retriever_obj.call_retriever(query)
-                    context = self.format_docs(retriever_results)
+                    context = self.format_docs(retriever_results, query)
                 except Exception as e:
                     log.warning("Local retriever failed to provide context", error=str(e))
                     context = "No relevant documents found"
         else:
             context = result
 
-        return {"messages": [HumanMessage(content=context)]}
+        return context
     
     def _grade_documents(self, state:AgentState)->Literal["generator","rewriter"]:
-        print("---GRADER---")
+        log.debug("---GRADER---")
         question = state["messages"][0].content
         docs = state["messages"][-1].content
 
         # Short-circuit: if retriever returned no relevant documents, avoid infinite rewrite loops
-        if isinstance(docs, str) and docs.strip().lower() in ("no relevant documents found", ""):
+        if self._is_empty_context(docs):
             log.info("Docs empty or not found - forcing generator to avoid rewrite loop")
             return "generator"
 
-        prompt = PromptTemplate(
-            template="""You are a grader. Question:{question}\nDocs:{docs}\n
-            Are docs relevant to the question? Answer yes or no""",
-            input_variables=["question","docs"]
-        )
-        chain = prompt |self.llm | StrOutputParser()
+        if self._names_retrieved_product(question, docs):
+            log.info("Question names a retrieved catalog product - skipping grader")
+            return "generator"
+
+        chain = self.chains[PromptType.GRADER]
         score = chain.invoke({"question":question,"docs":docs})
 
-        
-        if "yes" in score.lower() or any(keyword in docs.lower() for keyword in [
-        "price", "product", "model", "specification", "details", "features", "buy", "cost"
-    ]):
+        if self._is_relevant(score, docs):
             return "generator"
         return "rewriter"
 
@@ -201,16 +232,16 @@ class AgenticRAG:
         return text
  
     def _generate(self, state: AgentState):
-        print("---GENERATE---")
+        log.debug("---GENERATE---")
         question = state["messages"][0].content
         docs = state["messages"][-1].content
-        prompt = ChatPromptTemplate.from_template(
-            PROMPT_REGISTRY[PromptType.PRODUCT_BOT].template
-        )
-        chain = prompt | self.llm | StrOutputParser()
+        chain = self.chains[PromptType.PRODUCT_BOT]
         response = chain.invoke({"context":docs, "question":question})
         safe_response = self.clean_response(response, max_chars=250)
+        self._persist(question, docs, safe_response)
+        return {"messages":[HumanMessage(content=safe_response)]}
 
+    def _persist(self, question:str, docs:str, safe_response:str):
         # Attempt to persist interaction to AstraDB (non-blocking, must not crash)
         try:
             if hasattr(self, "astra_writer") and getattr(self.astra_writer, "enabled", False):
@@ -223,39 +254,54 @@ class AgenticRAG:
             # Broad safety: ensure any persistence errors do not break response
             log.warning("Failed during Astra persistence attempt", error=str(e))
 
-        return {"messages":[HumanMessage(content=safe_response)]}
+    def _grade_and_generate(self, state: AgentState):
+        """
+        Fused grader + generator: one structured call returns the verdict, the answer and the cited
+        products. A negative verdict adds no message and routes to the rewriter, unless the query was
+        already rewritten or the grader would have been skipped anyway. An unparseable reply, or a
+        forced answer left empty, falls back to a single generator call (counted in fused_stats).
+        """
+        log.debug("---GRADE AND GENERATE---")
+        question = state["messages"][0].content
+        docs = state["messages"][-1].content
+        rewritten = sum(1 for m in state["messages"] if m.content.startswith("TOOL: retriever||")) > 1
+        forced = rewritten or self._is_empty_context(docs) or self._names_retrieved_product(question, docs)
+
+        reply = parse_graded_answer(self.chains[PromptType.GRADE_AND_GENERATE].invoke(
+            {"question": question, "context": docs}))
+        fused_stats.record(reply, forced)
+        if reply is None or (forced and not reply.answer.strip()):
+            log.info("Fused reply unusable - falling back to the generator", unparsed=reply is None)
+            return {**self._generate(state), "relevant": True, "cited_product_ids": []}
+        if not reply.relevant and not forced:
+            log.info("Fused grader verdict negative - rewriting", question=question)
+            return {"relevant": False, "cited_product_ids": []}
+
+        cited = sorted({m["product_id"] for title in reply.cited_titles
+                        for m in self.retriever_obj.resolve_products(title) if m["exact"]})
+        safe_response = self.clean_response(reply.answer, max_chars=250)
+        log.info("Fused grade and generate", relevant=reply.relevant, cited_product_ids=cited)
+        self._persist(question, docs, safe_response)
+        return {"messages":[HumanMessage(content=safe_response)], "relevant": True, "cited_product_ids": cited}
     
 
     def _rewrite(self, state: AgentState):
-        print("--- REWRITE --")
+        log.debug("--- REWRITE --")
         question = state["messages"][0].content
 
-        rewrite_prompt = ChatPromptTemplate.from_template(
-            """You are a helpful assistant that rewrites user queries 
-            to make them more specific and clear for product searches.
-
-            Original query: {question}
-
-            Rewrite the query in one line. 
-            Only return the rewritten query — no explanations, 
-            no examples, and no lists.
-            """
-        )
-
-        chain = rewrite_prompt | self.llm | StrOutputParser()
+        chain = self.chains[PromptType.REWRITER]
         rewritten_query = chain.invoke({"question": question})
-        cleaned_q = self.clean_response(rewritten_query, max_chars=200)
-        cleaned_q = cleaned_q.split("\n")[0].strip()  # keep only first line
+        cleaned_q = self._clean_rewrite(rewritten_query)
 
         return {"messages": [HumanMessage(content=f"TOOL: retriever||{cleaned_q}")] }
 
 
     def _build_workflow(self):
         workflow = StateGraph(self.AgentState)
-        workflow.add_node("Assistant", self._ai_assistant)
-        workflow.add_node("Retriever", self._vector_retriever)
-        workflow.add_node("Generator", self._generate)
-        workflow.add_node("Rewriter", self._rewrite)
+        workflow.add_node("Assistant", profiled_node("Assistant", self._ai_assistant))
+        workflow.add_node("Retriever", profiled_node("Retriever", self._vector_retriever))
+        workflow.add_node("Generator", profiled_node("Generator", self._generate))
+        workflow.add_node("Rewriter", profiled_node("Rewriter", self._rewrite))
 
         workflow.add_edge(START, "Assistant")
         workflow.add_conditional_edges(
@@ -264,20 +310,148 @@ class AgenticRAG:
             {"Retriever":"Retriever",END:END},
         )
 
-        workflow.add_conditional_edges(
-            "Retriever",
-            self._grade_documents,
-            {"generator":"Generator","rewriter":"Rewriter"}
-        )
+        if self.config.get("fused_generation", {}).get("enabled", False):
+            workflow.add_node("GradeGenerate", profiled_node("GradeGenerate", self._grade_and_generate))
+            workflow.add_edge("Retriever", "GradeGenerate")
+            workflow.add_conditional_edges(
+                "GradeGenerate",
+                lambda state: "Rewriter" if state.get("relevant") is False else END,
+                {"Rewriter":"Rewriter", END:END},
+            )
+        else:
+            workflow.add_conditional_edges(
+                "Retriever",
+                profiled_node("Grader", self._grade_documents),
+                {"generator":"Generator","rewriter":"Rewriter"}
+            )
 
         workflow.add_edge("Generator",END)
         workflow.add_edge("Rewriter","Retriever")
         return workflow
     
-    def run(self, query:str, thread_id: str="default_thread")->str:
-        result = self.app.invoke({"messages":[HumanMessage(content=query)]},
-                                 config = {"configurable": {"thread_id": thread_id}})
+    def run(self, query:str, thread_id: str="default_thread", cancel: Optional[threading.Event]=None)->str:
+        """`cancel` is checked between graph nodes; once set, the run stops with RunCancelled."""
+        run_key = uuid.uuid4().hex
+        # Speculatively retrieve while the Assistant node routes, only for queries it sends to the
+        # retriever; chit-chat and index-answered lookups never retrieve
+        if self.speculation and self._is_product_query(query) and not self._index_answer(query):
+            self.speculation.start(run_key, query, self._retrieve_context)
+        try:
+            result = None
+            for result in self.app.stream({"messages":[HumanMessage(content=query)]},
+                                          config = {"configurable": {"thread_id": thread_id, "run_key": run_key}},
+                                          stream_mode="values"):
+                if cancel is not None and cancel.is_set():
+                    log.info("Run cancelled between nodes", run_key=run_key)
+                    raise RunCancelled(query)
+        finally:
+            if self.speculation:
+                self.speculation.discard(run_key)
         return result["messages"][-1].content
+
+    def speculation_stats(self)->dict:
+        return speculation_stats()
+
+    def run_batch(self, queries:List[str], max_concurrency:Optional[int]=None)->List[dict]:
+        """
+        Answer many queries in one pass for offline jobs (FAQ pre-generation, catalog QA, evaluation).
+        Mirrors the graph (route -> retrieve -> grade -> rewrite once -> generate) but runs each stage
+        for the whole batch: one bulk embedding call per retrieval round and llm.batch with a
+        concurrency cap for every LLM stage. Retrieval goes to the local vector store, not MCP.
+        Returns one {"query", "answer", "error"} dict per query, in input order.
+        """
+        queries = list(queries)
+        max_concurrency = max_concurrency or self.retriever_obj.batch_max_concurrency()
+        batch_config = {"max_concurrency": max_concurrency}
+        results = [{"query": q, "answer": None, "error": None} for q in queries]
+
+        def _fail(i, error):
+            results[i]["error"] = str(error)
+
+        product_idx = []
+        for i, q in enumerate(queries):
+            if not self._is_product_query(q):
+                continue
+            indexed = self._index_answer(q)
+            if indexed:
+                results[i]["answer"] = indexed
+            else:
+                product_idx.append(i)
+        direct_idx = [i for i, q in enumerate(queries) if not self._is_product_query(q)]
+
+        if direct_idx:
+            outputs = self.chains[PromptType.ASSISTANT].batch(
+                [{"question": queries[i], "context": ""} for i in direct_idx],
+                config=batch_config, return_exceptions=True,
+            )
+            for i, out in zip(direct_idx, outputs):
+                if isinstance(out, Exception):
+                    _fail(i, out)
+                else:
+                    results[i]["answer"] = out
+
+        contexts = {}
+        search_queries = {i: queries[i] for i in product_idx}
+        pending = product_idx
+        # Two retrieval rounds at most: the original query, then one rewrite for weak results
+        for round_no in range(2):
+            if not pending:
+                break
+            retrieved = self.retriever_obj.retrieve_batch(
+                [search_queries[i] for i in pending], max_concurrency=max_concurrency
+            )
+            graded = []
+            for i, item in zip(pending, retrieved):
+                if item["error"]:
+                    # a failed re-retrieval keeps the first-round context
+                    if i not in contexts:
+                        _fail(i, item["error"])
+                    continue
+                contexts[i] = self.format_docs(item["result"], queries[i])
+                if not self._is_empty_context(contexts[i]) and not self._names_retrieved_product(queries[i], contexts[i]):
+                    graded.append(i)
+            if round_no == 1 or not graded:
+                break
+
+            scores = self.chains[PromptType.GRADER].batch(
+                [{"question": queries[i], "docs": contexts[i]} for i in graded],
+                config=batch_config, return_exceptions=True,
+            )
+            to_rewrite = []
+            for i, score in zip(graded, scores):
+                if isinstance(score, Exception):
+                    _fail(i, score)
+                elif not self._is_relevant(score, contexts[i]):
+                    to_rewrite.append(i)
+            if not to_rewrite:
+                break
+
+            rewrites = self.chains[PromptType.REWRITER].batch(
+                [{"question": queries[i]} for i in to_rewrite],
+                config=batch_config, return_exceptions=True,
+            )
+            pending = []
+            for i, rewritten in zip(to_rewrite, rewrites):
+                # a failed rewrite keeps the first-round context rather than failing the item
+                if not isinstance(rewritten, Exception) and self._clean_rewrite(rewritten):
+                    search_queries[i] = self._clean_rewrite(rewritten)
+                    pending.append(i)
+
+        gen_idx = [i for i in product_idx if i in contexts and results[i]["error"] is None]
+        if gen_idx:
+            outputs = self.chains[PromptType.PRODUCT_BOT].batch(
+                [{"context": contexts[i], "question": queries[i]} for i in gen_idx],
+                config=batch_config, return_exceptions=True,
+            )
+            for i, out in zip(gen_idx, outputs):
+                if isinstance(out, Exception):
+                    _fail(i, out)
+                else:
+                    results[i]["answer"] = self.clean_response(out, max_chars=250)
+
+        log.info("Batch run finished", count=len(queries),
+                 failed=sum(1 for r in results if r["error"]))
+        return results
     
 if __name__=="__main__":
     rag_agent = AgenticRAG()
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.query_log import QueryLog
+from prod_assistant.utils.single_flight import normalize_query
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class CacheWarmer:
+    """
+    Replays the most frequent recent questions through the caches after a deploy or restart.
+    Questions come from the AstraDB interaction collection and the local query log; the top_n by
+    normalized text (seen at least min_count times) are warmed through the live request path: with
+    `answers`, a fresh workflow run per question, as /get does, so the retrieval step (the MCP product
+    tool when ENABLE_MCP is on) and the LLM response cache see exactly the prompts a request sends;
+    without it, only the retrieval step. Work stops at the time budget.
+
+    The uvicorn workers of a pod share one pass: the worker that takes `<state_file>.lock` warms and
+    writes `state_file`, the others wait for it. `ready` is set when that pass ends, however it ends.
+    """
+
+    def __init__(self, rag_factory: Callable, query_log: Optional[QueryLog] = None, enabled: bool = False,
+                 top_n: int = 50, min_count: int = 2, lookback_days: float = 7, max_interactions: int = 2000,
+                 time_budget_seconds: float = 120, answers: bool = True, max_concurrency: int = 4,
+                 interval_minutes: float = 0, state_file: str = "data/cache_warming.json"):
+        self.rag_factory = rag_factory
+        self.query_log = query_log
+        self.enabled = enabled
+        self.top_n = top_n
+        self.min_count = min_count
+        self.lookback_days = lookback_days
+        self.max_interactions = max_interactions
+        self.time_budget_seconds = time_budget_seconds
+        self.answers = answers
+        self.max_concurrency = max(max_concurrency, 1)
+        self.interval_minutes = interval_minutes
+        self.state_file = Path(state_file)
+        self.lock_file = Path(state_file + ".lock")
+        # workers of one uvicorn master share its pid; a state file left by an earlier master is ignored
+        self.pod = os.getppid()
+        self.ready = threading.Event()
+        self.state = "pending" if enabled else "disabled"
+        self.last_run: dict = {}
+        self.runs = 0
+        self._thread: Optional[threading.Thread] = None
+        if not enabled:
+            self.ready.set()
+
+    @classmethod
+    def from_config(cls, config: dict, rag_factory: Callable) -> "CacheWarmer":
+        cfg = config.get("cache_warming", {})
+        return cls(rag_factory, query_log=QueryLog.from_config(config), enabled=cfg.get("enabled", False),
+                   top_n=cfg.get("top_n", 50), min_count=cfg.get("min_count", 2),
+                   lookback_days=cfg.get("lookback_days", 7), max_interactions=cfg.get("max_interactions", 2000),
+                   time_budget_seconds=cfg.get("time_budget_seconds", 120), answers=cfg.get("answers", True),
+                   max_concurrency=cfg.get("max_concurrency", 4), interval_minutes=cfg.get("interval_minutes", 0),
+                   state_file=cfg.get("state_file", "data/cache_warming.json"))
+
+    def collect_queries(self, rag=None) -> List[str]:
+        """Most frequent recent questions, each in its most common raw spelling (what the LLM cache keys on)."""
+        since = time.time() - self.lookback_days * 86400
+        counts, spellings = Counter(), defaultdict(Counter)
+
+        def add(query: str):
+            normalized = normalize_query(query)
+            if normalized:
+                counts[normalized] += 1
+                spellings[normalized][query.strip()] += 1
+
+        if self.query_log is not None:
+            for _, query in self.query_log.read(since):
+                add(query)
+        writer = getattr(rag, "astra_writer", None)
+        if writer is not None:
+            for question, _ in writer.recent_questions(self.max_interactions, since=since):
+                add(question)
+        ranked = [q for q, n in counts.most_common() if n >= self.min_count][:self.top_n]
+        return [spellings[q].most_common(1)[0][0] for q in ranked]
+
+    def _workflow(self):
+        rag = self.rag_factory()
+        # warm-up answers are not user interactions: they must not be stored or counted as recent questions
+        rag.astra_writer = None
+        return rag
+
+    def warm(self) -> dict:
+        started = time.monotonic()
+        deadline = started + self.time_budget_seconds
+        rag = self.rag_factory()
+        queries = self.collect_queries(rag)
+        stats = {"queries": len(queries), "retrieved": 0, "answered": 0, "failed": 0, "skipped": 0}
+        log.info("Cache warm-up started", queries=len(queries), budget_seconds=self.time_budget_seconds)
+
+        def replay(query: str) -> str:
+            if time.monotonic() >= deadline:
+                return "skipped"
+            try:
+                if self.answers:
+                    # /get builds a workflow per request; a shared one would carry earlier turns in its memory
+                    self._workflow().run(query)
+                    return "answered"
+                rag._retrieve_context(query)
+                return "retrieved"
+            except Exception as e:
+                log.warning("Cache warm-up failed for query", query=query, error=str(e))
+                return "failed"
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="cache-warm") as pool:
+            for outcome in pool.map(replay, queries):
+                stats[outcome] += 1
+
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        stats["budget_exhausted"] = time.monotonic() >= deadline
+        log.info("Cache warm-up finished", **stats)
+        return stats
+
+    def _claim(self) -> bool:
+        """Take the pod's warm-up lock; a lock left by an earlier master or a dead pass is taken over."""
+        for _ in range(2):
+            try:
+                self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    owner = json.loads(self.lock_file.read_text(encoding="utf-8") or "{}").get("pod")
+                    expired = time.time() - self.lock_file.stat().st_mtime > self.time_budget_seconds + 60
+                except (OSError, ValueError):
+                    owner, expired = None, True
+                if owner == self.pod and not expired:
+                    return False
+                self.lock_file.unlink(missing_ok=True)
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"pod": self.pod, "pid": os.getpid()}, f)
+            return True
+        return False
+
+    def _shared_state(self) -> Optional[dict]:
+        try:
+            state = json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return state if state.get("pod") == self.pod else None
+
+    def _run_once(self):
+        # a worker that starts after another one already finished the pod's first pass adopts its result
+        if (not self.ready.is_set() and self._shared_state() is not None) or not self._claim():
+            self._wait_for_pass()
+            return
+        self.state = "warming"
+        try:
+            self.last_run = self.warm()
+        except Exception as e:
+            # warming is best effort: a failed pass must not keep the instance out of rotation
+            log.error("Cache warm-up failed", error=str(e))
+            self.last_run = {"error": str(e)}
+        finally:
+            self.runs += 1
+            self._publish()
+            self.lock_file.unlink(missing_ok=True)
+        self.state = "ready"
+        self.ready.set()
+
+    def _publish(self):
+        state = {"pod": self.pod, "pid": os.getpid(), "runs": self.runs, "last_run": self.last_run,
+                 "finished_at": time.time()}
+        try:
+            tmp = self.state_file.with_suffix(self.state_file.suffix + ".tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            log.warning("Failed to write cache warm-up state", path=str(self.state_file), error=str(e))
+
+    def _wait_for_pass(self):
+        """Another worker of this pod is warming: report its result once it has written it."""
+        if not self.ready.is_set():
+            self.state = "waiting"
+            deadline = time.monotonic() + self.time_budget_seconds + 60
+            while self._shared_state() is None and time.monotonic() < deadline:
+                time.sleep(1)
+        shared = self._shared_state() or {}
+        self.last_run = shared.get("last_run", self.last_run)
+        self.runs = shared.get("runs", self.runs)
+        self.state = "ready"
+        self.ready.set()
+
+    def _loop(self):
+        self._run_once()
+        while self.interval_minutes:
+            time.sleep(self.interval_minutes * 60)
+            self._run_once()
+
+    def start(self):
+        """Warm in a daemon thread (then every interval_minutes when set); returns immediately."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def status(self) -> dict:
+        return {"state": self.state, "ready": self.ready.is_set(), "runs": self.runs, "last_run": self.last_run}
+
+
+if __name__ == "__main__":
+    # one warm-up pass in this process, e.g. to check which queries would be warmed
+    from prod_assistant.workflow.agentic_rag_workflow_with_mcp import AgenticRAG
+
+    warmer = CacheWarmer.from_config(load_config(), AgenticRAG)
+    warmer._run_once()
+    print(warmer.status())
@@ -0,0 +1,159 @@
+import re
+import sys
+import json
+import time
+import random
+import threading
+from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+_REASONING = re.compile(r"<think>.*?</think>", re.S)
+
+# hand-labelled "not relevant" questions: nothing in a phone catalog answers them
+UNRELATED_QUESTIONS = [
+    "How long does the Dyson V15 vacuum battery last on carpet?",
+    "Which front-load washing machine has the quietest spin cycle?",
+    "Is the Sony WH-1000XM5 headset comfortable for long flights?",
+    "What do reviewers say about the Nikon Z6 II kit lens sharpness?",
+    "How many people does the Prestige 5 litre pressure cooker serve?",
+    "Does the Dell XPS 13 laptop run hot while gaming?",
+    "Which trekking backpack under 3000 rupees has a rain cover?",
+    "Is the Philips air fryer easy to clean after cooking fish?",
+]
+
+
+class FusedStats:
+    """Per-process counts of fused calls, negative verdicts and fallbacks to a separate generator call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.negative = 0
+        self.unparsed = 0
+        self.empty_answers = 0
+
+    def record(self, reply: Optional["GradedAnswer"], forced: bool):
+        with self._lock:
+            self.calls += 1
+            if reply is None:
+                self.unparsed += 1
+            elif forced and not reply.answer.strip():
+                self.empty_answers += 1
+            elif not reply.relevant and not forced:
+                self.negative += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            fallbacks = self.unparsed + self.empty_answers
+            return {"calls": self.calls, "negative_verdicts": self.negative, "fallbacks": fallbacks,
+                    "unparsed": self.unparsed, "empty_answers": self.empty_answers,
+                    "fallback_rate": round(fallbacks / self.calls, 4) if self.calls else 0.0}
+
+
+fused_stats = FusedStats()
+
+
+class GradedAnswer(BaseModel):
+    """Structured reply of the fused grade-and-generate call."""
+    relevant: bool
+    answer: str = ""
+    cited_titles: List[str] = Field(default_factory=list)
+
+
+def parse_graded_answer(text: str) -> Optional[GradedAnswer]:
+    """The JSON object in a model reply (code fences and <think> blocks tolerated); None if there is none."""
+    text = _REASONING.sub("", text or "")
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        return GradedAnswer.model_validate(json.loads(text[start:end + 1]))
+    except (json.JSONDecodeError, ValidationError) as e:
+        log.warning("Unparseable grade-and-generate reply", error=str(e))
+        return None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1) if ordered else 0.0
+
+
+def _overlap(a: str, b: str) -> float:
+    wa, wb = set(a.lower().split()), set(b.lower().split())
+    return len(wa & wb) / len(wa | wb) if wa | wb else 1.0
+
+
+def benchmark(chains, context_builder, docs, cases: int = 20, seed: int = 7) -> dict:
+    """
+    Side-by-side run of the two-call path (grader, then generator) and the fused call on labelled
+    cases: each sampled product is asked about with its own context (relevant), and the same
+    context is paired with one of UNRELATED_QUESTIONS (not relevant). Other catalog products are
+    not used as negatives, since most of this catalog is variants of one phone. Verdict accuracy is
+    measured against those labels; latency is wall time per case, including the live path's single
+    generator fallback when the fused reply does not parse; answer overlap is word Jaccard between
+    the two paths' answers on relevant cases.
+    """
+    from prod_assistant.prompt_library.prompts import PromptType
+
+    rng = random.Random(seed)
+    picked = rng.sample(docs, min(cases, len(docs)))
+    labelled = []
+    for i, doc in enumerate(picked):
+        question = f"What do customers say about {doc.metadata.get('product_title', 'this product')}?"
+        unrelated = UNRELATED_QUESTIONS[i % len(UNRELATED_QUESTIONS)]
+        labelled.append((question, context_builder.build([doc], question), True))
+        labelled.append((unrelated, context_builder.build([doc], unrelated), False))
+
+    results = {"two_call": {"ms": [], "correct": 0}, "fused": {"ms": [], "correct": 0, "unparsed": 0}}
+    overlaps = []
+    for question, context, label in labelled:
+        started = time.perf_counter()
+        verdict = "yes" in chains[PromptType.GRADER].invoke({"question": question, "docs": context}).lower()
+        two_call_answer = chains[PromptType.PRODUCT_BOT].invoke({"question": question, "context": context}) \
+            if verdict else ""
+        results["two_call"]["ms"].append((time.perf_counter() - started) * 1000)
+        results["two_call"]["correct"] += verdict == label
+
+        started = time.perf_counter()
+        parsed = parse_graded_answer(chains[PromptType.GRADE_AND_GENERATE].invoke(
+            {"question": question, "context": context}))
+        if parsed is None:
+            # as in the workflow: one generator call answers, the verdict counts as relevant
+            chains[PromptType.PRODUCT_BOT].invoke({"question": question, "context": context})
+        results["fused"]["ms"].append((time.perf_counter() - started) * 1000)
+        if parsed is None:
+            results["fused"]["unparsed"] += 1
+            results["fused"]["correct"] += label
+            continue
+        results["fused"]["correct"] += parsed.relevant == label
+        if label and verdict and parsed.relevant:
+            overlaps.append(_overlap(two_call_answer, parsed.answer))
+
+    report = {"cases": len(labelled)}
+    for path, r in results.items():
+        report[path] = {"accuracy": round(r["correct"] / len(labelled), 3) if labelled else 0.0,
+                        "mean_ms": round(sum(r["ms"]) / len(r["ms"]), 1) if r["ms"] else 0.0,
+                        "p50_ms": _percentile(r["ms"], 0.5), "p95_ms": _percentile(r["ms"], 0.95)}
+        if "unparsed" in r:
+            report[path]["unparsed"] = r["unparsed"]
+    report["answer_overlap"] = round(sum(overlaps) / len(overlaps), 3) if overlaps else None
+    return report
+
+
+if __name__ == "__main__":
+    # python -m prod_assistant.workflow.fused_generation [cases]   (uses the configured LLM and catalog CSV)
+    import csv
+    from langchain_core.documents import Document
+    from prod_assistant.prompt_library.chains import ChainRegistry
+    from prod_assistant.utils.config_loader import load_config
+    from prod_assistant.utils.context_builder import ContextBuilder
+    from prod_assistant.utils.model_loader import ModelLoader
+
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open("data/product_reviews.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    catalog = [Document(page_content=r.get("top_reviews", ""), metadata=r) for r in rows]
+    report = benchmark(ChainRegistry(ModelLoader().load_llm()), ContextBuilder.from_config(load_config()),
+                       catalog, cases=cases)
+    print(json.dumps(report, indent=2))
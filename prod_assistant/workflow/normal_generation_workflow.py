@@ -1,56 +1,43 @@
-from langchain.schema.runnable import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
+from langchain.schema.runnable import RunnableLambda, RunnablePassthrough
 from langchain_core.prompts import ChatMessagePromptTemplate
-from langchain_core.prompts import ChatPromptTemplate
 
-from prod_assistant.prompt_library.prompts import PROMPT_REGISTRY, PromptType
+from prod_assistant.prompt_library.prompts import PromptType
+from prod_assistant.prompt_library.chains import build_chain as build_prompt_chain
 from prod_assistant.retriever.retrieval import Retriever
 from prod_assistant.utils.model_loader import ModelLoader
+from prod_assistant.utils.config_loader import load_config
+from prod_assistant.utils.context_builder import ContextBuilder
 from prod_assistant.evaluation.ragas_eval import evaluate_context_precision, evaluate_response_relevancy
 
 retriever_obj = Retriever()
 model_loader = ModelLoader()
+context_builder = ContextBuilder.from_config(load_config())
+# compiled once; only the retriever step depends on the query
+product_bot_chain = build_prompt_chain(PromptType.PRODUCT_BOT, model_loader.load_llm())
 
 def format_docs(docs)-> str:
-    if not docs:
-        return "No relevants documents found"
-    formatted_chunks = []
-    for d in docs:
-        meta = d.metadata or {}
-        formatted = (
-            f"Title: {meta.get('product_title','NA')}\n"
-            f"Price: {meta.get('price','N/A')}\n"
-            f"Rating: {meta.get('rating','N/A')}\n"
-            f"Reviews: {(d.page_content.strip())}"
-
-        )
-        formatted_chunks.append(formatted)
-    return "\n\n--\n\n".join(formatted_chunks)
+    return context_builder.build(docs)
 
 def build_chain(query):
-    retriever = retriever_obj.load_retriever()
-    retrieved_docs = retriever.invoke(query)
+    # call_retriever applies sharding, reranking and the retrieval cache, like the agentic workflows;
+    # the chain's own retrieval of the same query is then served from that cache
+    retriever = RunnableLambda(retriever_obj.call_retriever)
+    retrieved_docs = retriever_obj.call_retriever(query)
 
     retrived_context = [format_docs(retrieved_docs)]
 
-    llm = model_loader.load_llm()
-    prompt = ChatPromptTemplate.from_template(
-        PROMPT_REGISTRY[PromptType.PRODUCT_BOT].template
-    )
     chain = (
         {"context":retriever | format_docs,"question":RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
+        | product_bot_chain
     )
     return chain, retrived_context
 
 def invoke_chain(query:str, debug: bool=False):
     chain, retrieved_contexts = build_chain(query)
     if debug:
-        docs = retriever_obj.load_retriever().invoke(query)
+        docs = retriever_obj.call_retriever(query)
         print("\nRetrieved Documents: ")
-        print(format_docs(query))
+        print(format_docs(docs))
         print("\n---\n")
     response = chain.invoke(query)
 
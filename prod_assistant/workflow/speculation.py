@@ -0,0 +1,151 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional
+from prod_assistant.logger import GLOBAL_LOGGER as log
+
+
+class SpeculativeRetrieval:
+    """
+    Runs retrieval for a run's query while the Assistant node is still routing.
+    The Retriever node claims the result with take(); if the run routes elsewhere (or retrieves a
+    rewritten query) the speculative work is discarded and counted as wasted. One instance (pool and
+    counters) serves every workflow in the process; run keys are unique per run.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float = 30.0):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-retrieval")
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.wasted = 0
+        self.wasted_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _run(retrieve_fn: Callable[[str], object], query: str):
+        started_at = time.perf_counter()
+        try:
+            return retrieve_fn(query), time.perf_counter() - started_at
+        except Exception as e:
+            return e, time.perf_counter() - started_at
+
+    def start(self, key: str, query: str, retrieve_fn: Callable[[str], object]):
+        future = self._pool.submit(self._run, retrieve_fn, query)
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            self._pending[key] = (query, future, time.perf_counter())
+            self.started += 1
+        if previous:
+            self._discard(previous)
+
+    def take(self, key: str, query: str):
+        """Speculative result for this query, or None when there is none (or it failed)."""
+        with self._lock:
+            entry = self._pending.pop(key, None)
+        if entry is None:
+            return None
+        spec_query, future, submitted_at = entry
+        if spec_query.strip() != query.strip():
+            with self._lock:
+                self.misses += 1
+            self._discard(entry)
+            return None
+
+        claimed_at = time.perf_counter()
+        try:
+            result, duration = future.result(timeout=self.timeout)
+        except Exception as e:
+            log.warning("Speculative retrieval did not finish", error=str(e))
+            with self._lock:
+                self.misses += 1
+            return None
+        if isinstance(result, Exception):
+            log.warning("Speculative retrieval failed, retrieving inline", error=str(result))
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            # retrieval time that overlapped with routing instead of following it
+            self.saved_seconds += min(duration, claimed_at - submitted_at)
+        return result
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._pending.pop(key, None)
+        if entry:
+            self._discard(entry)
+
+    def _discard(self, entry):
+        _, future, _ = entry
+        if future.cancel():
+            with self._lock:
+                self.cancelled += 1
+            return
+
+        def _record(done: Future):
+            try:
+                _, duration = done.result()
+            except Exception:
+                duration = 0.0
+            with self._lock:
+                self.wasted += 1
+                self.wasted_seconds += duration
+
+        future.add_done_callback(_record)
+
+    def stats(self) -> dict:
+        with self._lock:
+            claimed = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cancelled": self.cancelled,
+                "wasted": self.wasted,
+                "hit_rate": round(self.hits / self.started, 4) if self.started else 0.0,
+                "claim_hit_rate": round(self.hits / claimed, 4) if claimed else 0.0,
+                "wasted_seconds": round(self.wasted_seconds, 3),
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_shared: Optional[SpeculativeRetrieval] = None
+_shared_lock = threading.Lock()
+
+
+def build_speculation(config: dict) -> Optional[SpeculativeRetrieval]:
+    """The process-wide speculator (created on first use), or None when speculation is disabled."""
+    global _shared
+    spec_cfg = config.get("speculation", {})
+    if not spec_cfg.get("enabled", False):
+        return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = SpeculativeRetrieval(
+                max_workers=spec_cfg.get("max_workers", 4),
+                timeout=spec_cfg.get("timeout_seconds", 30),
+            )
+        return _shared
+
+
+def speculation_stats() -> dict:
+    with _shared_lock:
+        return _shared.stats() if _shared else {}
+
+
+def shutdown_speculation():
+    """Stop the shared pool (app shutdown); a later build_speculation starts a fresh one."""
+    global _shared
+    with _shared_lock:
+        speculation, _shared = _shared, None
+    if speculation:
+        speculation.shutdown()
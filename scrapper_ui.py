@@ -1,11 +1,19 @@
 import streamlit as st
-from prod_assistant.etl.data_ingestion import DataIngestion
-from prod_assistant.etl.data_scapper import FlipkartScraper  # fixed spelling
+from prod_assistant.etl.job_queue import ACTIVE, JobRunner
+from prod_assistant.utils.config_loader import load_config
 
-import os
-
-flipkart_scraper = FlipkartScraper()
 output_path = "data/product_reviews.csv"
+config = load_config()
+
+
+@st.cache_resource
+def get_job_runner():
+    # one runner per Streamlit server process; jobs outlive browser sessions and page refreshes
+    return JobRunner.from_config(config).start()
+
+
+runner = get_job_runner()
+job_store = runner.store
 st.title("📦 Product Review Scraper")
 
 # use consistent key
@@ -38,34 +46,59 @@ if st.button("🚀 Start Scraping"):
     if not product_inputs:
         st.warning("⚠️ Please enter at least one product name or a product description.")
     else:
-        final_data = []
-        for query in product_inputs:
-            st.write(f"🔍 Searching for: {query}")
-            results = flipkart_scraper.scrape_flipkart_products(
-                query, max_products=max_products, review_count=review_count
-            )
-            final_data.extend(results)
-
-        unique_products = {}
-        for row in final_data:
-            if row[1] not in unique_products:
-                unique_products[row[1]] = row
-
-        # moved outside loop
-        final_data = list(unique_products.values())
-        st.session_state["scraped_data"] = final_data  # fixed spelling
-        flipkart_scraper.save_to_csv(final_data, output_path)
-        st.success("✅ Data saved to `data/product_reviews.csv`")
-        st.download_button("📥 Download CSV", data=open(output_path, "rb"), file_name="product_reviews.csv")
+        job = job_store.submit("scrape", {"queries": product_inputs, "max_products": int(max_products),
+                                          "review_count": int(review_count), "output_path": output_path})
+        if job["deduplicated"]:
+            st.info(f"ℹ️ An identical scrape is already {job['status']} (job `{job['id']}`)")
+        else:
+            st.success(f"✅ Scrape job `{job['id']}` queued")
 
 # ingestion step
-if "scraped_data" in st.session_state and st.button("🧠 Store in Vector DB (AstraDB)"):
-    with st.spinner("📡 Initializing ingestion pipeline..."):
-        try:
-            ingestion = DataIngestion()
-            st.info("🚀 Running ingestion pipeline...")
-            ingestion.run_pipeline()
-            st.success("✅ Data successfully ingested to AstraDB!")
-        except Exception as e:
-            st.error("❌ Ingestion failed!")
-            st.exception(e)
+if st.button("🧠 Store in Vector DB (AstraDB)"):
+    job = job_store.submit("ingest", {})
+    if job["deduplicated"]:
+        st.info(f"ℹ️ An ingestion is already {job['status']} (job `{job['id']}`)")
+    else:
+        st.success(f"✅ Ingestion job `{job['id']}` queued")
+
+
+@st.fragment(run_every=config.get("jobs", {}).get("poll_seconds", 1.0) * 2)
+def show_jobs():
+    st.subheader("📋 Jobs")
+    jobs = job_store.list(limit=10)
+    if not jobs:
+        st.caption("No jobs yet")
+    for job in jobs:
+        with st.container(border=True):
+            label = ", ".join(job["params"].get("queries", [])) if job["kind"] == "scrape" else "catalog ingestion"
+            st.markdown(f"**{job['kind']}** `{job['id']}` · {label} · _{job['status']}_")
+            if job["status"] in ACTIVE:
+                st.progress(job["progress"], text=job["message"] or "")
+                if st.button("🛑 Cancel", key=f"cancel_{job['id']}"):
+                    job_store.cancel(job["id"])
+                    st.rerun(scope="fragment")
+            elif job["status"] == "failed":
+                st.error(f"❌ {job['error']}")
+            elif job["status"] == "succeeded" and job["kind"] == "scrape":
+                result = job["result"]
+                catalog_note = " and the `data/catalog` Parquet store" if result.get("catalog") else ""
+                st.success(f"✅ {result['products']} products saved to `{result['csv_path']}`{catalog_note}")
+                # colour/storage variants are kept in the catalog (prices differ) but reported here;
+                # ingestion folds them into one vector document
+                if result["dedup_groups"]:
+                    st.info(f"🔁 {len(result['dedup_groups'])} near-duplicate product group(s) found; "
+                            f"they will be linked at ingestion")
+                    st.json(result["dedup_groups"], expanded=False)
+                try:
+                    with open(result["csv_path"], "rb") as f:
+                        st.download_button("📥 Download CSV", data=f.read(), file_name="product_reviews.csv",
+                                           key=f"download_{job['id']}")
+                except OSError:
+                    pass
+            elif job["status"] == "succeeded" and job["kind"] == "ingest":
+                result = job["result"]
+                st.success(f"✅ Data successfully ingested to AstraDB! Catalog generation "
+                           f"{result['generation']} ({result['label'] or 'default collection'}) is live")
+
+
+show_jobs()